@@ -1,18 +1,72 @@
-import websocket  # type: ignore
+import asyncio
 import json
-import threading
-import time
-from urllib.parse import urlencode
+import logging
 import os
-from dotenv import load_dotenv  # type: ignore
+from collections import deque
 from pathlib import Path
+from urllib.parse import urlencode
+from dotenv import load_dotenv  # type: ignore
+from websockets.asyncio.client import connect  # type: ignore
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 load_dotenv(env_path)
 
+# Overridable so calls can be pointed at a local stand-in, e.g. for load tests
+ASSEMBLYAI_STREAMING_URL = os.getenv('ASSEMBLYAI_STREAMING_URL', "wss://streaming.assemblyai.com/v3/ws")
+
+# How long a stopped session waits for AssemblyAI to flush its last transcripts
+# and confirm termination before the socket is closed anyway
+STT_TERMINATE_TIMEOUT = float(os.getenv('STT_TERMINATE_TIMEOUT', '2'))
+
+# Audio frames a session buffers while connecting or while AssemblyAI is slow to
+# take them. Past this the oldest frames are dropped; 50 x 100ms is 5s of audio
+STT_SEND_QUEUE_FRAMES = int(os.getenv('STT_SEND_QUEUE_FRAMES', '50'))
+
+SLOW_SEND = 0.05  # A socket write that waits longer than this counts as backpressure
+
+
+class STTStats:
+    """Process-wide AssemblyAI send counters; only touched from the event loop"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.open_sessions = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.slow_sends = 0
+        self.max_send_wait = 0.0
+        self.max_queue_depth = 0
+
+    def snapshot(self):
+        return {
+            "sessions": self.sessions,
+            "open_sessions": self.open_sessions,
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "slow_sends": self.slow_sends,
+            "max_send_wait_ms": round(1000 * self.max_send_wait, 1),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+stt_stats = STTStats()
+
+_TERMINATE = object()
+
+
 class AssemblySTT:
-    def __init__(self, on_transcript_callback):
+    """
+    AssemblyAI v3 streaming session that lives on the call's event loop.
+
+    send_audio() only queues; a sender task writes the queue to the socket, so a
+    slow AssemblyAI connection backs up into the bounded queue instead of blocking
+    the loop. Transcripts are delivered to the callbacks on the loop.
+    """
+
+    def __init__(self, on_transcript_callback, on_end_of_turn_callback=None):
         self.api_key = os.getenv('ASSEMBLY_STT_KEY')
         if not self.api_key:
             raise ValueError("ASSEMBLY_STT_KEY environment variable not set")
@@ -21,17 +75,121 @@ class AssemblySTT:
             "sample_rate": 16000,
             "format_turns": True,
         }
-        self.api_endpoint = f"wss://streaming.assemblyai.com/v3/ws?{urlencode(self.connection_params)}"
-        
-        self.ws_app = None
-        self.audio_thread = None
-        self.stop_event = threading.Event()
+        self.api_endpoint = f"{ASSEMBLYAI_STREAMING_URL}?{urlencode(self.connection_params)}"
+
+        self.ws = None
+        self.task = None
+        self.queue = deque()
+        self.queue_ready = None
+        self.stopping = False
+        self.began = asyncio.Event()  # AssemblyAI accepted the session
+        self.terminated = asyncio.Event()  # AssemblyAI confirmed the Terminate
+        self.closed = asyncio.Event()  # Session finished, cleanly or not
         self.on_transcript_callback = on_transcript_callback
+        # Called with the unformatted transcript once AssemblyAI detects the end of a
+        # turn, ahead of the formatted one
+        self.on_end_of_turn_callback = on_end_of_turn_callback
         self.current_transcript = ""
         self.last_formatted_transcript = ""
+        self.end_of_turn_confidence = None  # AssemblyAI's, for the last formatted transcript
         self.is_building_transcript = False
 
-    def on_message(self, ws, message):
+    @property
+    def connected(self):
+        return self.ws is not None
+
+    @property
+    def ready(self):
+        """Open, accepted by AssemblyAI and not being torn down"""
+        return self.began.is_set() and not self.stopping and not self.closed.is_set()
+
+    def start(self):
+        """Connects in the background; must be called on the event loop"""
+        self.queue_ready = asyncio.Event()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        stt_stats.sessions += 1
+
+    def send_audio(self, audio_data):
+        if self.stopping or self.task is None or self.closed.is_set():
+            return
+        if len(self.queue) >= STT_SEND_QUEUE_FRAMES:
+            self.queue.popleft()
+            stt_stats.frames_dropped += 1
+        # A view into the consumer's ring buffer would be overwritten while queued;
+        # bytes() copies those and returns frames that already are bytes as they are
+        self.queue.append(bytes(audio_data))
+        stt_stats.max_queue_depth = max(stt_stats.max_queue_depth, len(self.queue))
+        self.queue_ready.set()
+
+    def stop(self, timeout=STT_TERMINATE_TIMEOUT):
+        """
+        Starts tearing the session down and returns immediately. Queued audio is
+        still sent, and transcripts AssemblyAI flushes before confirming the
+        Terminate are still delivered. closed is set once done.
+        """
+        if self.stopping:
+            return
+        self.stopping = True
+        if self.task is None:
+            self.closed.set()
+            return
+        self.queue.append(_TERMINATE)
+        self.queue_ready.set()
+        asyncio.get_running_loop().call_later(timeout, self._abort, timeout)
+
+    def _abort(self, timeout):
+        if not self.task.done():
+            logger.info(f"AssemblyAI did not confirm termination within {timeout}s")
+            self.task.cancel()
+
+    async def _run(self):
+        try:
+            async with connect(
+                self.api_endpoint,
+                additional_headers={"Authorization": self.api_key},
+                max_size=None,
+                close_timeout=1,
+            ) as ws:
+                self.ws = ws
+                stt_stats.open_sessions += 1
+                sender = asyncio.create_task(self._send_queued(ws))
+                try:
+                    async for message in ws:
+                        self.on_message(message)
+                        if self.terminated.is_set():
+                            break
+                finally:
+                    sender.cancel()
+                    stt_stats.open_sessions -= 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"AssemblyAI session error: {type(e).__name__}: {e}")
+        finally:
+            self.ws = None
+            self.queue.clear()
+            self.closed.set()
+
+    async def _send_queued(self, ws):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.queue:
+                self.queue_ready.clear()
+                await self.queue_ready.wait()
+                continue
+            item = self.queue.popleft()
+            if item is _TERMINATE:
+                await ws.send(json.dumps({"type": "Terminate"}))
+                return
+            started = loop.time()
+            await ws.send(item)  # Waits while the socket's write buffer is full
+            waited = loop.time() - started
+            stt_stats.frames_sent += 1
+            if waited > SLOW_SEND:
+                stt_stats.slow_sends += 1
+            stt_stats.max_send_wait = max(stt_stats.max_send_wait, waited)
+
+    def on_message(self, message):
         try:
             data = json.loads(message)
             msg_type = data.get('type')
@@ -42,6 +200,7 @@ class AssemblySTT:
 
                 if formatted:
                     self.last_formatted_transcript = transcript
+                    self.end_of_turn_confidence = data.get('end_of_turn_confidence')
                     if transcript != self.current_transcript:
                         self.current_transcript = transcript
                         self.is_building_transcript = False
@@ -51,69 +210,16 @@ class AssemblySTT:
                         self.is_building_transcript = True
                         self.on_transcript_callback("__START_TRANSCRIPTION__")
                     self.current_transcript = transcript
+                    if data.get('end_of_turn') and transcript and self.on_end_of_turn_callback:
+                        self.on_end_of_turn_callback(transcript)
 
-        except json.JSONDecodeError as e:
-            print(f"Error decoding message: {e}")
-        except Exception as e:
-            print(f"Error handling message: {e}")
-
-    def on_error(self, ws, error):
-        print(f"WebSocket Error: {error}")
-        self.stop_event.set()
-
-    def on_close(self, ws, close_status_code, close_msg):
-        print(f"WebSocket Disconnected: Status={close_status_code}, Msg={close_msg}")
-        self.stop_event.set()
+            elif msg_type == "Begin":
+                self.began.set()
 
-    def on_open(self, ws):
-        print("WebSocket connection opened.")
-        print(f"Connected to: {self.api_endpoint}")
+            elif msg_type == "Termination":
+                self.terminated.set()
 
-        def stream_audio():
-            print("Starting audio streaming...")
-            while not self.stop_event.is_set():
-                try:
-                    # The audio data will be sent from the consumer
-                    time.sleep(0.01)  # Small sleep to prevent CPU overuse
-                except Exception as e:
-                    print(f"Error in audio streaming: {e}")
-                    break
-            print("Audio streaming stopped.")
-
-        self.audio_thread = threading.Thread(target=stream_audio)
-        self.audio_thread.daemon = True
-        self.audio_thread.start()
-
-    def start(self):
-        self.ws_app = websocket.WebSocketApp(
-            self.api_endpoint,
-            header={"Authorization": self.api_key},
-            on_open=self.on_open,
-            on_message=self.on_message,
-            on_error=self.on_error,
-            on_close=self.on_close,
-        )
-
-        # Run WebSocketApp in a separate thread
-        ws_thread = threading.Thread(target=self.ws_app.run_forever)
-        ws_thread.daemon = True
-        ws_thread.start()
-
-    def send_audio(self, audio_data):
-        if self.ws_app and self.ws_app.sock and self.ws_app.sock.connected:
-            try:
-                self.ws_app.send(audio_data, websocket.ABNF.OPCODE_BINARY)
-            except Exception as e:
-                print(f"Error sending audio data: {e}")
-
-    def stop(self):
-        self.stop_event.set()
-        if self.ws_app:
-            try:
-                terminate_message = {"type": "Terminate"}
-                self.ws_app.send(json.dumps(terminate_message))
-                time.sleep(1)  # Give a moment for messages to process
-            except Exception as e:
-                print(f"Error sending termination message: {e}")
-            finally:
-                self.ws_app.close()
+        except json.JSONDecodeError as e:
+            logger.warning(f"Error decoding AssemblyAI message: {e}")
+        except Exception as e:
+            logger.error(f"Error handling AssemblyAI message: {e}")
@@ -0,0 +1,82 @@
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # int16 mono PCM
+
+
+def frame_bytes_for(ms, sample_rate=SAMPLE_RATE):
+    """Size in bytes of ms milliseconds of int16 mono PCM"""
+    return sample_rate * BYTES_PER_SAMPLE * ms // 1000
+
+
+class PCMRingBuffer:
+    """
+    Preallocated ring buffer for inbound PCM that cuts it into fixed-size frames
+    without allocating per message.
+
+    Capacity is a whole number of frames and reads always advance by one frame, so
+    a frame never straddles the wrap point and is yielded as a memoryview into the
+    buffer's storage. A yielded frame is only valid until the next write(), so it
+    can be read in place but anything that keeps it (a send queue, another thread)
+    needs a copy.
+    """
+
+    def __init__(self, frame_bytes, capacity_frames=20):
+        self.frame_bytes = frame_bytes
+        self.capacity = frame_bytes * capacity_frames
+        self._buf = bytearray(self.capacity)
+        self._view = memoryview(self._buf)
+        self._read = 0
+        self._write = 0
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return self._write - self._read
+
+    def write(self, data):
+        data = memoryview(data).cast("B")
+        size = len(data)
+        if size >= self.capacity:
+            # Only the most recent audio matters; keep the tail that fits
+            self.dropped_bytes += len(self) + size - self.capacity
+            data = data[size - self.capacity:]
+            size = len(data)
+            self._read = self._write = 0
+
+        overflow = len(self) + size - self.capacity
+        if overflow > 0:
+            # Drop the oldest whole frames so reads stay frame aligned
+            drop = -(-overflow // self.frame_bytes) * self.frame_bytes
+            if drop >= len(self):
+                self.dropped_bytes += len(self)
+                self.clear()
+            else:
+                self._read += drop
+                self.dropped_bytes += drop
+
+        pos = self._write % self.capacity
+        first = min(size, self.capacity - pos)
+        self._view[pos:pos + first] = data[:first]
+        if first < size:
+            self._view[:size - first] = data[first:]
+        self._write += size
+
+    def frames(self):
+        """Yields every complete frame currently buffered as a memoryview"""
+        while len(self) >= self.frame_bytes:
+            pos = self._read % self.capacity
+            self._read += self.frame_bytes
+            yield self._view[pos:pos + self.frame_bytes]
+
+    def drain(self) -> bytes:
+        """Returns whatever is left, including a trailing partial frame, and empties the buffer"""
+        remaining = bytearray()
+        while len(self):
+            pos = self._read % self.capacity
+            size = min(len(self), self.capacity - pos)
+            remaining += self._view[pos:pos + size]
+            self._read += size
+        self.clear()
+        return bytes(remaining)
+
+    def clear(self):
+        # Reset to the start so frame reads stay aligned to the storage
+        self._read = self._write = 0
@@ -0,0 +1,50 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# Opus on the speech socket is optional: opuslib needs the system libopus, and
+# clients that don't offer it (or servers without it) stay on raw PCM
+try:
+    import opuslib  # type: ignore
+    OPUS_AVAILABLE = True
+except Exception as e:  # opuslib raises a plain Exception when libopus is missing
+    opuslib = None
+    OPUS_AVAILABLE = False
+    logger.info(f"Opus transport unavailable, speech audio stays PCM ({e})")
+
+OPUS_ENABLED = os.getenv('SPEECH_OPUS', 'true').lower() == 'true'
+OPUS_BITRATE = int(os.getenv('OPUS_BITRATE', '24000'))
+OPUS_FRAME_MS = (2.5, 5, 10, 20, 40, 60)  # Frame durations an Opus packet can hold
+OPUS_MAX_DECODE_SAMPLES = SAMPLE_RATE * 120 // 1000  # Largest packet is 120ms
+
+
+def negotiate_codec(offered, frame_ms):
+    """Picks the speech socket codec from what the client offered; PCM is always the fallback"""
+    if "opus" in (offered or []) and OPUS_ENABLED and OPUS_AVAILABLE and frame_ms in OPUS_FRAME_MS:
+        return "opus"
+    return "pcm"
+
+
+class OpusEncoder:
+    """Encodes one call's fixed-size outbound PCM frames to Opus packets"""
+
+    def __init__(self, frame_ms, bitrate=OPUS_BITRATE):
+        self.frame_samples = int(SAMPLE_RATE * frame_ms / 1000)
+        self.encoder = opuslib.Encoder(SAMPLE_RATE, 1, opuslib.APPLICATION_VOIP)
+        self.encoder.bitrate = bitrate
+
+    def encode(self, pcm):
+        return self.encoder.encode(pcm, self.frame_samples)
+
+
+class OpusDecoder:
+    """Decodes one call's inbound Opus packets to 16kHz int16 PCM"""
+
+    def __init__(self):
+        self.decoder = opuslib.Decoder(SAMPLE_RATE, 1)
+
+    def decode(self, packet):
+        return self.decoder.decode(packet, OPUS_MAX_DECODE_SAMPLES)
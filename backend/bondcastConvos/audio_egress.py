@@ -0,0 +1,170 @@
+import asyncio
+import os
+import struct
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+# Outbound audio goes out in fixed frames, paced so the client holds at most about
+# AUDIO_LEAD_MS of it. A stop_audio then only has that much left to throw away.
+AUDIO_FRAME_MS = min(max(int(os.getenv('AUDIO_FRAME_MS', '20')), 10), 200)
+AUDIO_LEAD_MS = max(int(os.getenv('AUDIO_LEAD_MS', '250')), AUDIO_FRAME_MS)
+
+# Initial guess at how far the client's playback trails the server's pacing clock
+# (network delay plus audio output start-up); audio_started acks refine it per call
+PLAYBACK_DELAY_MS = int(os.getenv('PLAYBACK_DELAY_MS', '100'))
+
+# Rough ElevenLabs speaking rate, for segments whose audio hasn't fully arrived yet
+BYTES_PER_CHAR_ESTIMATE = BYTES_PER_SECOND * 65 // 1000
+
+_SEQ_HEADER = struct.Struct("<I")
+
+
+class AudioEgress:
+    """
+    Paces one call's outbound PCM in real time and keeps track of what was heard.
+
+    Audio is cut into frames of AUDIO_FRAME_MS, the last one padded with silence.
+    Frames are Opus-encoded when the client negotiated it. When framed, each
+    frame is prefixed with its little-endian uint32 sequence
+    number, which the client echoes back so the played position is exact. Frames
+    are sent in bursts that top the client's buffer back up to AUDIO_LEAD_MS once
+    it has drained to half that.
+    """
+
+    def __init__(self, send, frame_ms=AUDIO_FRAME_MS, lead_ms=AUDIO_LEAD_MS):
+        self.send = send
+        self.frame_ms = frame_ms
+        self.frame_bytes = BYTES_PER_SECOND * frame_ms // 1000
+        self.lead = lead_ms / 1000
+        self.framed = False
+        self.encoder = None  # Set when the client negotiated Opus
+        self.seq = 0
+        self.play_until = 0.0
+        self.playback_delay = PLAYBACK_DELAY_MS / 1000
+        self.start_utterance()
+
+    def format(self):
+        return {
+            "framing": "seq" if self.framed else "none",
+            "codec": "opus" if self.encoder else "pcm",
+            "frame_ms": self.frame_ms,
+            "sample_rate": SAMPLE_RATE,
+        }
+
+    def start_utterance(self, on_first_frame=None):
+        self.on_first_frame = on_first_frame
+        self.first_seq = self.seq
+        self.pending = bytearray()
+        self.bytes_in = 0  # audio accepted for this utterance, sent or not
+        self.bytes_sent = 0
+        self.first_sent_at = None
+        self.segments = []  # (byte offset, text)
+        self.finished = False
+        self.stopped = None  # text heard, once stopped
+
+    def mark_segment(self, text):
+        """Called as the audio for a new text segment is about to start"""
+        self.segments.append((self.bytes_in, text))
+
+    async def write(self, chunk):
+        """Queues chunk and sends its full frames, waiting whenever the lead is used up"""
+        if self.stopped is not None:
+            return
+        self.pending += chunk
+        self.bytes_in += len(chunk)
+        while len(self.pending) >= self.frame_bytes:
+            frame = bytes(self.pending[:self.frame_bytes])
+            del self.pending[:self.frame_bytes]
+            await self._send_frame(frame)
+
+    async def flush(self):
+        """Pads and sends the final partial frame of the utterance"""
+        if self.stopped is not None:
+            return
+        self.finished = True
+        if not self.pending:
+            return
+        frame = bytes(self.pending) + bytes(self.frame_bytes - len(self.pending))
+        self.pending.clear()
+        await self._send_frame(frame)
+
+    async def _send_frame(self, frame):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self.play_until - now > self.lead:
+            # Client is fully topped up; wait until it has played half of its lead
+            await asyncio.sleep(self.play_until - now - self.lead / 2)
+            now = loop.time()
+        if self.encoder:
+            frame = self.encoder.encode(frame)
+        if self.framed:
+            frame = _SEQ_HEADER.pack(self.seq) + frame
+        await self.send(frame)
+        if not self.bytes_sent:
+            self.first_sent_at = now
+            if self.on_first_frame:
+                self.on_first_frame()
+        self.seq += 1
+        self.bytes_sent += self.frame_bytes
+        self.play_until = max(self.play_until, now) + self.frame_ms / 1000
+
+    def client_started(self):
+        """
+        The client reported that playback started. Half the time since the first
+        frame went out approximates how far its playback trails the pacing clock.
+        """
+        if self.first_sent_at is None:
+            return
+        sample = min(max(asyncio.get_running_loop().time() - self.first_sent_at, 0.0), 2.0) / 2
+        self.playback_delay = 0.7 * self.playback_delay + 0.3 * sample
+        self.first_sent_at = None  # One sample per utterance; later acks are playback gaps
+
+    def playback_end(self):
+        """Loop time at which the client should finish playing what has been sent"""
+        return self.play_until + self.playback_delay
+
+    def ack_grace(self):
+        """How long a stop_audio ack should take to come back"""
+        return min(2 * self.playback_delay + 0.05, 0.5)
+
+    def played_bytes(self):
+        """Audio of this utterance the client has played by now, by the pacing clock"""
+        unplayed = max(0.0, self.play_until - asyncio.get_running_loop().time())
+        return max(0, self.bytes_sent - int(unplayed * BYTES_PER_SECOND))
+
+    def stop(self):
+        """Stops the utterance and returns the text heard so far"""
+        if self.stopped is None:
+            self.stopped = self.text_through(self.played_bytes())
+            self.pending.clear()
+            self.play_until = 0.0
+        return self.stopped
+
+    def text_through_seq(self, seq):
+        """Text heard up to and including frame seq, or None if seq isn't in this utterance"""
+        if seq < self.first_seq or seq >= self.seq:
+            return None
+        return self.text_through((seq - self.first_seq + 1) * self.frame_bytes)
+
+    def text_through(self, played):
+        heard = []
+        for index, (start, text) in enumerate(self.segments):
+            if played <= start:
+                break
+            if index + 1 < len(self.segments):
+                end = self.segments[index + 1][0]
+            elif self.finished:
+                end = self.bytes_in
+            else:
+                end = max(self.bytes_in, start + len(text) * BYTES_PER_CHAR_ESTIMATE)
+            if played >= end:
+                heard.append(text)
+                continue
+            # Partly played segment: keep the words covered by the share of its audio
+            cut = int(len(text) * (played - start) / max(1, end - start))
+            space = text.rfind(" ", 0, cut + 1)
+            if space > 0:
+                heard.append(text[:space])
+            break
+        return " ".join(heard)
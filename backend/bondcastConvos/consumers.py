@@ -1,27 +1,39 @@
 import json, asyncio, logging
 from channels.generic.websocket import AsyncWebsocketConsumer  # type: ignore
 import time
-from vosk import Model, KaldiRecognizer  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
 from channels.db import database_sync_to_async  # type: ignore
 import groq  # type: ignore
-import instructor  # type: ignore
-from pydantic import BaseModel  # type: ignore
 from dotenv import load_dotenv  # type: ignore
 import os
 from pathlib import Path
-from elevenlabs import stream  # type: ignore
-from elevenlabs.client import ElevenLabs  # type: ignore
 import random
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
 from datetime import datetime, date
-from .assembly_stt import AssemblySTT
+from .assembly_stt import STT_TERMINATE_TIMEOUT
+from .audio_codec import OpusDecoder, OpusEncoder, negotiate_codec
+from .audio_egress import AudioEgress
+from .audio_buffer import PCMRingBuffer, frame_bytes_for
+from .conversation_history import ConversationHistory
+from .endpointing import endpointer
+from .speculative import SPECULATIVE_LLM, SpeculativeReply, speculation_stats
+from .speech_trace import SPEECH_TRACE_DIR, TraceRecorder
+from .stt_fallback import STT_FALLBACK, TranscriptHedge, fallback_stats
+from .stt_pool import stt_pool
+from .structured_stream import BondiResponseParser
+from .tts_cache import tts_cache
+from .tts_pipeline import TTSPipeline, chunk_text, chunk_text_stream
+from .turn_timers import TurnTimers
+from .vosk_pool import (
+    VOSK_BARGE_IN_GRAMMAR, VOSK_PRELOAD, barge_in_grammar, said_barge_in_phrase, vosk_barge_in_model, vosk_model,
+    vosk_pool,
+)
+from .vad import EnergyVAD
+from .voice_metrics import CallMetrics, loop_lag, voice_metrics
 from .responsePrompts import *
 from django.core.cache import cache  # type: ignore
 from typing import List
 
-executor = ThreadPoolExecutor(max_workers=2)  # Put globally
-
 # Load environment variables
 env_path = Path(__file__).resolve().parent.parent.parent / '.env'
 load_dotenv(env_path)
@@ -34,36 +46,64 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Adjust chunk size to be within AssemblyAI's requirements (50-1000ms)
-# For 16kHz audio, 800 samples = 50ms, 16000 samples = 1000ms
-# Let's use 3200 samples = 200ms to be safe
-CHUNK_SAMPLES = 3200  # 200ms of audio at 16kHz
-SILENCE_THRESHOLD = 0.5  # seconds of silence before processing
+# Inbound audio is cut into fixed frames for AssemblyAI and Vosk. AssemblyAI requires
+# 50-1000ms per message; 100ms of 16kHz int16 audio is 1600 samples / 3200 bytes
+FRAME_MS = min(max(int(os.getenv('SPEECH_FRAME_MS', '100')), 50), 1000)
+FRAME_BYTES = frame_bytes_for(FRAME_MS)
+SILENCE_THRESHOLD = 0.5  # seconds of silence before the max-duration line
 STREAM_TIMEOUT = 2  # seconds of silence before ending stream
 FIRST_TIMEOUT = 4
 SECOND_TIMEOUT = 1
 MAX_CALL_DURATION_TIME = 120
 
+# Fixed lines Bondi says on every call. Their audio is served from the TTS cache
+MAX_DURATION_LINE = "Sorry but I have to go right now. It was nice chatting and I will talk to you later."
+FIRST_TIMEOUT_LINE = "Are you still there?"
+FINAL_TIMEOUT_LINE = "Let's do this Bond Cast later."
+LLM_FALLBACK_LINE = "I'm having trouble processing that right now."
+CANNED_LINES = [MAX_DURATION_LINE, FIRST_TIMEOUT_LINE, FINAL_TIMEOUT_LINE, LLM_FALLBACK_LINE]
+
+# How long a call waits for a greeting render SetIntroView already started before
+# synthesizing the greeting itself
+GREETING_RENDER_WAIT = float(os.getenv('GREETING_RENDER_WAIT', '1.5'))
+
+# Barge-in is detected by the energy VAD within a frame of speech onset. Setting this
+# also requires a Vosk partial before Bondi is interrupted, at the cost of latency/CPU.
+BARGE_IN_VOSK_CONFIRM = os.getenv('BARGE_IN_VOSK_CONFIRM', 'false').lower() == 'true'
 
-# Initialize Vosk model
-model_path = "bondcastConvos/vosk-model-en-us-0.15"  # Path relative to backend directory
-vosk_stt_model = Model(model_path)
+# Small model that folds older turns into the running call summary, off the turn path
+HISTORY_SUMMARY_MODEL = os.getenv('HISTORY_SUMMARY_MODEL', 'llama-3.1-8b-instant')
 
-# Initialize ElevenLabs client
-api_key = os.getenv('ELEVENLABS_API_KEY')
-if not api_key:
-    raise ValueError("ELEVENLABS_API_KEY environment variable not set")
-elevenlabs = ElevenLabs(api_key=api_key)
+
+# A call runs at most one Vosk recognizer. The STT fallback needs the full model, whose
+# session then also confirms barge-in; barge-in alone can use a lighter model/grammar
+VOSK_CALL_MODEL = vosk_model if STT_FALLBACK else vosk_barge_in_model
+VOSK_CALL_GRAMMAR = barge_in_grammar() if VOSK_BARGE_IN_GRAMMAR and not STT_FALLBACK else None
+
+# The Vosk model is only needed for barge-in confirmation and the STT fallback. It loads
+# off the startup path so the process serves REST traffic meanwhile; calls before it's
+# ready use the VAD alone and AssemblyAI without a fallback
+if BARGE_IN_VOSK_CONFIRM or STT_FALLBACK:
+    if VOSK_PRELOAD:
+        VOSK_CALL_MODEL.load_now()
+    else:
+        VOSK_CALL_MODEL.warm()
 
  # Initialize Groq client with API key from .env
 groq_client = groq.Groq(api_key=os.getenv('GROQ_API_KEY'))
 
-# Initialize instructor client for structured responses
-groq_instructor_client = instructor.patch(groq.Groq(api_key=os.getenv('GROQ_API_KEY')))
+# Initialize async Groq client for voice turns. These run on the daphne event loop, so
+# the LLM call must be awaited rather than blocking the loop, and cancelling tts_llm_task
+# on barge-in aborts the in-flight HTTP request. The structured reply is parsed
+# incrementally by BondiResponseParser instead of going through instructor.
+groq_async_client = groq.AsyncGroq(api_key=os.getenv('GROQ_API_KEY'))
 
 User = get_user_model()
 
 class SpeechConsumer(AsyncWebsocketConsumer):
+    trace = None
+    hung_up = False
+
     async def connect(self):
         # Get username and Chat.tsx variant from URL
         self.username = self.scope['url_route']['kwargs']['username']
@@ -87,10 +127,24 @@ class SpeechConsumer(AsyncWebsocketConsumer):
         self.user_summary = user.user_summary
         
         logger.info(f"Connected user {self.firstname} with variant: {self.variant}")
+        self._loop = asyncio.get_running_loop()
+        self.playback_idle = asyncio.Event()
+        self.timer_action_task = None
+        self.tts_llm_task = None
+        self.tts_stream_task = None
+        self.turn_timers = TurnTimers(self._evaluate_turn_timers, self._loop)
+        self.call_metrics = CallMetrics(voice_metrics)
         self.start_call_time = time.time()
         self.last_baseline_audio_time = time.time()
-        self.buf = bytearray()
-        self.conversation_history = ""
+        self.last_voiced_time = self.last_baseline_audio_time
+        self.transcript_time = None
+        self.endpoint = None  # EndpointDecision for current_user_input
+        self.audio_buffer = PCMRingBuffer(FRAME_BYTES)
+        self.egress = AudioEgress(lambda frame: self.send(bytes_data=frame))
+        self.turn_end_handle = None
+        self.mic_decoder = None
+        self.history = ConversationHistory()
+        self.history_summary_task = None
         self.current_user_input = ""
         self.agent_last_response = ""
         self.incoming_tts = ""
@@ -103,34 +157,76 @@ class SpeechConsumer(AsyncWebsocketConsumer):
         self.user_age = (date.today().year - user.dob.year) - ((date.today().month, date.today().day) < (user.dob.month, user.dob.day))
         self.current_day = datetime.now().strftime("%A, %B %d")
         self.convo_llm_mode = "general"
-
-        # Initialize Vosk recognizer for partial transcription
-        self.vosk_stt_recognizer = KaldiRecognizer(vosk_stt_model, 16000)
+        self.llm_system_prompt = None
+        self.speculation = None
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+
+        # Energy VAD drives speech timing and barge-in directly from the audio frames
+        self.vad = EnergyVAD()
+
+        # Optional Vosk session, for barge-in confirmation and/or as a hedge against a
+        # slow or dead AssemblyAI session. Decoding runs on a pool worker pinned to this
+        # call; partials come back through _on_vosk_partial, finals to stt_hedge
+        self.vosk_session = None
+        self.stt_hedge = None
+        if (BARGE_IN_VOSK_CONFIRM or STT_FALLBACK) and VOSK_CALL_MODEL.ready:
+            on_final = None
+            if STT_FALLBACK:
+                self.stt_hedge = TranscriptHedge(self._loop, self._on_user_transcript, self._cloud_stt_healthy)
+                on_final = self.stt_hedge.on_vosk_final
+            self.vosk_session = vosk_pool.open_session(
+                VOSK_CALL_MODEL.model, 16000, self._on_vosk_partial, self._loop, on_final, VOSK_CALL_GRAMMAR,
+            )
+        elif BARGE_IN_VOSK_CONFIRM or STT_FALLBACK:
+            logger.info(f"Vosk model {VOSK_CALL_MODEL.state}, no Vosk barge-in confirmation or STT fallback for this call")
+        self.barge_in_vosk_confirm = BARGE_IN_VOSK_CONFIRM and self.vosk_session is not None
         self.vosk_partial_count = 0
 
-        # Initialize AssemblyAI STT
-        self.assembly_stt = AssemblySTT(self._transcribe)
-        self.assembly_stt.start()
-
-        # Start background tasks
-        self.silence_task = asyncio.create_task(self._check_silence_loop())
-        self.tts_llm_task = None
-        self.tts_stream_task = None
+        self.trace = TraceRecorder(SPEECH_TRACE_DIR, f"{self.username}-{int(time.time())}") if SPEECH_TRACE_DIR else None
 
         # Get greeting and contextual history from cache
         intro_cache_key = f'user_{self.user_id}_intro'
         bondcast_context_key = f'user_{self.user_id}_context'
 
         self.bondi_greeting = cache.get(intro_cache_key)
+        self.bondi_greeting_audio_key = cache.get(f'user_{self.user_id}_intro_audio')
         self.conversation_context = cache.get(bondcast_context_key) or ""
 
         # logger.info(f"Contextual History: {self.conversation_context}")
 
+        if self.trace:
+            self.trace.record(
+                "call", username=self.username, variant=self.variant, greeting=self.bondi_greeting,
+                context=self.conversation_context, user={
+                    "id": self.user_id, "firstname": self.firstname, "user_summary": self.user_summary,
+                    "dob": user.dob.isoformat(),
+                },
+            )
+
         # Don't start greeting immediately - wait for ready signal
         self.bondi_llm_triggered = True
 
+        self._start_providers()
+
+        # Silence/timeout checks are driven by state changes and deadlines, not polling
+        self.turn_timers.poke()
+
         # logger.info(f"WS connected for user: {self.firstname}")
 
+    def _start_providers(self):
+        # AssemblyAI STT, already connected if the pool had a session ready
+        self.assembly_stt = stt_pool.open(self._transcribe, self._on_end_of_turn if SPECULATIVE_LLM else None)
+
+        # Render the canned lines into the TTS cache in the background on the first call
+        tts_cache.ensure_prewarmed(CANNED_LINES)
+        loop_lag.ensure_running()
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        if self.trace:
+            self.trace.outbound(text_data, bytes_data)
+        await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+
     @database_sync_to_async
     def get_user_by_username(self, username):
         try:
@@ -146,123 +242,202 @@ class SpeechConsumer(AsyncWebsocketConsumer):
 
     def _transcribe(self, transcript):
         """Callback for handling transcripts from AssemblyAI"""
+        if self.trace:
+            confidence = getattr(self.assembly_stt, "end_of_turn_confidence", None)
+            self.trace.record("stt", event="transcript", text=transcript, confidence=confidence)
+        if self.hung_up:
+            # AssemblyAI flushing the last turn while the session tears down
+            if transcript and transcript != "__START_TRANSCRIPTION__":
+                logger.info(f"Final transcript after hang-up: {transcript}")
+            return
         if transcript == "__START_TRANSCRIPTION__":
             # logger.info(f"ASSEMBLY TRIGGERED TRANSCRIPTION")
+            self.call_metrics.mark("first_partial")
             self.transcribing_text = True
             self.streaming_text = False
             return
         elif transcript:
-            self.justCalled = False
-            self.passed_first_timeout = False
-            self.passed_second_timeout = False
-
-            # Cancel any ongoing LLM processing when new speech is detected
-            if self.tts_llm_task and not self.tts_llm_task.done():
-                self.tts_llm_task.cancel()
+            if self.stt_hedge and not self.stt_hedge.on_cloud_transcript(transcript):
+                # Vosk already supplied this utterance
+                self.transcribing_text = False
+                self.turn_timers.poke()
+                return
+            self._on_user_transcript(transcript, "assemblyai")
 
-            # Cancel any ongoing TTS streaming when new speech is detected
-            if self.tts_stream_task and not self.tts_stream_task.done():
-                self.tts_stream_task.cancel()
+    def _on_user_transcript(self, transcript, engine):
+        """A finished transcript of the user, from AssemblyAI or the Vosk fallback"""
+        if self.hung_up:
+            return
+        if self.trace:
+            self.trace.record("stt_engine", engine=engine, text=transcript)
+        self.call_metrics.mark("transcript")
+        self.justCalled = False
+        self.passed_first_timeout = False
+        self.passed_second_timeout = False
 
-            if self.current_user_input: self.current_user_input += " " + transcript
-            else: self.current_user_input = transcript
+        # Cancel any ongoing LLM processing when new speech is detected
+        if self.tts_llm_task and not self.tts_llm_task.done():
+            self.tts_llm_task.cancel()
 
-            # logger.info(f"TRANSCRIPTION: {transcript}")
-            self.transcribing_text = False
-            self.streaming_text = False
-            self.last_baseline_audio_time = time.time()
+        # Cancel any ongoing TTS streaming when new speech is detected
+        if self.tts_stream_task and not self.tts_stream_task.done():
+            self.tts_stream_task.cancel()
 
-    async def _check_silence_loop(self):
-        while True:
-            if self.transcribing_text:
-                await asyncio.sleep(0.1)
-                continue
-            current_time = time.time()
-            user_audio_delay = current_time - self.last_baseline_audio_time
-            total_call_time = time.time() - self.start_call_time
+        if self.current_user_input: self.current_user_input += " " + transcript
+        else: self.current_user_input = transcript
 
-            if user_audio_delay >= SILENCE_THRESHOLD and total_call_time > MAX_CALL_DURATION_TIME and not self.streaming_text and not self.transcribing_text: 
+        # logger.info(f"TRANSCRIPTION: {transcript}")
+        self.transcribing_text = False
+        self.last_baseline_audio_time = time.time()
+        self.transcript_time = self.last_baseline_audio_time
+        confidence = None
+        if engine == "assemblyai":
+            confidence = getattr(self.assembly_stt, "end_of_turn_confidence", None)
+        self.endpoint = endpointer.decide(self.current_user_input, confidence)
+        if self.trace:
+            self.trace.record("endpoint", cue=self.endpoint.cue, score=self.endpoint.score, delay=self.endpoint.delay)
+        self.streaming_text = False  # Also reschedules the turn timers
+
+    def _cloud_stt_healthy(self):
+        stt = getattr(self, "assembly_stt", None)
+        closed = getattr(stt, "closed", None)
+        return stt is not None and not (closed and closed.is_set())
+
+    @property
+    def streaming_text(self):
+        return self._streaming_text
+
+    @streaming_text.setter
+    def streaming_text(self, value):
+        # Mirror the flag into an Event so waiters don't have to poll it
+        self._streaming_text = value
+        if value:
+            self.playback_idle.clear()
+        else:
+            self.playback_idle.set()
+        self.turn_timers.poke()
+
+    async def _wait_playback_idle(self):
+        await self.playback_idle.wait()
+
+    def _evaluate_turn_timers(self):
+        """
+        Fires the silence, timeout and max-duration actions that are due and returns
+        when they should next be checked. Runs from TurnTimers on state changes.
+        """
+        if self.timer_action_task and not self.timer_action_task.done():
+            return None  # Re-evaluated once the action finishes
+        if self.transcribing_text:
+            return None  # Re-evaluated when the transcript arrives
+
+        current_time = time.time()
+        silence_at = self.last_baseline_audio_time + SILENCE_THRESHOLD
+        deadlines = []
+
+        if not self.streaming_text:
+            max_duration_at = max(silence_at, self.start_call_time + MAX_CALL_DURATION_TIME)
+            if current_time >= max_duration_at and current_time - self.start_call_time > MAX_CALL_DURATION_TIME:
                 self.call_is_ending = True  # Set this before streaming to prevent race conditions
                 self.streaming_text = True
-                timeout_response = "Sorry but I have to go right now. It was nice chatting and I will talk to you later."
-                await self._stream_tts(timeout_response)
-                # Connection will close when we receive audio_done
-                break
-
-            # Normal silence threshold check
-            if not self.bondi_llm_triggered and user_audio_delay >= SILENCE_THRESHOLD and self.current_user_input and not self.transcribing_text:
+                # Connection will close once the line has played
+                self.turn_timers.close()
+                self._start_timer_action(self._stream_tts(MAX_DURATION_LINE, cacheable=True))
+                return None
+            deadlines.append(max_duration_at)
+
+        # Answer once the user has been quiet for as long as the endpointer asked for
+        if not self.bondi_llm_triggered and self.current_user_input:
+            reply_at = silence_at
+            if self.endpoint:
+                reply_at = endpointer.reply_at(self.endpoint, self.last_voiced_time, self.transcript_time)
+            if current_time >= reply_at:
                 self.bondi_llm_triggered = True
                 self.tts_llm_task = asyncio.create_task(self._process_tts_llm())
+            else:
+                deadlines.append(reply_at)
 
+        if not self.current_user_input and not self.call_is_ending:
             # First timeout check
-            if not self.streaming_text and not self.bondi_llm_triggered and not self.passed_first_timeout and not self.call_is_ending and user_audio_delay >= FIRST_TIMEOUT and not self.current_user_input:
-                logger.info("first timeout request made")
-                first_timeout_response = "Are you still there?"
-                self.passed_first_timeout = True
-                await self._stream_tts(first_timeout_response)
-                # Wait for streaming to complete before continuing
-                while self.streaming_text:
-                    await asyncio.sleep(0.1)
-                continue  # Skip to next iteration to recheck conditions
+            if not self.passed_first_timeout:
+                if not self.streaming_text and not self.bondi_llm_triggered:
+                    first_timeout_at = self.last_baseline_audio_time + FIRST_TIMEOUT
+                    if current_time >= first_timeout_at:
+                        logger.info("first timeout request made")
+                        self.passed_first_timeout = True
+                        self._start_timer_action(self._say_and_wait(FIRST_TIMEOUT_LINE))
+                        return None
+                    deadlines.append(first_timeout_at)
 
             # Second timeout check
-            if self.passed_first_timeout and not self.passed_second_timeout and not self.call_is_ending and user_audio_delay >= SECOND_TIMEOUT and not self.current_user_input:
-                logger.info("second timeout request made")
-                self.passed_second_timeout = True
-                # second_timeout_response = "Hello? Are you still there?"
-                # await self._stream_tts(second_timeout_response)
-                # # Wait for streaming to complete before continuing
-                # while self.streaming_text:
-                #     await asyncio.sleep(0.1)
-                # continue  # Skip to next iteration to recheck conditions
+            elif not self.passed_second_timeout:
+                second_timeout_at = self.last_baseline_audio_time + SECOND_TIMEOUT
+                if current_time >= second_timeout_at:
+                    logger.info("second timeout request made")
+                    self.passed_second_timeout = True
+                else:
+                    deadlines.append(second_timeout_at)
 
             # Final timeout check
-            if self.passed_first_timeout and self.passed_second_timeout and not self.call_is_ending and user_audio_delay >= STREAM_TIMEOUT and not self.current_user_input:
-                self.call_is_ending = True  # Set this before streaming to prevent race conditions
-                self.streaming_text = True
-                timeout_response = "Let's do this Bond Cast later."
-                await self._stream_tts(timeout_response)
-                # Wait for streaming to complete before closing
-                while self.streaming_text:
-                    await asyncio.sleep(0.1)
-                await self.close(code=1000)  # Normal closure
-                break
+            if self.passed_first_timeout and self.passed_second_timeout:
+                final_timeout_at = self.last_baseline_audio_time + STREAM_TIMEOUT
+                if current_time >= final_timeout_at:
+                    self.call_is_ending = True  # Set this before streaming to prevent race conditions
+                    self.streaming_text = True
+                    self.turn_timers.close()
+                    self._start_timer_action(self._say_and_wait(FINAL_TIMEOUT_LINE, close=True))
+                    return None
+                deadlines.append(final_timeout_at)
 
-            await asyncio.sleep(0.1)
+        return min(deadlines) if deadlines else None
+
+    def _start_timer_action(self, coro):
+        self.timer_action_task = asyncio.create_task(coro)
+        self.timer_action_task.add_done_callback(lambda _: self.turn_timers.poke())
+
+    async def _say_and_wait(self, text, close=False):
+        await self._stream_tts(text, cacheable=True)
+        # Wait for streaming to complete before continuing
+        await self._wait_playback_idle()
+        if close:
+            await self.close(code=1000)  # Normal closure
 
     async def receive(self, text_data=None, bytes_data=None):
+        if self.trace:
+            self.trace.inbound(text_data, bytes_data)
         if text_data:
             try:
                 data = json.loads(text_data)
                 if data.get("type") == "ready_for_streaming":
                     self.ready_for_streaming = True
 
+                    # Clients that can strip frame headers get sequence-numbered frames
+                    capabilities = data.get("capabilities") or {}
+                    if capabilities.get("audio_frames"):
+                        self.egress.framed = True
+                    # Opus both ways where client and server support it, raw PCM otherwise
+                    if negotiate_codec(capabilities.get("codecs"), self.egress.frame_ms) == "opus":
+                        self.egress.encoder = OpusEncoder(self.egress.frame_ms)
+                        self.mic_decoder = OpusDecoder()
+                    await self.send(text_data=json.dumps({"type": "audio_format", **self.egress.format()}))
+
                     if self.variant == "default":
                         # Send start recording signal to frontend
                         await self.send(text_data=json.dumps({"type": "start_recording"}))
                         logger.info("Sent start_recording signal to frontend")
-                    # Now start the greeting
-                    await self._stream_tts(self.bondi_greeting)
+                    # Now start the greeting without blocking receive(), so barge-in
+                    # audio is still processed while Bondi is talking
+                    self.tts_stream_task = asyncio.create_task(self._stream_greeting())
                 elif data.get("type") == "audio_started":
                     # logger.info("Frontend started playing audio")
-                    self.streaming_text = True
+                    self.call_metrics.mark("client_audio_started")
+                    self.egress.client_started()
                 elif data.get("type") == "audio_done":
-                    self.streaming_text = False
-                    self.bondi_llm_triggered = False
-                    self.last_baseline_audio_time = time.time()
-                    if self.conversation_history: self.conversation_history += self.firstname + f": \"{self.current_user_input}\" "
-                    self.current_user_input = ""
-                    self.agent_last_response = self.incoming_tts
-                    self.conversation_history += "Bondi: " + f"\"{self.agent_last_response}\" "
-                    self.buf.clear()  # Just clear the buffer, no need to send to AssemblyAI
-                    # logger.info("Frontend finished playing audio")
-                    # Close connection if this was the final timeout message
-                    if self.call_is_ending:
-                        await self.close(code=1000)  # Normal closure
+                    self._on_client_audio_done(data.get("seq"))
                 elif data.get("type") == "audio_cleanup":
                     # logger.info("Frontend audio cleanup complete")
-                    self.streaming_text = False
                     self.bondi_llm_triggered = False
+                    self.streaming_text = False
+                self.turn_timers.poke()
                 return
             except Exception as e:
                 logger.warning(f"Invalid JSON from frontend: {e}")
@@ -270,66 +445,130 @@ class SpeechConsumer(AsyncWebsocketConsumer):
         if not bytes_data:
             return
 
-        # Add new audio data to buffer
-        self.buf.extend(bytes_data)
-
-        # Send chunks for transcription once we have enough data
-        if len(self.buf) >= CHUNK_SAMPLES:
-            chunk = self.buf[:CHUNK_SAMPLES]
-            del self.buf[:CHUNK_SAMPLES]
+        if self.mic_decoder:
+            try:
+                bytes_data = self.mic_decoder.decode(bytes_data)
+            except Exception as e:
+                logger.warning(f"Dropping undecodable Opus packet: {e}")
+                return
 
+        # Add new audio data to buffer and process every complete frame. AssemblyAI's
+        # send queue and the Vosk worker both hold frames past the next write, which
+        # would overwrite the ring buffer's view, so each frame is copied once and shared
+        self.audio_buffer.write(bytes_data)
+        for view in self.audio_buffer.frames():
+            frame = bytes(view)
             # Send to AssemblyAI for real transcription
-            self.assembly_stt.send_audio(bytes(chunk))
-            
-            # Process with Vosk for partial transcription
-            self.vosk_stt_recognizer.AcceptWaveform(bytes(chunk))
-            partial_result = json.loads(self.vosk_stt_recognizer.PartialResult())
-
-            if partial_result.get("partial"):
-                # logger.info(f"Vosk Partial Triggered!")
-                self.last_baseline_audio_time = time.time()
-                self.justCalled = False
-                self.passed_first_timeout = False
-                self.passed_second_timeout = False
-
-                if not self.streaming_text: self.vosk_partial_count = 0
-                
-                # If we're streaming audio, tell frontend to stop immediately
-                if self.streaming_text:
-                    self.vosk_partial_count += 1
-                    if self.vosk_partial_count >= 2:
-                        await self.send(text_data=json.dumps({"type": "stop_audio"}))
-                        self.streaming_text = False
-                        self.vosk_partial_count = 0
-  
-                # Cancel any ongoing LLM processing when new speech is detected
-                if self.tts_llm_task and not self.tts_llm_task.done():
-                    self.tts_llm_task.cancel()
-
-                # Cancel any ongoing TTS streaming when new speech is detected
-                if self.tts_stream_task and not self.tts_stream_task.done():
-                    self.tts_stream_task.cancel()
-                
-                self.vosk_stt_recognizer.Reset()  # Clear the recognizer's internal state
+            self.assembly_stt.send_audio(frame)
+
+            # Stricter VAD margin while Bondi is talking keeps echo from counting as speech
+            vad_result = self.vad.process(frame, barge_in=self.streaming_text)
+            if vad_result.voiced:
+                self._on_user_speech(barge_in=not self.barge_in_vosk_confirm)
+
+            # Queue for Vosk partial transcription off the event loop
+            if self.vosk_session:
+                self.vosk_session.accept(frame)
+
+    def _schedule_turn_end(self, at):
+        """Ends Bondi's turn at loop time at, when the client should be done playing"""
+        if self.turn_end_handle:
+            self.turn_end_handle.cancel()
+        self.turn_end_handle = self._loop.call_at(at, self._end_bondi_turn)
+
+    def _on_client_audio_done(self, seq):
+        # Turn-taking runs off the server's playback clock, so the client's ack can
+        # only end a turn early. Acks while audio is still going out are playback gaps.
+        if not self.turn_end_handle:
+            return
+        # Framed clients report the last frame they played, so history only gets
+        # the part of an interrupted reply that was heard
+        if isinstance(seq, int):
+            heard = self.egress.text_through_seq(seq)
+            if heard is not None:
+                self.incoming_tts = heard
+        self._end_bondi_turn()
+
+    def _end_bondi_turn(self):
+        """Bondi's audio has finished playing or was cut off; the turn goes back to the user"""
+        if self.turn_end_handle:
+            self.turn_end_handle.cancel()
+            self.turn_end_handle = None
+        self.streaming_text = False
+        self.bondi_llm_triggered = False
+        self.last_baseline_audio_time = time.time()
+        if self.history and self.current_user_input:
+            self.history.add(self.firstname, self.current_user_input)
+        self.current_user_input = ""
+        self.agent_last_response = self.incoming_tts
+        if self.agent_last_response:
+            self.history.add("Bondi", self.agent_last_response)
+        self._summarize_history()
+        self.audio_buffer.clear()  # Just clear the buffer, no need to send to AssemblyAI
+        # Close connection if this was the final timeout message
+        if self.call_is_ending:
+            asyncio.create_task(self.close(code=1000))  # Normal closure
+        self.turn_timers.poke()
+
+    def _on_user_speech(self, barge_in):
+        """Called for every frame the VAD classifies as user speech"""
+        self.last_baseline_audio_time = time.time()
+        self.last_voiced_time = self.last_baseline_audio_time
+        self.call_metrics.mark("last_user_audio")
+        self.justCalled = False
+        self.passed_first_timeout = False
+        self.passed_second_timeout = False
+        if barge_in:
+            self._barge_in()
+        self.turn_timers.poke()
+
+    def _barge_in(self):
+        # If we're streaming audio, tell frontend to stop immediately
+        if self.streaming_text:
+            self.incoming_tts = self.egress.stop()
+            asyncio.create_task(self.send(text_data=json.dumps({"type": "stop_audio"})))
+            self.streaming_text = False
+            if self.egress.bytes_sent:
+                self._schedule_turn_end(self._loop.time() + self.egress.ack_grace())
 
-    async def _process_tts_llm(self) -> None:
-        try:
-            self.bondi_llm_triggered = True
-            call_duration = time.time() - self.start_call_time
+        # Cancel any ongoing LLM processing when new speech is detected
+        if self.tts_llm_task and not self.tts_llm_task.done():
+            self.tts_llm_task.cancel()
 
-            logger.info(f"Entered TTS LLM Processing")
-            logger.info(f"Call Duration: {call_duration}")
-            logger.info(f"Agent Last Response: {self.agent_last_response}")
-            logger.info(f"Current User Input: {self.current_user_input}")
+        # Cancel any ongoing TTS streaming when new speech is detected
+        if self.tts_stream_task and not self.tts_stream_task.done():
+            self.tts_stream_task.cancel()
+
+    def _on_vosk_partial(self, partial_result):
+        """Runs on the event loop whenever the Vosk worker produces a non-empty partial"""
+        # logger.info(f"Vosk Partial Triggered!")
+        if self.stt_hedge:
+            self.stt_hedge.on_vosk_partial()
+        if not self.barge_in_vosk_confirm:
+            return
+        if not self.streaming_text: self.vosk_partial_count = 0
+
+        # While Bondi is talking, a control phrase ("stop", "wait", ...) or two partials
+        # confirm a barge-in
+        if self.streaming_text and not said_barge_in_phrase(partial_result.get("partial", "")):
+            self.vosk_partial_count += 1
+            if self.vosk_partial_count < 2:
+                return
+            self.vosk_partial_count = 0
+
+        self._on_user_speech(barge_in=True)
 
-            llm_tts_system_context = f"""You are Bondi, a fun, casual AI podcast co-host for Bondiver. 
+    def _llm_system_prompt_parts(self):
+        """Static text around the call history, formatted once per call instead of every turn"""
+        head = f"""You are Bondi, a fun, casual AI podcast co-host for Bondiver. 
                 You're in the middle of a 1-minute BondCast voice conversation with a user named {self.firstname}. 
                 If the call duration is nearing 1 minute, you should wrap up the convo and prepare your last message,
                 Your job is to keep the convo light, entertaining, and podcast-like. 
                 Speak naturally, as if you're chatting in a voice memo.
 
                 Here's the conversation history so far:
-                {self.conversation_history}
+                """
+        tail = f"""
 
                 Respond to {self.firstname} in a warm and expressive voice line. 
                 Make sure to include a fun entertaining thoughtful
@@ -339,116 +578,321 @@ class SpeechConsumer(AsyncWebsocketConsumer):
                 If {self.firstname} seems like they want to stop talking or if 
                 the call is nearing 1 minute, that is also a signal to end the call.
 
-                Return a JSON object with:
+                Return only a JSON object with these keys, in this order:
                 - bondi_response: your message
                 - end_call: true if this is the final message of the BondCast, false otherwise
             """
+        return head, tail
 
-            llm_tts_input = f"""{self.firstname} just said: {self.current_user_input}
-                Your last message was: {self.agent_last_response}
-
-                Call duration so far: {time.time() - self.start_call_time:.2f} seconds
-
-                Decide whether to keep the convo going or wrap it up based on tone and time. 
-                Keep it entertaining, interesting, casual, and voice-message styled.
+    def _summarize_history(self):
+        # Only one summary pass at a time; turns folded meanwhile wait for the next one
+        if not self.history.needs_summary:
+            return
+        if self.history_summary_task and not self.history_summary_task.done():
+            return
+        self.history_summary_task = asyncio.create_task(self.history.summarize(self._history_summary))
+
+    async def _history_summary(self, summary, transcript):
+        response = await groq_async_client.chat.completions.create(
+            model=HISTORY_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": "You keep a running summary of a voice call between Bondi, an AI podcast co-host, "
+                    f"and {self.firstname}. Merge the new lines into the summary. Keep names, facts, opinions and open questions. "
+                    "Reply with the updated summary only, in at most 3 short sentences."},
+                {"role": "user", "content": f"Summary so far: {summary or '(none)'}\n\nNew lines: {transcript}"},
+            ],
+            temperature=0.2,
+            max_completion_tokens=120,
+        )
+        return response.choices[0].message.content or ""
+
+    def _llm_messages(self, user_input):
+        if self.llm_system_prompt is None:
+            self.llm_system_prompt = self._llm_system_prompt_parts()
+        prompt_head, prompt_tail = self.llm_system_prompt
+        llm_tts_system_context = prompt_head + self.history.render() + prompt_tail
+
+        llm_tts_input = f"""{self.firstname} just said: {user_input}
+            Your last message was: {self.agent_last_response}
+
+            Call duration so far: {time.time() - self.start_call_time:.2f} seconds
+
+            Decide whether to keep the convo going or wrap it up based on tone and time. 
+            Keep it entertaining, interesting, casual, and voice-message styled.
+
+            Return a JSON object with:
+            - bondi_response: your message
+            - end_call: true if this is the final message of the BondCast, false otherwise
+        """
+
+        return [
+            {"role": "system", "content": llm_tts_system_context},
+            {"role": "user", "content": llm_tts_input}
+        ]
 
-                Return a JSON object with:
-                - bondi_response: your message
-                - end_call: true if this is the final message of the BondCast, false otherwise
-            """
+    async def _process_tts_llm(self) -> None:
+        try:
+            self.bondi_llm_triggered = True
+            call_duration = time.time() - self.start_call_time
 
-            class BondiResponse(BaseModel):
-                bondi_response: str
-                end_call: bool
+            logger.info(f"Entered TTS LLM Processing")
+            logger.info(f"Call Duration: {call_duration}")
+            logger.info(f"Agent Last Response: {self.agent_last_response}")
+            logger.info(f"Current User Input: {self.current_user_input}")
+            logger.info(f"History Tokens: {self.history.tokens}")
 
-            # Get groq response with proper exception handling
-            try:
-                response = groq_instructor_client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",  
-                    response_model=BondiResponse,
-                    messages=[
-                        {"role": "system", "content": llm_tts_system_context},
-                        {"role": "user", "content": llm_tts_input}
-                    ],
-                    stream=False,  
-                    temperature=0.9,
-                    max_completion_tokens=300,
-                )
-                
-                # Extract the structured response content
-                llm_response = response.bondi_response
-                end_call = response.end_call
-
-                logger.info(f"Bondi Response: {llm_response}")
-                logger.info(f"End Call Boolean: {end_call}")
+            # Stream the reply and cut it into sentence/clause segments so TTS can start
+            # on the first sentence while the rest of the response is still generating
+            self.bondi_end_call = False
+            self.call_metrics.mark("llm_request")
+            segments = chunk_text_stream(self._bondi_reply_deltas(self._take_speculation()))
+            first_segment = await anext(segments, None)
 
-            except Exception as e:
-                logger.error(f"Error calling Groq API: {str(e)}")
-                logger.error(f"Error type: {type(e).__name__}")
-                logger.error(f"Full error details: {repr(e)}")
-                
-                # Fallback response
-                llm_response = "I'm having trouble processing that right now."
-                end_call = True
-
-            if self.transcribing_text:
+            if self.transcribing_text or first_segment is None:
+                await segments.aclose()
                 self.bondi_llm_triggered = False
+                self.turn_timers.poke()
                 # logger.info(f"Bondi Silence: LLM TTS Response Getting Rejected bc transcribing_text is True")
                 return
 
-            elif end_call:
-                logger.info(f"Last Response: {llm_response}")
-                self.call_is_ending = True  # Set this before streaming to prevent race conditions
-                self.streaming_text = True
-                await self._stream_tts(llm_response)
+            logger.info(f"LLM TTS Response Getting Accepted, first segment: {first_segment}")
+            await self._speak(self._prepend_segment(first_segment, segments))
+
+            logger.info(f"Bondi Response: {self.incoming_tts}")
+            logger.info(f"End Call Boolean: {self.bondi_end_call}")
+
+            if self.bondi_end_call:
                 # Wait for streaming to complete before closing
-                while self.streaming_text:
-                    await asyncio.sleep(0.1)
+                await self._wait_playback_idle()
                 await self.close(code=1000)  # Normal closure
-                return
-            else:
-                logger.info(f"LLM TTS Response Getting Accepted with following response: {llm_response}")
-                self.tts_stream_task = asyncio.create_task(self._stream_tts(llm_response))
 
         except asyncio.CancelledError:
             self.bondi_llm_triggered = False
+            self.turn_timers.poke()
             # logger.info("TTS LLM processing was cancelled mid-flight")
             return
-        
+        except Exception as e:
+            # Failures once audio is flowing are handled in _speak; this is the LLM
+            # failing before the first segment, so nothing of this reply was said
+            logger.error(f"Reply generation failed: {type(e).__name__}: {e}")
+            self.incoming_tts = ""
+            self._abandon_reply()
+
+    def _on_end_of_turn(self, transcript):
+        if self.trace:
+            self.trace.record("stt", event="end_of_turn", text=transcript)
+        if self.hung_up:
+            return
+        self._speculate(transcript)
 
-    async def _stream_tts(self, tts_text):
+    def _speculate(self, transcript):
+        """Starts generating a reply from the end-of-turn partial while the turn is confirmed"""
+        if self.bondi_llm_triggered or self.call_is_ending or self.streaming_text:
+            return
+        user_input = f"{self.current_user_input} {transcript}".strip()
+        if self.speculation:
+            if self.speculation.matches(user_input):
+                return
+            self.speculation.cancel()
+        speculation_stats.record_start()
+        self.speculation = SpeculativeReply(user_input, self._groq_completion_deltas(self._llm_messages(user_input)))
+
+    def _take_speculation(self):
+        """Returns the speculative completion if it matches the final transcript, otherwise a fresh one"""
+        speculation, self.speculation = self.speculation, None
+        if speculation:
+            if speculation.matches(self.current_user_input):
+                saved = speculation.head_start()
+                self.speculation_hits += 1
+                speculation_stats.record(hit=True, saved=saved)
+                logger.info(f"Speculative reply kept, {1000 * saved:.0f}ms head start")
+                return speculation.replay()
+            speculation.cancel()
+            self.speculation_misses += 1
+            speculation_stats.record(hit=False)
+            logger.info(f"Speculative reply discarded, transcript changed: {speculation.transcript!r}")
+        return self._groq_completion_deltas(self._llm_messages(self.current_user_input))
+
+    async def _groq_completion_deltas(self, messages):
+        request_id = self.trace.new_id() if self.trace else None
+        if self.trace:
+            self.trace.record("llm_request", id=request_id, prompt=messages[-1]["content"])
+        response_stream = await groq_async_client.chat.completions.create(
+            model="llama-3.3-70b-versatile",
+            messages=messages,
+            stream=True,
+            temperature=0.9,
+            max_completion_tokens=300,
+        )
+        async for chunk in response_stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content or ""
+                if self.trace:
+                    self.trace.record("llm_delta", id=request_id, text=delta)
+                yield delta
+        if self.trace:
+            self.trace.record("llm_end", id=request_id)
+
+    async def _bondi_reply_deltas(self, completion):
+        """Yields newly generated bondi_response text as the JSON completion streams in"""
+        parser = BondiResponseParser()
         try:
-            self.incoming_tts = tts_text
-            # logger.info(f"Entered TTS streaming mode")
+            async with aclosing(completion):
+                async for delta in completion:
+                    if delta and not parser.raw:
+                        self.call_metrics.mark("llm_first_token")
+                    text = parser.feed(delta)
+                    if parser.end_call and not self.bondi_end_call:
+                        self._mark_call_ending()
+                    if text:
+                        yield text
+
+            self.call_metrics.mark("llm_done")
+
+            # Malformed or truncated output is salvaged locally instead of re-requested
+            recovered = parser.finish()
+            if parser.malformed or recovered:
+                logger.warning(f"Malformed Bondi response, falling back to unstructured read: {parser.raw}")
+            if parser.end_call and not self.bondi_end_call:
+                self._mark_call_ending()
+            if recovered:
+                yield recovered
+            if not parser.response_text.strip():
+                raise ValueError("Groq returned an empty bondi_response")
+
+        except Exception as e:
+            logger.error(f"Error calling Groq API: {str(e)}")
+            logger.error(f"Error type: {type(e).__name__}")
+            logger.error(f"Full error details: {repr(e)}")
+
+            # Fallback response, only if nothing has been spoken yet
+            if not parser.response_text.strip():
+                self._mark_call_ending()
+                yield LLM_FALLBACK_LINE
+
+    def _mark_call_ending(self):
+        self.bondi_end_call = True
+        self.call_is_ending = True  # Set this before the last audio goes out to prevent race conditions
+        self.streaming_text = True
 
-            def stream_chunks_sync():
-                return list(elevenlabs.text_to_speech.stream(
-                    text=tts_text,
-                    voice_id=os.getenv('ELEVENLABS_VOICE_ID'),
-                    model_id="eleven_flash_v2",
-                    output_format="pcm_16000"
-                ))
-            
-            # zGjIP4SZlMnY9m93k97r (Another Voice Id to try out)
+    @staticmethod
+    async def _prepend_segment(first_segment, segments):
+        yield first_segment
+        async with aclosing(segments):
+            async for segment in segments:
+                yield segment
+
+    async def _stream_tts(self, tts_text, cacheable=False):
+        if cacheable:
+            # Spoken as one segment so the whole line is a single cache entry
+            await self._speak(self._single_segment(tts_text), cacheable=True)
+        else:
+            await self._speak(chunk_text(tts_text))
+
+    def _tts_synthesizer(self, cacheable):
+        # Canned lines are stored in the TTS cache; one-off LLM text is only looked up
+        return tts_cache.synthesize if cacheable else tts_cache.lookup_or_stream
+
+    async def _stream_greeting(self):
+        if not self.bondi_greeting_audio_key or self.bondi_greeting_audio_key != tts_cache.key(self.bondi_greeting):
+            await self._stream_tts(self.bondi_greeting)
+            return
 
-            audio_chunks = await asyncio.get_event_loop().run_in_executor(executor, stream_chunks_sync)
+        # SetIntroView pre-renders the greeting into the TTS cache. If that render is
+        # still running in this process, wait for it rather than synthesizing twice
+        pending = tts_cache.background_render(self.bondi_greeting_audio_key)
+        if pending is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(pending)), GREETING_RENDER_WAIT)
+            except asyncio.CancelledError:
+                self.bondi_llm_triggered = False
+                self.streaming_text = False
+                return
+            except Exception as e:
+                logger.info(f"Pre-rendered greeting not available ({type(e).__name__}), synthesizing live")
+        await self._stream_tts(self.bondi_greeting, cacheable=True)
 
-            for chunk in audio_chunks:
-                await self.send(bytes_data=chunk)
+    @staticmethod
+    async def _single_segment(text):
+        yield text
+
+    async def _speak(self, segments, cacheable=False):
+        try:
+            self.incoming_tts = ""
+            # logger.info(f"Entered TTS streaming mode")
+
+            def on_first_sent():
+                self.call_metrics.mark("first_audio_sent")
+                self.streaming_text = True  # The client starts playing as soon as audio arrives
+
+            self.egress.start_utterance(on_first_sent)
+
+            def on_segment(text):
+                self.incoming_tts = f"{self.incoming_tts} {text}".strip()
+                self.egress.mark_segment(text)
+
+            synthesize = self._tts_synthesizer(cacheable)
+            first_byte = False
+
+            async def timed_synthesize(text, previous_text):
+                nonlocal first_byte
+                request_id = self.trace.new_id() if self.trace else None
+                if self.trace:
+                    self.trace.record("tts_request", id=request_id, text=text)
+                async for chunk in synthesize(text, previous_text):
+                    if not first_byte:
+                        first_byte = True
+                        self.call_metrics.mark("tts_first_byte")
+                    if self.trace:
+                        self.trace.record("tts_chunk", id=request_id, size=len(chunk))
+                    yield chunk
+
+            # Segments synthesize concurrently and their audio is forwarded in order.
+            # The egress paces it, so sending waits while the client's buffer is full
+            await TTSPipeline(self.egress.write, on_segment=on_segment, synthesize=timed_synthesize).run(segments)
+            await self.egress.flush()
+            # The pacing clock knows when the client will run out of audio
+            self._schedule_turn_end(self.egress.playback_end())
 
             self.last_baseline_audio_time = time.time()
+            self.turn_timers.poke()
             # logger.info("ElevenLabs Speech Ended; Last Audio Set!")
 
         except asyncio.CancelledError:
             self.bondi_llm_triggered = False
             # logger.info("TTS streaming was cancelled mid-flight")
+            # Only what the client has played so far goes into the history
+            self.incoming_tts = self.egress.stop()
             # Tell frontend to stop playing audio and recording
             await self.send(text_data=json.dumps({"type": "stop_audio"}))
             self.streaming_text = False
+            if self.egress.bytes_sent:
+                # Give the client's ack, which has the exact frame it stopped at, a moment
+                self._schedule_turn_end(self._loop.time() + self.egress.ack_grace())
             return
+        except Exception as e:
+            # A provider error (ElevenLabs, or Groq mid-reply) would otherwise kill the
+            # task with Bondi's turn never ending, leaving the call silent
+            logger.error(f"TTS streaming failed: {type(e).__name__}: {e}")
+            self.incoming_tts = self.egress.stop()
+            try:
+                await self.send(text_data=json.dumps({"type": "stop_audio"}))
+            except Exception:
+                pass  # Connection might already be closed
+            self._abandon_reply()
+
+    def _abandon_reply(self):
+        """Hands the turn back to the user after a reply failed, keeping what was heard"""
+        self.streaming_text = False
+        # bondi_llm_triggered stays set until the turn ends (and clears it), or the
+        # timers would re-send the same input straight into the failing provider
+        grace = self.egress.ack_grace() if self.egress.bytes_sent else 0.0
+        self._schedule_turn_end(self._loop.time() + grace)
+        self.turn_timers.poke()
 
 
     async def disconnect(self, code):
+        self.hung_up = True
         # Ensure recording is stopped when disconnecting (only in general mode)
         if self.variant == "default":
             try:
@@ -457,20 +901,57 @@ class SpeechConsumer(AsyncWebsocketConsumer):
                 pass  # Connection might already be closed
         
         await self._flush()
-        if self.silence_task and not self.silence_task.done():
-            self.silence_task.cancel()
+        self.turn_timers.close()
+        if self.turn_end_handle:
+            self.turn_end_handle.cancel()
+        if self.timer_action_task and not self.timer_action_task.done():
+            self.timer_action_task.cancel()
         if self.tts_llm_task and not self.tts_llm_task.done():
             self.tts_llm_task.cancel()
 
         if self.tts_stream_task and not self.tts_stream_task.done():
             self.tts_stream_task.cancel()
 
+        if self.history_summary_task and not self.history_summary_task.done():
+            self.history_summary_task.cancel()
+
+        if self.speculation:
+            self.speculation.cancel()
+        if SPECULATIVE_LLM:
+            logger.info(f"Speculation this call: {self.speculation_hits} kept, {self.speculation_misses} discarded; "
+                        f"process totals: {speculation_stats.snapshot()}")
+
+        self.call_metrics.finish()
+        logger.info(f"Call latency summary: {self.call_metrics.summary()}")
+
         if self.assembly_stt:
-            self.assembly_stt.stop()
+            self.assembly_stt.stop()  # Terminates in the background; doesn't wait
+
+        if self.vosk_session:
+            self.vosk_session.close()
+
+        if self.stt_hedge:
+            self.stt_hedge.close()
+            logger.info(f"Transcripts this call by engine: {dict(self.stt_hedge.wins)}; "
+                        f"process totals: {fallback_stats.snapshot()}")
+
+        if self.trace:
+            self.trace.record("disconnect", code=code)
+            asyncio.create_task(self._save_trace())
 
         logger.info("WS closed")
 
+    async def _save_trace(self):
+        # Written once the STT session has closed, so its final transcripts are included
+        closed = getattr(self.assembly_stt, "closed", None)
+        if closed is not None:
+            try:
+                await asyncio.wait_for(closed.wait(), STT_TERMINATE_TIMEOUT + 1)
+            except asyncio.TimeoutError:
+                pass
+        path = await asyncio.to_thread(self.trace.save)
+        logger.info(f"Call trace written to {path}")
+
     async def _flush(self):
-        if self.buf:
-            self.assembly_stt.send_audio(bytes(self.buf))
-            self.buf.clear()
\ No newline at end of file
+        if len(self.audio_buffer):
+            self.assembly_stt.send_audio(self.audio_buffer.drain())
\ No newline at end of file
@@ -0,0 +1,125 @@
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens spent on the call transcript. Recent turns stay verbatim; older ones are
+# folded into a running summary once the verbatim part goes over budget.
+HISTORY_TOKEN_BUDGET = int(os.getenv('VOICE_HISTORY_TOKEN_BUDGET', '500'))
+HISTORY_KEEP_RECENT_TURNS = int(os.getenv('VOICE_HISTORY_KEEP_RECENT_TURNS', '4'))
+SUMMARY_TOKEN_BUDGET = int(os.getenv('VOICE_HISTORY_SUMMARY_TOKENS', '120'))
+DIGEST_WORDS = 20
+
+
+def estimate_tokens(text):
+    """Rough Llama token count; English averages about 4 characters per token"""
+    return max(1, math.ceil(len(text) / 4))
+
+
+@dataclass
+class Turn:
+    speaker: str
+    text: str
+    tokens: int
+    rendered: str
+
+
+class ConversationHistory:
+    """
+    Turn list for a voice call with per-turn token counts and a token budget.
+
+    The rendered transcript is cached and extended as turns are added, so building
+    a prompt doesn't re-format the whole call every turn. When the verbatim turns
+    go over budget the oldest are folded out: a short extractive digest stands in
+    for them immediately, and summarize() later replaces the digests with an LLM
+    summary without blocking the turn.
+    """
+
+    def __init__(self, budget_tokens=HISTORY_TOKEN_BUDGET, keep_recent_turns=HISTORY_KEEP_RECENT_TURNS):
+        self.budget_tokens = budget_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.turns: List[Turn] = []
+        self.verbatim_tokens = 0
+        self.summary = ""
+        self.unsummarized: List[Turn] = []
+        self._rendered_turns = ""
+        self._rendered = None
+
+    def __bool__(self):
+        return bool(self.turns or self.summary or self.unsummarized)
+
+    def add(self, speaker, text):
+        rendered = f"{speaker}: \"{text}\""
+        turn = Turn(speaker, text, estimate_tokens(rendered), rendered)
+        self.turns.append(turn)
+        self.verbatim_tokens += turn.tokens
+        self._rendered_turns = f"{self._rendered_turns} {rendered}" if self._rendered_turns else rendered
+        self._rendered = None
+        self._fold()
+
+    @property
+    def needs_summary(self):
+        return bool(self.unsummarized)
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.render()) if self else 0
+
+    def render(self) -> str:
+        if self._rendered is None:
+            parts = []
+            earlier = self._summary_text()
+            if earlier:
+                parts.append(f"(Earlier in the call: {earlier})")
+            if self._rendered_turns:
+                parts.append(self._rendered_turns)
+            self._rendered = " ".join(parts)
+        return self._rendered
+
+    async def summarize(self, summarizer: Callable[[str, str], Awaitable[str]]):
+        """Folds the pending turns into the running summary using summarizer(summary, transcript)"""
+        pending = list(self.unsummarized)
+        if not pending:
+            return
+        transcript = " ".join(turn.rendered for turn in pending)
+        try:
+            summary = (await summarizer(self.summary, transcript)).strip()
+        except Exception as e:
+            logger.warning(f"History summarization failed, keeping digests: {e}")
+            return
+        if not summary:
+            return
+        # Turns folded while the summarizer ran stay pending for the next pass
+        del self.unsummarized[:len(pending)]
+        self.summary = self._clip(summary, SUMMARY_TOKEN_BUDGET)
+        self._rendered = None
+
+    def _fold(self):
+        folded = False
+        while self.verbatim_tokens > self.budget_tokens and len(self.turns) > self.keep_recent_turns:
+            turn = self.turns.pop(0)
+            self.verbatim_tokens -= turn.tokens
+            self.unsummarized.append(turn)
+            folded = True
+        if folded:
+            self._rendered_turns = " ".join(turn.rendered for turn in self.turns)
+            self._rendered = None
+
+    def _summary_text(self):
+        digests = []
+        for turn in self.unsummarized:
+            words = turn.text.split()
+            digest = " ".join(words[:DIGEST_WORDS]) + ("..." if len(words) > DIGEST_WORDS else "")
+            digests.append(f"{turn.speaker}: {digest}")
+        text = " ".join(part for part in [self.summary, *digests] if part)
+        return self._clip(text, SUMMARY_TOKEN_BUDGET, keep_end=True)
+
+    @staticmethod
+    def _clip(text, max_tokens, keep_end=False):
+        max_chars = max_tokens * 4
+        if len(text) <= max_chars:
+            return text
+        return "..." + text[-max_chars:] if keep_end else text[:max_chars] + "..."
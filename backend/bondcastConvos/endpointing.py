@@ -0,0 +1,98 @@
+import os
+import re
+from dataclasses import dataclass
+
+# Silence after the user's last voiced audio before a finished transcript is answered.
+# Clearly complete utterances wait ENDPOINT_MIN_SILENCE, ones that trail off mid-thought
+# ("and", "um", a comma) wait ENDPOINT_MAX_SILENCE, and ones with no cue either way
+# ENDPOINT_BASE_SILENCE.
+ENDPOINT_MIN_SILENCE = float(os.getenv('ENDPOINT_MIN_SILENCE', '0.25'))
+ENDPOINT_BASE_SILENCE = float(os.getenv('ENDPOINT_BASE_SILENCE', '0.5'))
+ENDPOINT_MAX_SILENCE = float(os.getenv('ENDPOINT_MAX_SILENCE', '1.5'))
+
+# Roughly how long after the user stops talking AssemblyAI's formatted turn lands.
+# Silence is counted from no earlier than this before the transcript arrived, so a
+# VAD that missed the end of speech can't make the reply early.
+ENDPOINT_STT_LAG = float(os.getenv('ENDPOINT_STT_LAG', '0.4'))
+
+# How much AssemblyAI's end_of_turn_confidence counts against the transcript cues
+ENDPOINT_CONFIDENCE_WEIGHT = min(max(float(os.getenv('ENDPOINT_CONFIDENCE_WEIGHT', '0.3')), 0.0), 1.0)
+
+# Last words that mean the user is probably not done: conjunctions, fillers, articles
+# and the like. Questions are exempt ("What are you talking about?").
+# ENDPOINT_HOLD_WORDS adds to them (comma separated).
+HOLD_WORDS = {
+    "and", "but", "or", "so", "because", "cause", "if", "although",
+    "um", "uh", "uhm", "er", "erm", "like",
+    "the", "a", "an", "my", "your", "our", "their",
+    "to", "with", "from", "into", "i", "i'm",
+}
+HOLD_WORDS |= {word.strip().lower() for word in os.getenv('ENDPOINT_HOLD_WORDS', '').split(",") if word.strip()}
+
+_LAST_WORD = re.compile(r"([\w']+)\W*$")
+
+# Completeness of the transcript's ending, by cue
+CUE_SCORES = {"hold": 0.0, "none": 0.5, "statement": 0.8, "question": 1.0}
+
+
+@dataclass
+class EndpointDecision:
+    cue: str  # what the transcript's ending looked like, a CUE_SCORES key
+    score: float  # 0 clearly unfinished, 1 clearly finished
+    delay: float  # seconds of silence to wait for
+
+
+class Endpointer:
+    """
+    Decides how long to wait before answering a finished transcript.
+
+    The transcript's ending and AssemblyAI's end-of-turn confidence are combined
+    into a completeness score, which picks the silence to wait for between the
+    min and max; a score of 0.5 waits the base silence. The silence itself is
+    measured from the VAD's last voiced frame.
+    """
+
+    def __init__(self, min_silence=ENDPOINT_MIN_SILENCE, base_silence=ENDPOINT_BASE_SILENCE,
+                 max_silence=ENDPOINT_MAX_SILENCE, stt_lag=ENDPOINT_STT_LAG,
+                 confidence_weight=ENDPOINT_CONFIDENCE_WEIGHT, hold_words=HOLD_WORDS):
+        self.min_silence = min_silence
+        self.base_silence = max(base_silence, min_silence)
+        self.max_silence = max(max_silence, self.base_silence)
+        self.stt_lag = stt_lag
+        self.confidence_weight = confidence_weight
+        self.hold_words = hold_words
+
+    def cue(self, transcript):
+        text = transcript.rstrip()
+        if not text:
+            return "none"
+        if text.endswith((",", "-", "...", "…", ":", ";")):
+            return "hold"
+        if text.endswith("?"):
+            return "question"
+        match = _LAST_WORD.search(text)
+        if match and match.group(1).lower() in self.hold_words:
+            # Formatting ends most turns with a period, so the last word decides
+            return "hold"
+        if text.endswith((".", "!")):
+            return "statement"
+        return "none"
+
+    def decide(self, transcript, confidence=None) -> EndpointDecision:
+        cue = self.cue(transcript)
+        score = CUE_SCORES[cue]
+        if confidence is not None:
+            score += self.confidence_weight * (min(max(confidence, 0.0), 1.0) - score)
+        if score >= 0.5:
+            delay = self.base_silence - (score - 0.5) * 2 * (self.base_silence - self.min_silence)
+        else:
+            delay = self.max_silence - score * 2 * (self.max_silence - self.base_silence)
+        return EndpointDecision(cue, round(score, 3), round(delay, 3))
+
+    def reply_at(self, decision, last_voiced, transcript_at):
+        """When to answer, given when the user was last heard and when the transcript arrived"""
+        silence_from = max(last_voiced, transcript_at - self.stt_lag)
+        return max(silence_from + decision.delay, transcript_at)
+
+
+endpointer = Endpointer()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import threading
+import time
+import numpy as np  # type: ignore
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from websockets.asyncio.server import serve  # type: ignore
+from bondcastConvos.management.commands.speech_provider_stubs import AssemblyStub, Latency, SAMPLE_RATE
+
+PROBE_INTERVAL = 0.005
+FRAME_BYTES = 3200  # 100ms, as the consumer sends
+
+
+class LagProbe:
+    """Measures how late a short periodic sleep wakes up, i.e. how long the loop stalls"""
+
+    def __init__(self):
+        self.lags = []
+
+    async def run(self, stop):
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            started = loop.time()
+            await asyncio.sleep(PROBE_INTERVAL)
+            self.lags.append(loop.time() - started - PROBE_INTERVAL)
+
+
+class Command(BaseCommand):
+    help = (
+        "Opens AssemblySTT sessions against an in-process AssemblyAI stand-in, hangs them all up "
+        "at once from the event loop the way SpeechConsumer.disconnect does, and reports how long "
+        "the loop stalled and whether the final transcripts still arrived. Fails if the loop "
+        "stalled longer than --max-lag-ms or any session lost its final transcript"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sessions", type=int, default=50)
+        parser.add_argument("--port", type=int, default=9111)
+        parser.add_argument("--speech-ms", type=int, default=1000, help="Speech sent to each session before hanging up")
+        parser.add_argument("--timeout", type=float, default=None, help="STT terminate timeout, defaults to STT_TERMINATE_TIMEOUT")
+        parser.add_argument("--max-lag-ms", type=float, default=50, help="Longest loop stall allowed")
+        parser.add_argument("--min-finals", type=float, default=1.0,
+                            help="Fraction of sessions that must get their final transcript")
+
+    def handle(self, *args, **options):
+        os.environ.setdefault("ASSEMBLY_STT_KEY", "bench")
+        from bondcastConvos import assembly_stt
+
+        assembly_stt.ASSEMBLYAI_STREAMING_URL = f"ws://127.0.0.1:{options['port']}/v3/ws"
+        server_ready = threading.Event()
+        server_thread = threading.Thread(target=self._serve_stub, args=(options["port"], server_ready), daemon=True)
+        server_thread.start()
+        server_ready.wait(5)
+
+        timeout = options["timeout"] if options["timeout"] is not None else assembly_stt.STT_TERMINATE_TIMEOUT
+        sessions, connected, stop_ms, lags, close_seconds = asyncio.run(
+            self._bench(assembly_stt.AssemblySTT, options["sessions"], options["speech_ms"], timeout)
+        )
+
+        finals = sum(1 for _, transcripts in sessions if transcripts)
+        closed = sum(stt.closed.is_set() for stt, _ in sessions)
+        lags_ms = sorted(1000 * lag for lag in lags) or [0.0]
+        self.stdout.write(f"sessions connected     {connected}/{len(sessions)}")
+        self.stdout.write(f"stop() calls on loop   {stop_ms:.1f} ms total")
+        self.stdout.write(f"loop lag max           {lags_ms[-1]:.1f} ms")
+        self.stdout.write(f"loop lag p99           {lags_ms[int(0.99 * (len(lags_ms) - 1))]:.1f} ms")
+        self.stdout.write(f"all sessions closed in {close_seconds:.2f} s ({closed}/{len(sessions)} closed)")
+        self.stdout.write(f"final transcripts      {finals}/{len(sessions)}")
+
+        failures = []
+        if connected < len(sessions):
+            failures.append(f"only {connected}/{len(sessions)} sessions connected")
+        if lags_ms[-1] > options["max_lag_ms"]:
+            failures.append(f"loop stalled {lags_ms[-1]:.1f} ms, over {options['max_lag_ms']:g} ms")
+        if finals < options["min_finals"] * len(sessions):
+            failures.append(f"only {finals}/{len(sessions)} final transcripts arrived")
+        if closed < len(sessions):
+            failures.append(f"{len(sessions) - closed} sessions never closed")
+        if failures:
+            raise CommandError("; ".join(failures))
+
+    @staticmethod
+    def _session(stt_class):
+        transcripts = []
+
+        def on_transcript(transcript):
+            if transcript != "__START_TRANSCRIPTION__":
+                transcripts.append(transcript)
+
+        stt = stt_class(on_transcript)
+        stt.start()
+        return stt, transcripts
+
+    @staticmethod
+    def _serve_stub(port, ready):
+        async def main():
+            stub = AssemblyStub(0.4, 0.1, Latency("50"), Latency("50"))
+            async with serve(stub.handle, "127.0.0.1", port, max_size=None):
+                ready.set()
+                await asyncio.Future()
+
+        asyncio.run(main())
+
+    async def _bench(self, stt_class, count, speech_ms, timeout):
+        loop = asyncio.get_running_loop()
+        sessions = [self._session(stt_class) for _ in range(count)]
+        deadline = loop.time() + 10
+        while loop.time() < deadline and not all(stt.connected for stt, _ in sessions):
+            await asyncio.sleep(0.05)
+        connected = sum(stt.connected for stt, _ in sessions)
+
+        # Mid-utterance at hang-up: speech with no trailing silence, so only the
+        # Terminate flush can produce the final transcript
+        t = np.arange(SAMPLE_RATE * speech_ms // 1000) / SAMPLE_RATE
+        speech = (8000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+        for stt, _ in sessions:
+            for offset in range(0, len(speech), FRAME_BYTES):
+                stt.send_audio(speech[offset:offset + FRAME_BYTES])
+        await asyncio.sleep(0.3)  # Let the stand-in see the speech start
+
+        stop_ms, lags, close_seconds = await self._hang_up([stt for stt, _ in sessions], timeout)
+        return sessions, connected, stop_ms, lags, close_seconds
+
+    async def _hang_up(self, sessions, timeout):
+        loop = asyncio.get_running_loop()
+        probe = LagProbe()
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe.run(stop))
+        await asyncio.sleep(0.1)
+
+        started = time.perf_counter()
+        for stt in sessions:
+            stt.stop(timeout)
+        stop_ms = 1000 * (time.perf_counter() - started)
+
+        hung_up = loop.time()
+        while not all(stt.closed.is_set() for stt in sessions) and loop.time() - hung_up < timeout + 2:
+            await asyncio.sleep(0.05)
+        close_seconds = loop.time() - hung_up
+        stop.set()
+        await probe_task
+        return stop_ms, probe.lags, close_seconds
@@ -0,0 +1,184 @@
+import asyncio
+import os
+import time
+import types
+from datetime import date
+from django.core.cache import cache  # type: ignore
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+
+# Providers are stubbed, but the speech modules create their clients at import
+for _key in ("ELEVENLABS_API_KEY", "GROQ_API_KEY", "ASSEMBLY_STT_KEY"):
+    os.environ.setdefault(_key, "bench")
+
+POLL_INTERVAL = 0.1  # The polling loop TurnTimers replaced woke every call this often
+GREETING = "Hi, welcome to the show. What did you do today?"
+GREETING_SECONDS = 0.3
+SETTLE_SECONDS = 0.3
+
+
+class IdleSTT:
+    """AssemblyAI stand-in that never hears anything"""
+
+    end_of_turn_confidence = None
+
+    def send_audio(self, audio_data):
+        pass
+
+    def stop(self, *args):
+        pass
+
+
+class BenchClient:
+    """In-process ASGI peer for one SpeechConsumer"""
+
+    def __init__(self):
+        self.inbox = asyncio.Queue()
+        self.sent = 0
+
+    async def receive(self):
+        return await self.inbox.get()
+
+    async def send(self, message):
+        self.sent += 1
+
+    def say(self, **message):
+        self.inbox.put_nowait(message)
+
+
+def bench_consumer_class(consumers):
+    from bondcastConvos.consumers import SpeechConsumer
+
+    async def synthesize(text, previous_text=None):
+        yield bytes(int(32000 * GREETING_SECONDS) // 2 * 2)
+
+    class BenchConsumer(SpeechConsumer):
+        channel_layer_alias = "bench"  # Not configured, so no channel layer is opened
+
+        async def connect(self):
+            self.evaluations = 0
+            consumers.append(self)
+            await super().connect()
+
+        async def get_user_by_username(self, username):
+            index = int(username.removeprefix("idle"))
+            return types.SimpleNamespace(id=index, firstname="Idle", user_summary="", dob=date(2000, 1, 1))
+
+        async def check_user_has_friends(self, user):
+            return True
+
+        def _start_providers(self):
+            self.assembly_stt = IdleSTT()
+
+        def _tts_synthesizer(self, cacheable):
+            return synthesize
+
+        async def _history_summary(self, summary, transcript):
+            return ""
+
+        def _evaluate_turn_timers(self):
+            self.evaluations += 1
+            return super()._evaluate_turn_timers()
+
+    return BenchConsumer
+
+
+class Command(BaseCommand):
+    help = (
+        "Holds real SpeechConsumer calls idle (before the client is ready, and listening after the "
+        "greeting) and counts how often their turn timers evaluate. Fails if idle calls wake up."
+    )
+    requires_system_checks = []  # Providers are stubbed; the URL checks would need their keys
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=300, help="Concurrent idle calls")
+        parser.add_argument("--duration", type=float, default=3.0,
+                            help="Seconds to measure each idle phase for; must end before FIRST_TIMEOUT")
+        parser.add_argument("--mic-ms", type=int, default=0,
+                            help="Also stream silent mic audio in messages this far apart (0 for none)")
+        parser.add_argument("--max-evaluations", type=int, default=0,
+                            help="Turn timer evaluations allowed per phase across all calls")
+
+    def handle(self, *args, **options):
+        from bondcastConvos.consumers import FIRST_TIMEOUT
+
+        calls, duration = options["calls"], options["duration"]
+        if duration + 2 * SETTLE_SECONDS >= FIRST_TIMEOUT:
+            raise CommandError(f"--duration must leave the listening phase before FIRST_TIMEOUT ({FIRST_TIMEOUT}s)")
+        for index in range(calls):
+            cache.set(f"user_{index}_intro", GREETING)
+
+        results = asyncio.run(self._bench(calls, duration, options["mic_ms"]))
+
+        self.stdout.write(f"{calls} idle calls, {duration:.1f}s per phase"
+                          + (f", silent mic audio every {options['mic_ms']} ms" if options["mic_ms"] else ""))
+        self.stdout.write(f"{'phase':<18}{'evaluations':>12}{'wakeups':>9}{'cpu %':>8}{'us/call/s':>11}")
+        for phase, evaluations, wakeups, cpu in results:
+            self.stdout.write(
+                f"{phase:<18}{evaluations:>12}{wakeups:>9}{100 * cpu / duration:>8.2f}{1e6 * cpu / duration / calls:>11.1f}"
+            )
+        self.stdout.write(f"(the {1000 * POLL_INTERVAL:.0f} ms polling loop would have made "
+                          f"{round(calls * duration / POLL_INTERVAL)} checks per phase)")
+
+        over = [phase for phase, evaluations, _, _ in results if evaluations > options["max_evaluations"]]
+        if over:
+            raise CommandError(f"Idle calls evaluated their turn timers during: {', '.join(over)}")
+
+    async def _bench(self, calls, duration, mic_ms):
+        consumers = []
+        app = bench_consumer_class(consumers).as_asgi()
+        clients = [BenchClient() for _ in range(calls)]
+        tasks = []
+        for index, client in enumerate(clients):
+            scope = {
+                "type": "websocket",
+                "path": f"/ws/speech/idle{index}/default/",
+                "url_route": {"args": (), "kwargs": {"username": f"idle{index}", "variant": "default"}},
+            }
+            tasks.append(asyncio.create_task(app(scope, client.receive, client.send)))
+            client.say(type="websocket.connect")
+
+        try:
+            await self._until(lambda: len(consumers) == calls and all(hasattr(c, "turn_timers") for c in consumers))
+            results = [await self._measure("awaiting ready", consumers, clients, duration, mic_ms)]
+
+            for client in clients:
+                client.say(type="websocket.receive", text='{"type": "ready_for_streaming"}')
+            # Greeting played and the turn handed back to the (silent) user
+            await self._until(lambda: all(not c.streaming_text and not c.bondi_llm_triggered for c in consumers))
+            results.append(await self._measure("listening", consumers, clients, duration, mic_ms))
+        finally:
+            for client in clients:
+                client.say(type="websocket.disconnect", code=1000)
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return results
+
+    @staticmethod
+    async def _until(condition, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise CommandError("Calls didn't reach the idle state in time")
+            await asyncio.sleep(0.05)
+
+    @staticmethod
+    async def _measure(phase, consumers, clients, duration, mic_ms):
+        async def mic():
+            silence = bytes(32 * mic_ms)
+            while True:
+                for client in clients:
+                    client.say(type="websocket.receive", bytes=silence)
+                await asyncio.sleep(mic_ms / 1000)
+
+        feeder = asyncio.create_task(mic()) if mic_ms else None
+        # Let scheduling from the last state change settle before sampling
+        await asyncio.sleep(SETTLE_SECONDS)
+        evaluations = sum(c.evaluations for c in consumers)
+        wakeups = sum(c.turn_timers.wakeups for c in consumers)
+        cpu_start = time.process_time()
+        await asyncio.sleep(duration)
+        cpu = time.process_time() - cpu_start
+        evaluations = sum(c.evaluations for c in consumers) - evaluations
+        wakeups = sum(c.turn_timers.wakeups for c in consumers) - wakeups
+        if feeder:
+            feeder.cancel()
+        return phase, evaluations, wakeups, cpu
@@ -0,0 +1,171 @@
+import json
+import os
+import time
+import wave
+from pathlib import Path
+from statistics import median
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from vosk import KaldiRecognizer, Model, SetLogLevel  # type: ignore
+from bondcastConvos.audio_buffer import SAMPLE_RATE, frame_bytes_for
+from bondcastConvos.speech_trace import load_trace
+from bondcastConvos.vad import EnergyVAD
+from bondcastConvos.vosk_pool import (
+    BARGE_IN_PHRASES, VOSK_BARGE_IN_MODEL_PATH, VOSK_MODEL_PATH, barge_in_grammar, said_barge_in_phrase,
+)
+
+FRAME_MS = 100  # As the consumer feeds Vosk
+MODELS_URL = "https://alphacephei.com/vosk/models"
+
+
+def check_model(path, option):
+    """Fails with download instructions instead of Kaldi's abort when a model isn't there"""
+    if not path or not (Path(path) / "am" / "final.mdl").is_file():
+        raise CommandError(
+            f"{option}: no Vosk model at {path!r}. Download one from {MODELS_URL} (the full setup uses "
+            f"the model in VOSK_MODEL_PATH, the barge-in comparison e.g. vosk-model-small-en-us-0.15), "
+            f"unzip it and pass the directory."
+        )
+
+
+def has_runtime_graph(path):
+    """Grammars need the HCLr/Gr graphs the small models ship; big models ignore them"""
+    return (Path(path) / "graph" / "HCLr.fst").is_file() and (Path(path) / "graph" / "Gr.fst").is_file()
+
+
+def load_pcm(path):
+    """16kHz mono int16 PCM from a WAV file, or the inbound audio of a PCM speech trace"""
+    if str(path).endswith((".jsonl", ".jsonl.gz")):
+        return b"".join(event["data"] for event in load_trace(path) if event["kind"] == "in_audio")
+    with wave.open(str(path), "rb") as f:
+        if f.getframerate() != SAMPLE_RATE or f.getnchannels() != 1 or f.getsampwidth() != 2:
+            raise CommandError(f"{path}: expected 16kHz mono 16-bit audio")
+        return f.readframes(f.getnframes())
+
+
+def resident_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def speech_onsets(frames):
+    """Start time, in seconds, of each frame where the energy VAD detects speech starting"""
+    vad = EnergyVAD()
+    return [index * FRAME_MS / 1000 for index, frame in enumerate(frames) if vad.process(frame).onset]
+
+
+def decode(model, frames, grammar):
+    """
+    Feeds frames to a recognizer the way a barge-in session does, resetting after
+    each partial. Returns the CPU seconds spent and (frame end time, partial) pairs.
+    """
+    recognizer = KaldiRecognizer(model, SAMPLE_RATE, grammar) if grammar else KaldiRecognizer(model, SAMPLE_RATE)
+    partials = []
+    started = time.thread_time()
+    for index, frame in enumerate(frames):
+        recognizer.AcceptWaveform(frame)
+        partial = json.loads(recognizer.PartialResult()).get("partial")
+        if partial:
+            recognizer.Reset()
+            partials.append(((index + 1) * FRAME_MS / 1000, partial))
+    return time.thread_time() - started, partials
+
+
+def detection_latencies(onsets, partials, phrase_only=False):
+    """Seconds from each speech onset to the first partial (or control phrase) after it"""
+    latencies = []
+    for index, onset in enumerate(onsets):
+        until = onsets[index + 1] if index + 1 < len(onsets) else float("inf")
+        for at, partial in partials:
+            if onset <= at < until and (not phrase_only or said_barge_in_phrase(partial)):
+                latencies.append(at - onset)
+                break
+    return latencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares Vosk barge-in recognizers (full model, small model, small model with the control "
+        "phrase grammar) on recorded speech: model memory, CPU per call and detection latency"
+    )
+    requires_system_checks = []  # Offline; the URL checks would need the provider keys
+
+    def add_arguments(self, parser):
+        parser.add_argument("audio", nargs="+", help="16kHz mono WAV files or PCM speech traces")
+        parser.add_argument("--model", default=VOSK_MODEL_PATH, help="Full model, the current setup")
+        parser.add_argument("--small-model", default=VOSK_BARGE_IN_MODEL_PATH, help="Small model to compare")
+        parser.add_argument("--json", dest="json_path", help="Also write the report here")
+
+    def handle(self, *args, **options):
+        check_model(options["model"], "--model")
+        if options["small_model"]:
+            check_model(options["small_model"], "--small-model")
+        SetLogLevel(-1)
+        frame_bytes = frame_bytes_for(FRAME_MS)
+        clips = []
+        for path in options["audio"]:
+            pcm = load_pcm(path)
+            frames = [pcm[offset:offset + frame_bytes] for offset in range(0, len(pcm) - frame_bytes + 1, frame_bytes)]
+            clips.append((frames, speech_onsets(frames)))
+        audio_seconds = sum(len(frames) for frames, _ in clips) * FRAME_MS / 1000
+        if not audio_seconds:
+            raise CommandError("No audio to decode")
+
+        grammar = barge_in_grammar()
+        configs = [("full", options["model"], None)]
+        if options["small_model"]:
+            configs.append(("small", options["small_model"], None))
+            if has_runtime_graph(options["small_model"]):
+                configs.append(("small+grammar", options["small_model"], grammar))
+            else:
+                self.stdout.write(f"{options['small_model']} has no runtime graph, so no grammar comparison")
+
+        models = {}
+        results = []
+        for name, path, config_grammar in configs:
+            if path not in models:
+                rss = resident_bytes()
+                started = time.perf_counter()
+                model = Model(path)
+                load_seconds = time.perf_counter() - started
+                grown = resident_bytes()
+                memory = grown - rss if rss is not None and grown is not None else None
+                models[path] = (model, load_seconds, memory)
+            model, load_seconds, memory = models[path]
+
+            cpu = 0.0
+            onset_latencies, phrase_latencies, onsets = [], [], 0
+            for frames, clip_onsets in clips:
+                clip_cpu, partials = decode(model, frames, config_grammar)
+                cpu += clip_cpu
+                onsets += len(clip_onsets)
+                onset_latencies += detection_latencies(clip_onsets, partials)
+                phrase_latencies += detection_latencies(clip_onsets, partials, phrase_only=True)
+            results.append({
+                "config": name,
+                "model": path,
+                "model_load_s": round(load_seconds, 2),
+                "model_memory_mb": round(memory / 2 ** 20) if memory is not None else None,
+                "cpu_percent_per_call": round(100 * cpu / audio_seconds, 2),
+                "onsets": onsets,
+                "onsets_detected": len(onset_latencies),
+                "detect_ms_median": round(1000 * median(onset_latencies)) if onset_latencies else None,
+                "phrases_detected": len(phrase_latencies),
+                "phrase_ms_median": round(1000 * median(phrase_latencies)) if phrase_latencies else None,
+            })
+
+        self.stdout.write(f"{audio_seconds:.1f}s of audio, {sum(len(onsets) for _, onsets in clips)} speech onsets, "
+                          f"control phrases {BARGE_IN_PHRASES}")
+        self.stdout.write(f"{'config':<15}{'load s':>8}{'mem MB':>8}{'cpu %/call':>12}{'detected':>10}"
+                          f"{'detect ms':>11}{'phrases':>9}{'phrase ms':>11}")
+        for result in results:
+            self.stdout.write(
+                f"{result['config']:<15}{result['model_load_s']:>8}{str(result['model_memory_mb']):>8}"
+                f"{result['cpu_percent_per_call']:>12}{result['onsets_detected']:>10}"
+                f"{str(result['detect_ms_median']):>11}{result['phrases_detected']:>9}{str(result['phrase_ms_median']):>11}"
+            )
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump({"audio_seconds": audio_seconds, "results": results}, f, indent=2)
@@ -0,0 +1,64 @@
+import numpy as np  # type: ignore
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from bondcastConvos.audio_buffer import SAMPLE_RATE, frame_bytes_for
+from bondcastConvos.vad import VAD_FLOOR_WINDOW_MS, VAD_HANGOVER_MS, EnergyVAD
+
+FRAME_MS = 100  # As the consumer frames inbound audio
+FRAME_SAMPLES = frame_bytes_for(FRAME_MS) // 2
+
+
+def tone(seconds, hz, dbfs, start=0.0):
+    t = start + np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return np.sqrt(2) * 32768 * 10 ** (dbfs / 20) * np.sin(2 * np.pi * hz * t)
+
+
+def speech_like(seconds, dbfs, rng):
+    """Voiced 'syllables' at about 4 per second with short quiet gaps between words"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    envelope = np.clip(np.sin(2 * np.pi * 2 * t), 0, None) ** 0.5
+    envelope *= (t % 0.9) < 0.75
+    return envelope * tone(seconds, 180, dbfs) + tone(seconds, 360, dbfs - 6) * envelope + rng.normal(0, 3, t.size)
+
+
+def run(vad, samples):
+    """Voiced flag of each frame"""
+    pcm = np.clip(samples, -32768, 32767).astype("<i2").tobytes()
+    size = 2 * FRAME_SAMPLES
+    return [vad.process(pcm[offset:offset + size]).voiced for offset in range(0, len(pcm) - size + 1, size)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs EnergyVAD over synthetic audio and fails if steady background noise keeps counting "
+        "as speech or if speech over that noise is missed"
+    )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        # Steady noise may count as speech until the floor window has passed plus the hangover
+        settle_frames = (VAD_FLOOR_WINDOW_MS + VAD_HANGOVER_MS) // FRAME_MS + 1
+        failures = []
+
+        for name, hz, dbfs in (("120 Hz hum", 120, -37), ("fan rumble", 90, -30)):
+            # A silent first frame leaves the floor at digital silence
+            noise = np.concatenate([np.zeros(FRAME_SAMPLES), tone(60, hz, dbfs) + rng.normal(0, 20, SAMPLE_RATE * 60)])
+            voiced = run(EnergyVAD(), noise)
+            last = max((index for index, flag in enumerate(voiced) if flag), default=-1)
+            self.stdout.write(f"{name:<18} last voiced frame {(last + 1) * FRAME_MS} ms (limit {settle_frames * FRAME_MS} ms)")
+            if last >= settle_frames:
+                failures.append(f"{name} still voiced {(last + 1) * FRAME_MS} ms in")
+
+            # Speech well above the same noise, once it has settled, is still heard throughout
+            vad = EnergyVAD()
+            run(vad, noise[:SAMPLE_RATE * 10])
+            speech = speech_like(8, dbfs + 20, rng) + tone(8, hz, dbfs, start=10)
+            voiced = run(vad, speech)
+            seconds = len(voiced) * FRAME_MS // 1000
+            heard = [any(voiced[second * 10:second * 10 + 10]) for second in range(seconds)]
+            self.stdout.write(f"{name:<18} speech over it voiced in {sum(heard)}/{seconds} seconds")
+            if not all(heard):
+                failures.append(f"speech over {name} missed in {seconds - sum(heard)} of {seconds} seconds")
+
+        if failures:
+            raise CommandError("; ".join(failures))
+        self.stdout.write("VAD checks passed")
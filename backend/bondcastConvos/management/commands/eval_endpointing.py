@@ -0,0 +1,199 @@
+import bisect
+import json
+from collections import Counter
+from pathlib import Path
+from statistics import median
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from bondcastConvos.audio_buffer import PCMRingBuffer, frame_bytes_for
+from bondcastConvos.audio_codec import OPUS_AVAILABLE, OpusDecoder
+from bondcastConvos.endpointing import (
+    ENDPOINT_BASE_SILENCE, ENDPOINT_CONFIDENCE_WEIGHT, ENDPOINT_MAX_SILENCE, ENDPOINT_MIN_SILENCE,
+    ENDPOINT_STT_LAG, Endpointer,
+)
+from bondcastConvos.speech_trace import load_trace
+from bondcastConvos.vad import EnergyVAD
+
+FRAME_MS = 100  # As the consumer frames inbound audio
+BURST_GAP = 0.3  # Outbound audio further apart than this starts a new utterance
+FIXED_SILENCE = 0.5  # The fixed threshold the endpointer replaced
+
+
+class CallTimeline:
+    """What the endpointer would have seen on a recorded call"""
+
+    def __init__(self, events):
+        codec = "pcm"
+        for event in events:
+            if event["kind"] == "out_text" and '"audio_format"' in event["data"]:
+                codec = json.loads(event["data"]).get("codec", "pcm")
+        if codec == "opus" and not OPUS_AVAILABLE:
+            raise CommandError("Trace has Opus audio but opuslib isn't available")
+        decoder = OpusDecoder() if codec == "opus" else None
+
+        self.bondi_starts, bondi_ends = self._bursts(events)
+
+        # Voiced frames, classified like the consumer does, with the stricter margin
+        # while Bondi was talking
+        self.voiced = []
+        vad = EnergyVAD()
+        buffer = PCMRingBuffer(frame_bytes_for(FRAME_MS))
+        for event in events:
+            if event["kind"] != "in_audio":
+                continue
+            data = decoder.decode(event["data"]) if decoder else event["data"]
+            buffer.write(data)
+            talking = any(start <= event["t"] <= end for start, end in zip(self.bondi_starts, bondi_ends))
+            for frame in buffer.frames():
+                if vad.process(frame, barge_in=talking).voiced:
+                    self.voiced.append(event["t"])
+
+        self.transcripts = [
+            (event["t"], event["text"], event.get("confidence"))
+            for event in events
+            if event["kind"] == "stt" and event["event"] == "transcript"
+            and event["text"] and event["text"] != "__START_TRANSCRIPTION__"
+        ]
+
+    @staticmethod
+    def _bursts(events):
+        starts, ends = [], []
+        for event in events:
+            if event["kind"] == "out_audio":
+                if ends and event["t"] - ends[-1] <= BURST_GAP:
+                    ends[-1] = event["t"]
+                else:
+                    starts.append(event["t"])
+                    ends.append(event["t"])
+        return starts, ends
+
+    def next_voiced(self, after):
+        index = bisect.bisect_right(self.voiced, after)
+        return self.voiced[index] if index < len(self.voiced) else None
+
+    def next_bondi(self, after):
+        index = bisect.bisect_right(self.bondi_starts, after)
+        return self.bondi_starts[index] if index < len(self.bondi_starts) else None
+
+
+class PolicyResult:
+    def __init__(self, name):
+        self.name = name
+        self.silences = []  # Silence before each answer, in seconds
+        self.cut_ins = 0  # Answers the user talked over, i.e. they weren't done
+        self.waits_paid_off = 0  # Pending answers the user resumed speaking before
+        self.cues = Counter()
+
+    def summary(self):
+        silences = sorted(self.silences)
+        answered = len(silences)
+        return {
+            "policy": self.name,
+            "answered": answered,
+            "silence_ms_median": round(1000 * median(silences)) if silences else None,
+            "silence_ms_p90": round(1000 * silences[min(answered - 1, int(0.9 * answered))]) if silences else None,
+            "cut_ins": self.cut_ins,
+            "cut_in_rate": round(self.cut_ins / answered, 3) if answered else None,
+            "waits_paid_off": self.waits_paid_off,
+            "cues": dict(self.cues),
+        }
+
+
+def simulate(timeline, endpointer, result, resume_window):
+    """
+    Replays a call's voiced frames and transcripts through an endpointer. Like the
+    consumer, transcripts accumulate until Bondi replies. An answer counts as a
+    cut-in when the user speaks again within resume_window of it and before
+    Bondi's recorded reply.
+    """
+    events = [(t, 0, None) for t in timeline.voiced]
+    events += [(t, 1, (text, confidence)) for t, text, confidence in timeline.transcripts]
+    events += [(t, 2, None) for t in timeline.bondi_starts]
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    text = ""
+    last_voiced = float("-inf")
+    reply_at = None
+
+    def answer(at, check_resume=True):
+        result.silences.append(max(0.0, at - last_voiced) if last_voiced > float("-inf") else 0.0)
+        if not check_resume:
+            return
+        resumed = timeline.next_voiced(at)
+        bondi = timeline.next_bondi(at)
+        if resumed is not None and resumed - at <= resume_window and (bondi is None or resumed < bondi):
+            result.cut_ins += 1
+
+    for t, kind, payload in events:
+        if reply_at is not None and t >= reply_at:
+            answer(reply_at)
+            reply_at = None
+        if kind == 0:
+            last_voiced = t
+            if reply_at is not None:
+                result.waits_paid_off += 1
+                reply_at = None
+        elif kind == 1:
+            transcript, confidence = payload
+            text = f"{text} {transcript}".strip()
+            decision = endpointer.decide(text, confidence)
+            result.cues[decision.cue] += 1
+            reply_at = endpointer.reply_at(decision, last_voiced, t)
+        else:
+            # Bondi's recorded reply; a slower policy would have answered when it said
+            if reply_at is not None:
+                answer(reply_at, check_resume=False)
+                reply_at = None
+            text = ""
+    if reply_at is not None:
+        answer(reply_at, check_resume=False)
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs recorded call traces through the endpointer and the old fixed silence threshold, "
+        "reporting how long each waited before answering and how often it cut the user off"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("traces", nargs="+", help="Trace files, or directories of them")
+        parser.add_argument("--min-silence", type=float, default=ENDPOINT_MIN_SILENCE)
+        parser.add_argument("--base-silence", type=float, default=ENDPOINT_BASE_SILENCE)
+        parser.add_argument("--max-silence", type=float, default=ENDPOINT_MAX_SILENCE)
+        parser.add_argument("--stt-lag", type=float, default=ENDPOINT_STT_LAG)
+        parser.add_argument("--confidence-weight", type=float, default=ENDPOINT_CONFIDENCE_WEIGHT)
+        parser.add_argument("--resume-window", type=float, default=2.0,
+                            help="Speech this soon after an answer counts as a cut-in")
+        parser.add_argument("--json", dest="json_path", help="Also write the report here")
+
+    def handle(self, *args, **options):
+        paths = []
+        for target in options["traces"]:
+            target = Path(target)
+            paths += sorted(target.glob("*.jsonl*")) if target.is_dir() else [target]
+        if not paths:
+            raise CommandError("No traces found")
+
+        policies = [
+            (PolicyResult("fixed"), Endpointer(FIXED_SILENCE, FIXED_SILENCE, FIXED_SILENCE, 0.0, 0.0)),
+            (PolicyResult("adaptive"), Endpointer(
+                options["min_silence"], options["base_silence"], options["max_silence"],
+                options["stt_lag"], options["confidence_weight"],
+            )),
+        ]
+        for path in paths:
+            timeline = CallTimeline(load_trace(path))
+            for result, endpointer in policies:
+                simulate(timeline, endpointer, result, options["resume_window"])
+
+        report = {"calls": len(paths), "policies": [result.summary() for result, _ in policies]}
+        self.stdout.write(f"{len(paths)} calls")
+        self.stdout.write(f"{'policy':<10}{'answered':>9}{'median ms':>11}{'p90 ms':>9}{'cut-ins':>9}{'waits paid off':>16}")
+        for summary in report["policies"]:
+            self.stdout.write(
+                f"{summary['policy']:<10}{summary['answered']:>9}{str(summary['silence_ms_median']):>11}"
+                f"{str(summary['silence_ms_p90']):>9}{summary['cut_ins']:>9}{summary['waits_paid_off']:>16}"
+            )
+        self.stdout.write(f"adaptive cues: {report['policies'][1]['cues']}")
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import os
+import time
+import urllib.request
+import wave
+from datetime import date
+from statistics import quantiles
+from django.contrib.auth import get_user_model  # type: ignore
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from rest_framework_simplejwt.tokens import RefreshToken  # type: ignore
+from websockets.asyncio.client import connect  # type: ignore
+from websockets.exceptions import ConnectionClosed  # type: ignore
+
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+
+def load_pcm(path):
+    with wave.open(path, "rb") as wav:
+        if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise CommandError(f"{path} must be 16 kHz mono 16-bit PCM")
+        return wav.readframes(wav.getnframes())
+
+
+def percentiles(values):
+    """p50/p95/p99 in ms, or dashes when there's too little data"""
+    if len(values) < 2:
+        return [round(1000 * values[0])] * 3 if values else ["-"] * 3
+    cuts = quantiles(values, n=100, method="inclusive")
+    return [round(1000 * cuts[49]), round(1000 * cuts[94]), round(1000 * cuts[98])]
+
+
+class ProcessSampler:
+    """CPU and RSS of the server process, read from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self._cpu, self._at = self._cpu_seconds(), time.monotonic()
+
+    def _cpu_seconds(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks  # utime + stime
+
+    def rss_mb(self):
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    def cpu_percent(self):
+        cpu, at = self._cpu_seconds(), time.monotonic()
+        percent = 100 * (cpu - self._cpu) / (at - self._at)
+        self._cpu, self._at = cpu, at
+        return percent
+
+
+class LoadStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.turn_latencies = []
+        self.ping_rtts = []
+        self.calls_finished = 0
+        self.errors = 0
+
+
+class SimulatedCall:
+    """
+    One BondCast client behaving like Chat.tsx: streams mic audio in 128-sample
+    messages at real-time pace, plays received PCM against a local clock, and
+    reports audio_started/audio_done as its playback buffer fills and drains.
+    After Bondi finishes talking it waits the think time and says the next utterance,
+    and it hangs up once the reply to its last utterance has played.
+    """
+
+    def __init__(self, url, utterances, stats, turns, think, mic_chunk_ms):
+        self.url = url
+        self.utterances = utterances
+        self.stats = stats
+        self.turns = turns
+        self.think = think
+        self.mic_chunk_bytes = SAMPLE_RATE * 2 * mic_chunk_ms // 1000
+        self.mic_interval = mic_chunk_ms / 1000
+        self.speech = bytearray()
+        self.playing = False
+        self.play_until = 0.0
+        self.utterance_ended_at = None
+        self.utterances_said = 0
+        self.latencies = []
+        self.reply_timer = None
+
+    async def run(self):
+        async with connect(self.url, max_size=None, ping_interval=None) as ws:
+            self.ws = ws
+            await ws.send(json.dumps({"type": "ready_for_streaming"}))
+            tasks = [asyncio.create_task(coro) for coro in (self._mic(), self._playback(), self._ping())]
+            try:
+                async for message in ws:
+                    if isinstance(message, bytes):
+                        await self._on_audio(message)
+                    elif json.loads(message).get("type") == "stop_audio":
+                        self.play_until = time.monotonic()
+            except ConnectionClosed:
+                pass
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        if self.reply_timer:
+            self.reply_timer.cancel()
+        return self.latencies
+
+    async def _on_audio(self, chunk):
+        now = time.monotonic()
+        if self.reply_timer:
+            self.reply_timer.cancel()  # Bondi is still talking
+            self.reply_timer = None
+        if self.utterance_ended_at is not None:
+            latency = now - self.utterance_ended_at
+            self.latencies.append(latency)
+            self.stats.turn_latencies.append(latency)
+            self.utterance_ended_at = None
+        self.play_until = max(self.play_until, now) + len(chunk) / BYTES_PER_SECOND
+        if not self.playing:
+            self.playing = True
+            await self.ws.send(json.dumps({"type": "audio_started"}))
+
+    async def _playback(self):
+        while True:
+            await asyncio.sleep(0.01)
+            if self.playing and time.monotonic() >= self.play_until:
+                self.playing = False
+                await self.ws.send(json.dumps({"type": "audio_done"}))
+                if self.utterances_said < self.turns:
+                    if not self.speech:
+                        self.reply_timer = asyncio.get_running_loop().call_later(self.think, self._say_next)
+                elif len(self.latencies) >= self.turns:
+                    await self.ws.close()  # Heard the reply to the last utterance; hang up
+                    return
+
+    def _say_next(self):
+        self.reply_timer = None
+        self.speech += self.utterances[self.utterances_said % len(self.utterances)]
+        self.utterances_said += 1
+
+    async def _mic(self):
+        silence = bytes(self.mic_chunk_bytes)
+        next_send = time.monotonic()
+        while True:
+            if self.speech:
+                chunk = bytes(self.speech[:self.mic_chunk_bytes])
+                del self.speech[:self.mic_chunk_bytes]
+                if not self.speech:
+                    self.utterance_ended_at = time.monotonic()
+            else:
+                chunk = silence
+            await self.ws.send(chunk)
+            next_send += self.mic_interval
+            await asyncio.sleep(max(0.0, next_send - time.monotonic()))
+
+    async def _ping(self):
+        while True:
+            await asyncio.sleep(1)
+            sent = time.monotonic()
+            pong = await self.ws.ping()
+            await pong
+            self.stats.ping_rtts.append(time.monotonic() - sent)
+
+
+class Command(BaseCommand):
+    help = (
+        "Opens concurrent simulated BondCast calls against ws/speech/ and reports turn latency, "
+        "WebSocket ping RTT, the server's own event loop lag, CPU and RSS as concurrency ramps up. "
+        "Meant to run against a server pointed at speech_provider_stubs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--audio", nargs="+", required=True, help="16 kHz mono 16-bit WAV utterances the callers say")
+        parser.add_argument("--ws-url", default="ws://127.0.0.1:8000")
+        parser.add_argument("--http-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--variant", default="default")
+        parser.add_argument("--ramp", default="1,5,10,25,50", help="Concurrent call levels to step through")
+        parser.add_argument("--step-seconds", type=float, default=60)
+        parser.add_argument("--turns", type=int, default=3, help="Utterances per call before it hangs up")
+        parser.add_argument("--think-ms", type=int, default=500, help="Pause between Bondi finishing and the caller speaking")
+        parser.add_argument("--mic-chunk-ms", type=int, default=8, help="Mic message size; the browser sends 128 samples")
+        parser.add_argument("--server-pid", type=int, help="Server process to sample CPU and RSS from")
+        parser.add_argument("--user-prefix", default="loadtest")
+        parser.add_argument("--metrics-user", help="Staff username to read the server's loop lag from voice-metrics/ as")
+
+    def handle(self, *args, **options):
+        ramp = [int(level) for level in options["ramp"].split(",")]
+        utterances = [load_pcm(path) for path in options["audio"]]
+        users = self._ensure_users(options["user_prefix"], max(ramp))
+        options["metrics_token"] = self._metrics_token(options["metrics_user"]) if options["metrics_user"] else None
+        asyncio.run(self._run(options, ramp, utterances, users))
+
+    def _ensure_users(self, prefix, count):
+        User = get_user_model()
+        users = []
+        for index in range(count):
+            username = f"{prefix}{index}"
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                user = User.objects.create_user(
+                    email=f"{username}@example.com", password=None, username=username,
+                    firstname="Load", lastname=str(index), dob=date(2000, 1, 1),
+                )
+            users.append(user)
+        return users
+
+    def _metrics_token(self, username):
+        user = get_user_model().objects.filter(username=username).first()
+        if user is None or not user.is_staff:
+            raise CommandError(f"--metrics-user {username} must be an existing staff user")
+        return str(RefreshToken.for_user(user).access_token)
+
+    def _loop_lag(self, http_url, token, window):
+        """The server's recent event loop lag (p99, max) in ms, from its own probe"""
+        request = urllib.request.Request(
+            f"{http_url}/api/bondcast-convos/voice-metrics/?loop_lag_window={window}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            recent = json.loads(response.read())["loop_lag_ms"]["recent"]
+        return recent.get("p99", "-"), recent.get("max", "-")
+
+    def _prepare_greeting(self, http_url, user):
+        # The consumer reads the greeting SetIntroView caches, so go through the real endpoint
+        request = urllib.request.Request(
+            f"{http_url}/api/bondcast-convos/generate-greeting/",
+            data=json.dumps({"podcast_description": "How was your week?"}).encode(),
+            headers={"Content-Type": "application/json", "Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"},
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+
+    async def _run(self, options, ramp, utterances, users):
+        stats = LoadStats()
+        sampler = ProcessSampler(options["server_pid"]) if options["server_pid"] else None
+        slots = []
+        stop = asyncio.Event()
+
+        async def call_slot(index):
+            user = users[index]
+            while not stop.is_set():
+                url = f"{options['ws_url']}/ws/speech/{user.username}/{options['variant']}/"
+                call = SimulatedCall(
+                    url, utterances, stats, options["turns"], options["think_ms"] / 1000, options["mic_chunk_ms"],
+                )
+                try:
+                    await asyncio.to_thread(self._prepare_greeting, options["http_url"], user)
+                    latencies = await call.run()
+                    stats.calls_finished += 1
+                    if self.verbosity > 1:
+                        self.stdout.write(f"  {user.username}: turn latency ms {[round(1000 * x) for x in latencies]}")
+                except Exception as e:
+                    stats.errors += 1
+                    if self.verbosity > 1:
+                        self.stdout.write(f"  {user.username}: {type(e).__name__}: {e}")
+                    await asyncio.sleep(1)
+
+        self.stdout.write(
+            f"{'calls':>6}{'done':>6}{'turns':>7}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}"
+            f"{'ping p50':>9}{'ping p99':>9}{'lag p99':>9}{'lag max':>9}{'cpu %':>8}{'rss MB':>8}{'errors':>8}"
+        )
+        for level in ramp:
+            while len(slots) < level:
+                slots.append(asyncio.create_task(call_slot(len(slots))))
+            stats.reset()
+            if sampler:
+                sampler.cpu_percent()
+            await asyncio.sleep(options["step_seconds"])
+
+            p50, p95, p99 = percentiles(stats.turn_latencies)
+            rtt_p50, _, rtt_p99 = percentiles(stats.ping_rtts)
+            lag_p99, lag_max = "-", "-"
+            if options["metrics_token"]:
+                lag_p99, lag_max = await asyncio.to_thread(
+                    self._loop_lag, options["http_url"], options["metrics_token"], options["step_seconds"],
+                )
+            cpu = f"{sampler.cpu_percent():.0f}" if sampler else "-"
+            rss = f"{sampler.rss_mb():.0f}" if sampler else "-"
+            self.stdout.write(
+                f"{level:>6}{stats.calls_finished:>6}{len(stats.turn_latencies):>7}{p50:>8}{p95:>8}{p99:>8}"
+                f"{rtt_p50:>9}{rtt_p99:>9}{lag_p99:>9}{lag_max:>9}{cpu:>8}{rss:>8}{stats.errors:>8}"
+            )
+
+        stop.set()
+        for slot in slots:
+            slot.cancel()
+        await asyncio.gather(*slots, return_exceptions=True)
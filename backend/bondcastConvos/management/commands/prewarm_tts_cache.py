@@ -0,0 +1,16 @@
+import asyncio
+from django.core.management.base import BaseCommand  # type: ignore
+from bondcastConvos.consumers import CANNED_LINES
+from bondcastConvos.tts_cache import tts_cache
+
+
+class Command(BaseCommand):
+    help = "Renders Bondi's canned lines into the on-disk TTS cache, e.g. at deploy time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("phrases", nargs="*", help="Extra lines to render besides the canned ones")
+
+    def handle(self, *args, **options):
+        phrases = CANNED_LINES + options["phrases"]
+        asyncio.run(tts_cache.prewarm(phrases))
+        self.stdout.write(f"{len(phrases)} lines cached in {tts_cache.directory} ({tts_cache.misses} rendered)")
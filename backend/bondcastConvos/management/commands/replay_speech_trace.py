@@ -0,0 +1,394 @@
+import asyncio
+import json
+import os
+import selectors
+import time
+import types
+from datetime import date
+from statistics import median
+from django.core.cache import cache  # type: ignore
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from bondcastConvos.speech_trace import load_trace
+
+TTS_MS_PER_CHAR = 65  # speaking rate assumed for text the trace has no audio for
+BURST_GAP = 0.3  # outbound audio further apart than this starts a new utterance
+EXECUTOR_POLL = 0.05  # real seconds between checks on work running in other threads
+
+# Providers are simulated, but the speech modules create their clients at import, and
+# Django imports them through the URLconf before handle() runs
+for _key in ("ELEVENLABS_API_KEY", "GROQ_API_KEY", "ASSEMBLY_STT_KEY"):
+    os.environ.setdefault(_key, "replay")
+
+
+class VirtualClock:
+    """Stands in for the time module in the speech modules during a replay"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.epoch = time.time()
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.epoch + self.now
+
+    perf_counter = monotonic
+
+
+class WarpSelector(selectors.BaseSelector):
+    """
+    Selector that jumps the virtual clock forward instead of sleeping. Ready file
+    descriptors (e.g. the loop's self-pipe) are still served first, so the loop only
+    advances time when it would otherwise be idle. While work handed to other threads
+    (Channels' close_old_connections hop on every message, to_thread disk I/O) is
+    still running, the loop isn't idle: it waits for that in real time instead, so
+    the virtual time it finishes at doesn't depend on thread scheduling.
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.busy = lambda: False
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        self._selector.close()
+
+    def select(self, timeout=None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            return self._selector.select(None)
+        if self.busy():
+            return self._selector.select(min(timeout, EXECUTOR_POLL))
+        self.clock.now += timeout
+        return []
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock):
+        selector = WarpSelector(clock)
+        super().__init__(selector)
+        self.clock = clock
+        self.executor_jobs = 0
+        selector.busy = lambda: self.executor_jobs > 0
+
+    def time(self):
+        return self.clock.monotonic()
+
+    def run_in_executor(self, executor, func, *args):
+        future = super().run_in_executor(executor, func, *args)
+        self.executor_jobs += 1
+        future.add_done_callback(self._executor_job_done)
+        return future
+
+    def _executor_job_done(self, future):
+        self.executor_jobs -= 1
+
+
+class ReplayProviders:
+    """Recorded provider behaviour from a trace, served back with the recorded timing"""
+
+    def __init__(self, events):
+        self.header = next(event for event in events if event["kind"] == "call")
+        self.inbound = [event for event in events if event["kind"] in ("in_audio", "in_text")]
+        self.stt = [event for event in events if event["kind"] == "stt"]
+        self.disconnect_at = max((event["t"] for event in events), default=0.0)
+
+        # Each response part is kept as (seconds after its request, delta text or chunk size)
+        llm, tts = {}, {}
+        for event in events:
+            if event["kind"] == "llm_request":
+                llm[event["id"]] = dict(event, parts=[])
+            elif event["kind"] == "tts_request":
+                tts[event["id"]] = dict(event, parts=[])
+            elif event["kind"] == "llm_delta" and event["id"] in llm:
+                llm[event["id"]]["parts"].append((event["t"] - llm[event["id"]]["t"], event["text"]))
+            elif event["kind"] == "tts_chunk" and event["id"] in tts:
+                tts[event["id"]]["parts"].append((event["t"] - tts[event["id"]]["t"], event["size"]))
+        self.llm = list(llm.values())
+        self.tts = {}
+        for request in tts.values():
+            if request["parts"]:
+                self.tts.setdefault(request["text"], request["parts"])
+        self._llm_used = set()
+
+        byte_rates = [sum(size for _, size in parts) / len(text) for text, parts in self.tts.items() if text]
+        self.tts_bytes_per_char = median(byte_rates) if byte_rates else 32 * TTS_MS_PER_CHAR
+        first_bytes = [parts[0][0] for parts in self.tts.values()]
+        self.tts_first_byte = median(first_bytes) if first_bytes else 0.3
+
+    @property
+    def user(self):
+        user = self.header["user"]
+        return types.SimpleNamespace(
+            id=user["id"], firstname=user["firstname"], user_summary=user["user_summary"],
+            dob=date.fromisoformat(user["dob"]),
+        )
+
+    def llm_reply(self, prompt):
+        """The recorded reply to the same prompt line if there is one, else the next unused one"""
+        said = prompt.split("\n", 1)[0]
+        candidates = [index for index, request in enumerate(self.llm) if index not in self._llm_used]
+        match = next((index for index in candidates if self.llm[index]["prompt"].split("\n", 1)[0] == said), None)
+        if match is None:
+            match = candidates[0] if candidates else len(self.llm) - 1
+        self._llm_used.add(match)
+        return self.llm[match]["parts"] if self.llm else [(0.3, '{"bondi_response": "Okay!", "end_call": false}')]
+
+    def tts_parts(self, text):
+        parts = self.tts.get(text)
+        if parts:
+            return parts
+        # Text the recording never synthesized, e.g. after changes to chunking: model it
+        # from the recording's average first-byte latency and bytes per character
+        size = int(len(text) * self.tts_bytes_per_char) // 2 * 2
+        return [(self.tts_first_byte, max(2, size))]
+
+
+class SimulatedClient:
+    """Plays outbound audio against the virtual clock and acks it like Chat.tsx's worklet"""
+
+    def __init__(self, loop, inbox):
+        self.loop = loop
+        self.inbox = inbox
+        self.start = loop.time()
+        self.playing = False
+        self.play_until = 0.0
+        self._done_handle = None
+        self.bursts = []
+        self.messages = []
+        self.closed = None
+        self.header_bytes = 0
+        self.opus_frame_bytes = None
+
+    def on_send(self, message):
+        now = self.loop.time()
+        if message["type"] == "websocket.close":
+            self.closed = message.get("code", 1000)
+            self.inbox.put_nowait({"type": "websocket.disconnect", "code": self.closed})
+            return
+        if message["type"] != "websocket.send":
+            return
+        if message.get("bytes") is not None:
+            self._play(now, self.opus_frame_bytes or len(message["bytes"]) - self.header_bytes)
+        else:
+            data = json.loads(message["text"])
+            self.messages.append((round(now - self.start, 3), data.get("type")))
+            if data.get("type") == "audio_format":
+                self.header_bytes = 4 if data.get("framing") == "seq" else 0
+                # Opus frames are compressed, but each holds frame_ms of audio
+                self.opus_frame_bytes = 32 * data["frame_ms"] if data.get("codec") == "opus" else None
+            if data.get("type") == "stop_audio":
+                self.play_until = now
+                self._check_done()
+
+    def _play(self, now, size):
+        at = now - self.start
+        if self.bursts and at - self.bursts[-1]["end"] <= BURST_GAP:
+            self.bursts[-1]["bytes"] += size
+        else:
+            self.bursts.append({"start": round(at, 3), "bytes": size})
+        self.play_until = max(self.play_until, now) + size / 32000
+        self.bursts[-1]["end"] = round(self.play_until - self.start, 3)
+        if not self.playing:
+            self.playing = True
+            self._receive_text({"type": "audio_started"})
+        if self._done_handle:
+            self._done_handle.cancel()
+        self._done_handle = self.loop.call_at(self.play_until, self._check_done)
+
+    def _check_done(self):
+        if self.playing and self.loop.time() >= self.play_until:
+            self.playing = False
+            self._receive_text({"type": "audio_done"})
+
+    def _receive_text(self, data):
+        self.inbox.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a SPEECH_TRACE_DIR call trace through SpeechConsumer with recorded provider "
+        "responses and a virtual clock, and reports turn latencies and when Bondi spoke"
+    )
+    # The URL checks would import the speech modules, which need the provider keys set above;
+    # skipping them also keeps the replay from depending on the rest of the project's config
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("trace", help="Trace file written by a call with SPEECH_TRACE_DIR set")
+        parser.add_argument("--json", dest="json_path", help="Also write the report here")
+        parser.add_argument("--repeat", type=int, default=1,
+                            help="Replay this many times and fail unless every report is the same")
+
+    def handle(self, *args, **options):
+        events = load_trace(options["trace"])
+        report = self._run(events)
+        for run in range(1, options.get("repeat", 1)):
+            again = self._run(events)
+            differing = [key for key in report if key != "replay_wall_seconds" and again[key] != report[key]]
+            if differing:
+                raise CommandError(f"Replay {run + 1} differs from the first in {', '.join(differing)}")
+
+        recorded = self._recorded_bursts(events)
+        self.stdout.write(f"Replayed {report['virtual_seconds']:.1f}s of call in {report['replay_wall_seconds']:.2f}s")
+        self.stdout.write(f"{'recorded start':>15}{'replayed start':>15}{'replayed bytes':>16}")
+        replayed = report["bondi_utterances"]
+        for index in range(max(len(recorded), len(replayed))):
+            before = f"{recorded[index]['start']:.3f}" if index < len(recorded) else "-"
+            after = f"{replayed[index]['start']:.3f}" if index < len(replayed) else "-"
+            size = replayed[index]["bytes"] if index < len(replayed) else "-"
+            self.stdout.write(f"{before:>15}{after:>15}{size:>16}")
+        for stage, values in report["latency"].get("stages_ms", {}).items():
+            self.stdout.write(f"  {stage:<18} median {values['median']:>6} ms  max {values['max']:>6} ms  n={values['n']}")
+        if options["json_path"]:
+            with open(options["json_path"], "w") as f:
+                json.dump(report, f, indent=2)
+
+    def _run(self, events):
+        providers = ReplayProviders(events)
+        clock = VirtualClock()
+        self._install_clock(clock)
+
+        loop = VirtualTimeLoop(clock)
+        started = time.perf_counter()
+        try:
+            report = loop.run_until_complete(self._replay(loop, providers))
+        finally:
+            loop.close()
+        report["replay_wall_seconds"] = round(time.perf_counter() - started, 3)
+        return report
+
+    @staticmethod
+    def _install_clock(clock):
+        from bondcastConvos import consumers, speculative, speech_trace, turn_timers, voice_metrics
+        for module in (consumers, speculative, speech_trace, turn_timers, voice_metrics):
+            module.time = clock
+        consumers.SPEECH_TRACE_DIR = None  # Don't trace the replay itself
+
+    @staticmethod
+    def _recorded_bursts(events):
+        bursts = []
+        for event in events:
+            if event["kind"] == "out_audio":
+                if bursts and event["t"] - bursts[-1]["end"] <= BURST_GAP:
+                    bursts[-1]["end"] = event["t"]
+                else:
+                    bursts.append({"start": event["t"], "end": event["t"]})
+        return bursts
+
+    async def _replay(self, loop, providers):
+        from bondcastConvos.consumers import SPECULATIVE_LLM, SpeechConsumer
+        from bondcastConvos.tts_cache import tts_cache
+
+        class ReplaySTT:
+            end_of_turn_confidence = None
+
+            def send_audio(self, audio_data):
+                pass
+
+            def stop(self):
+                pass
+
+        consumers = []
+
+        class ReplayConsumer(SpeechConsumer):
+            channel_layer_alias = "replay"  # Not configured, so no channel layer is opened
+
+            async def connect(self):
+                consumers.append(self)
+                await super().connect()
+
+            async def get_user_by_username(self, username):
+                return providers.user
+
+            async def check_user_has_friends(self, user):
+                return True
+
+            def _start_providers(self):
+                self.assembly_stt = ReplaySTT()
+                for event in providers.stt:
+                    if event["event"] == "transcript":
+                        loop.call_at(start + event["t"], self._replay_transcript, event)
+                    elif SPECULATIVE_LLM:
+                        loop.call_at(start + event["t"], self._on_end_of_turn, event["text"])
+
+            def _replay_transcript(self, event):
+                self.assembly_stt.end_of_turn_confidence = event.get("confidence")
+                self._transcribe(event["text"])
+
+            async def _groq_completion_deltas(self, messages):
+                elapsed = 0.0
+                for at, text in providers.llm_reply(messages[-1]["content"]):
+                    await asyncio.sleep(at - elapsed)
+                    elapsed = at
+                    yield text
+
+            async def _history_summary(self, summary, transcript):
+                return ""
+
+            def _tts_synthesizer(self, cacheable):
+                async def synthesize(text, previous_text=None):
+                    elapsed = 0.0
+                    for at, size in providers.tts_parts(text):
+                        await asyncio.sleep(at - elapsed)
+                        elapsed = at
+                        yield bytes(size)
+                return synthesize
+
+        header = providers.header
+        cache.set(f"user_{header['user']['id']}_intro", header["greeting"])
+        cache.set(f"user_{header['user']['id']}_context", header["context"])
+        if header["greeting"] in providers.tts:
+            # The recorded call spoke a pre-rendered greeting as one segment; do the same
+            cache.set(f"user_{header['user']['id']}_intro_audio", tts_cache.key(header["greeting"]))
+
+        inbox = asyncio.Queue()
+        start = loop.time()
+        client = SimulatedClient(loop, inbox)
+        scope = {
+            "type": "websocket",
+            "path": f"/ws/speech/{header['username']}/{header['variant']}/",
+            "url_route": {"args": (), "kwargs": {"username": header["username"], "variant": header["variant"]}},
+        }
+
+        async def receive():
+            return await inbox.get()
+
+        async def send(message):
+            client.on_send(message)
+
+        inbox.put_nowait({"type": "websocket.connect"})
+        for event in providers.inbound:
+            if event["kind"] == "in_audio":
+                message = {"type": "websocket.receive", "bytes": event["data"]}
+            elif json.loads(event["data"]).get("type") in ("audio_started", "audio_done"):
+                continue  # The simulated client acks the replayed audio itself
+            else:
+                message = {"type": "websocket.receive", "text": event["data"]}
+            loop.call_at(start + event["t"], inbox.put_nowait, message)
+        loop.call_at(start + providers.disconnect_at, inbox.put_nowait, {"type": "websocket.disconnect", "code": 1000})
+
+        await ReplayConsumer.as_asgi()(scope, receive, send)
+
+        return {
+            "virtual_seconds": round(loop.time() - start, 3),
+            "closed_with": client.closed,
+            "bondi_utterances": client.bursts,
+            "control_messages": client.messages,
+            "latency": consumers[0].call_metrics.summary() if consumers and hasattr(consumers[0], "call_metrics") else {},
+        }
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import random
+import time
+import uuid
+from urllib.parse import urlparse
+import numpy as np  # type: ignore
+from django.core.management.base import BaseCommand, CommandError  # type: ignore
+from websockets.asyncio.server import serve  # type: ignore
+
+SAMPLE_RATE = 16000
+SPEECH_RMS = 500  # int16 RMS above which the STT stand-in treats audio as speech
+TTS_MS_PER_CHAR = 65  # roughly conversational speaking rate
+TTS_CHUNK_MS = 100
+
+TRANSCRIPTS = [
+    "I went hiking with my friends this weekend and it was amazing.",
+    "Honestly I have been so busy with school that I barely had time to relax.",
+    "My favorite part was definitely the food at the end.",
+    "I think I would rather travel somewhere warm next time.",
+]
+
+
+class Latency:
+    """A latency distribution given as 'mean_ms' or 'mean_ms:jitter_ms' (gaussian, clipped at 0)"""
+
+    def __init__(self, spec):
+        mean, _, jitter = spec.partition(":")
+        try:
+            self.mean = float(mean) / 1000
+            self.jitter = float(jitter or 0) / 1000
+        except ValueError:
+            raise CommandError(f"Bad latency '{spec}', expected mean_ms or mean_ms:jitter_ms")
+
+    def sample(self):
+        return max(0.0, random.gauss(self.mean, self.jitter)) if self.jitter else self.mean
+
+    async def wait(self):
+        await asyncio.sleep(self.sample())
+
+
+class AssemblyStub:
+    """
+    AssemblyAI v3 streaming stand-in. Treats loud audio as speech, sends unformatted
+    partials while it lasts and, once it's followed by silence, an end_of_turn partial
+    and then the formatted transcript. A turn still in progress at Terminate is
+    flushed before the Termination message.
+    """
+
+    def __init__(self, end_silence, partial_interval, final_latency, format_latency):
+        self.end_silence = end_silence
+        self.partial_interval = partial_interval
+        self.final_latency = final_latency
+        self.format_latency = format_latency
+        self.sessions = 0
+
+    async def handle(self, ws):
+        self.sessions += 1
+        await ws.send(json.dumps({"type": "Begin", "id": uuid.uuid4().hex, "expires_at": int(time.time()) + 3600}))
+        speaking = False
+        last_voice = next_partial = 0.0
+        turn_order = 0
+        words = random.choice(TRANSCRIPTS).split()
+        heard = 0
+        finalizers = set()
+        try:
+            async for message in ws:
+                if isinstance(message, str):
+                    if json.loads(message).get("type") == "Terminate":
+                        # Like AssemblyAI, flush the turn in progress before confirming
+                        if speaking:
+                            await ws.send(self._turn(turn_order, words, end_of_turn=True, formatted=True))
+                        await ws.send(json.dumps({"type": "Termination"}))
+                        break
+                    continue
+
+                now = time.monotonic()
+                samples = np.frombuffer(message, dtype="<i2").astype(np.float32)
+                voiced = len(samples) and float(np.sqrt(np.mean(samples * samples))) > SPEECH_RMS
+                if voiced:
+                    if not speaking:
+                        speaking, heard, next_partial = True, 0, now + self.partial_interval
+                    last_voice = now
+                    if now >= next_partial and heard < len(words):
+                        heard += 1
+                        next_partial = now + self.partial_interval
+                        await ws.send(self._turn(turn_order, words[:heard], end_of_turn=False, formatted=False))
+                elif speaking and now - last_voice >= self.end_silence:
+                    speaking = False
+                    task = asyncio.create_task(self._finalize(ws, turn_order, words))
+                    finalizers.add(task)
+                    task.add_done_callback(finalizers.discard)
+                    turn_order += 1
+                    words = random.choice(TRANSCRIPTS).split()
+        finally:
+            for task in finalizers:
+                task.cancel()
+
+    async def _finalize(self, ws, turn_order, words):
+        await self.final_latency.wait()
+        await ws.send(self._turn(turn_order, words, end_of_turn=True, formatted=False))
+        await self.format_latency.wait()
+        await ws.send(self._turn(turn_order, words, end_of_turn=True, formatted=True))
+
+    @staticmethod
+    def _turn(turn_order, words, end_of_turn, formatted):
+        transcript = " ".join(words)
+        if not formatted:
+            transcript = transcript.lower().replace(".", "").replace(",", "")
+        return json.dumps({
+            "type": "Turn",
+            "turn_order": turn_order,
+            "end_of_turn": end_of_turn,
+            "turn_is_formatted": formatted,
+            "transcript": transcript,
+            "words": [],
+        })
+
+
+class HTTPStub:
+    """Minimal HTTP/1.1 server for the Groq and ElevenLabs stand-ins, with chunked streaming"""
+
+    def __init__(self, route):
+        self.route = route
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                await self.route(method, urlparse(target), body, Response(writer))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+class Response:
+    def __init__(self, writer):
+        self.writer = writer
+
+    async def send(self, status, content_type, body):
+        self.writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await self.writer.drain()
+
+    async def start(self, content_type):
+        self.writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\nTransfer-Encoding: chunked\r\n\r\n".encode())
+        await self.writer.drain()
+
+    async def write(self, data):
+        self.writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        await self.writer.drain()
+
+    async def end(self):
+        self.writer.write(b"0\r\n\r\n")
+        await self.writer.drain()
+
+
+class GroqStub:
+    """Chat completions stand-in; streams the reply as SSE deltas"""
+
+    def __init__(self, reply, first_token_latency, token_interval):
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        self.requests = 0
+
+    async def route(self, method, url, body, response):
+        if method != "POST" or not url.path.endswith("/chat/completions"):
+            await response.send("404 Not Found", "application/json", b'{"error": "not found"}')
+            return
+        self.requests += 1
+        request = json.loads(body or b"{}")
+        system = next((m["content"] for m in request.get("messages", []) if m["role"] == "system"), "")
+        if "bondi_response" in system:
+            content = json.dumps({"bondi_response": self.reply, "end_call": False})
+        else:
+            content = "They chatted about their week."
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = request.get("model", "stub")
+
+        await self.first_token_latency.wait()
+        if not request.get("stream"):
+            await response.send("200 OK", "application/json", json.dumps({
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode())
+            return
+
+        await response.start("text/event-stream")
+        tokens = [content[i:i + 4] for i in range(0, len(content), 4)]
+        for index, token in enumerate(tokens):
+            if index:
+                await self.token_interval.wait()
+            await response.write(self._chunk(completion_id, model, {"content": token}, None))
+        await response.write(self._chunk(completion_id, model, {}, "stop"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.end()
+
+    @staticmethod
+    def _chunk(completion_id, model, delta, finish_reason):
+        chunk = {
+            "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+class ElevenLabsStub:
+    """Text-to-speech stand-in; streams a quiet tone as long as the text would take to say"""
+
+    def __init__(self, first_byte_latency, speed):
+        self.first_byte_latency = first_byte_latency
+        self.speed = speed
+        self.requests = 0
+        t = np.arange(SAMPLE_RATE * TTS_CHUNK_MS // 1000) / SAMPLE_RATE
+        self.chunk = (1000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+    async def route(self, method, url, body, response):
+        if method != "POST" or "/text-to-speech/" not in url.path:
+            await response.send("404 Not Found", "application/json", b'{"detail": "not found"}')
+            return
+        self.requests += 1
+        text = json.loads(body or b"{}").get("text", "")
+        chunks = max(1, len(text) * TTS_MS_PER_CHAR // TTS_CHUNK_MS)
+
+        await self.first_byte_latency.wait()
+        await response.start("application/octet-stream")
+        for index in range(chunks):
+            if index:
+                await asyncio.sleep(TTS_CHUNK_MS / 1000 / self.speed)
+            await response.write(self.chunk)
+        await response.end()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs local stand-ins for AssemblyAI, Groq and ElevenLabs with configurable latency, for load tests. "
+        "Point the server at them with ASSEMBLYAI_STREAMING_URL, GROQ_BASE_URL and ELEVENLABS_BASE_URL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--assembly-port", type=int, default=9101)
+        parser.add_argument("--groq-port", type=int, default=9102)
+        parser.add_argument("--elevenlabs-port", type=int, default=9103)
+        parser.add_argument("--stt-end-silence-ms", type=int, default=400, help="Silence that ends a user turn")
+        parser.add_argument("--stt-partial-ms", type=int, default=250, help="Interval between partials while speaking")
+        parser.add_argument("--stt-final", default="150:50", help="End of speech to end_of_turn partial, mean_ms[:jitter_ms]")
+        parser.add_argument("--stt-format", default="250:80", help="end_of_turn partial to formatted transcript")
+        parser.add_argument("--llm-first-token", default="300:100", help="Request to first streamed token")
+        parser.add_argument("--llm-token-interval", default="10:3", help="Between streamed tokens")
+        parser.add_argument("--llm-reply", default="That sounds like so much fun! What was the best part of it?")
+        parser.add_argument("--tts-first-byte", default="250:80", help="Request to first audio byte")
+        parser.add_argument("--tts-speed", type=float, default=4.0, help="Audio generated per second of wall time")
+
+    def handle(self, *args, **options):
+        asyncio.run(self._serve(options))
+
+    async def _serve(self, options):
+        host = options["host"]
+        assembly = AssemblyStub(
+            options["stt_end_silence_ms"] / 1000, options["stt_partial_ms"] / 1000,
+            Latency(options["stt_final"]), Latency(options["stt_format"]),
+        )
+        groq = GroqStub(options["llm_reply"], Latency(options["llm_first_token"]), Latency(options["llm_token_interval"]))
+        elevenlabs = ElevenLabsStub(Latency(options["tts_first_byte"]), options["tts_speed"])
+
+        groq_server = await asyncio.start_server(HTTPStub(groq.route).handle, host, options["groq_port"])
+        elevenlabs_server = await asyncio.start_server(HTTPStub(elevenlabs.route).handle, host, options["elevenlabs_port"])
+        async with serve(assembly.handle, host, options["assembly_port"], max_size=None):
+            self.stdout.write(f"ASSEMBLYAI_STREAMING_URL=ws://{host}:{options['assembly_port']}/v3/ws")
+            self.stdout.write(f"GROQ_BASE_URL=http://{host}:{options['groq_port']}")
+            self.stdout.write(f"ELEVENLABS_BASE_URL=http://{host}:{options['elevenlabs_port']}")
+            async with groq_server, elevenlabs_server:
+                while True:
+                    await asyncio.sleep(30)
+                    self.stdout.write(
+                        f"stt sessions {assembly.sessions}, llm requests {groq.requests}, tts requests {elevenlabs.requests}"
+                    )
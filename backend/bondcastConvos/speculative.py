@@ -0,0 +1,125 @@
+import asyncio
+import difflib
+import os
+import re
+import threading
+import time
+from contextlib import aclosing
+
+# Start the LLM reply from AssemblyAI's end-of-turn partial instead of waiting for the
+# formatted transcript and the silence threshold. Misses cost an extra LLM request.
+SPECULATIVE_LLM = os.getenv('SPECULATIVE_LLM', 'false').lower() == 'true'
+# How close the final transcript must be to the speculated one for the reply to be kept
+SPECULATIVE_MIN_SIMILARITY = float(os.getenv('SPECULATIVE_MIN_SIMILARITY', '0.9'))
+
+_NON_WORD = re.compile(r"[^\w\s']+")
+
+
+def normalize_transcript(text):
+    """Lowercases and strips punctuation, which is what formatting adds to a partial"""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def transcript_similarity(a, b):
+    a, b = normalize_transcript(a), normalize_transcript(b)
+    if a == b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+
+
+class SpeculativeReply:
+    """
+    An LLM completion started from a partial transcript. Deltas are buffered while
+    the turn is still being confirmed; replay() yields the buffered ones and then
+    follows the live stream, so a kept speculation picks up where generation is.
+    """
+
+    def __init__(self, transcript, completion):
+        self.transcript = transcript
+        self.started = time.time()
+        self.finished = None
+        self._deltas = []
+        self._error = None
+        self._done = False
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._pump(completion))
+
+    async def _pump(self, completion):
+        try:
+            async with aclosing(completion):
+                async for delta in completion:
+                    self._deltas.append(delta)
+                    self._changed.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._error = e  # Raised to whoever replays it, like a live stream would
+        finally:
+            self._done = True
+            self.finished = time.time()
+            self._changed.set()
+
+    def matches(self, transcript):
+        return transcript_similarity(self.transcript, transcript) >= SPECULATIVE_MIN_SIMILARITY
+
+    def head_start(self):
+        """Seconds of generation done before the reply was needed"""
+        return (self.finished or time.time()) - self.started
+
+    async def replay(self):
+        index = 0
+        try:
+            while True:
+                while index < len(self._deltas):
+                    yield self._deltas[index]
+                    index += 1
+                if self._done:
+                    if self._error:
+                        raise self._error
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            if not self._done:
+                self.cancel()
+
+    def cancel(self):
+        self._task.cancel()
+
+
+class SpeculationStats:
+    """Process-wide speculation counters"""
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+        self._lock = threading.Lock()
+
+    def record_start(self):
+        with self._lock:
+            self.started += 1
+
+    def record(self, hit, saved=0.0):
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.latency_saved += saved
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            resolved = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / resolved, 3) if resolved else None,
+                "latency_saved_ms_total": round(1000 * self.latency_saved),
+                "latency_saved_ms_avg": round(1000 * self.latency_saved / self.hits) if self.hits else None,
+            }
+
+
+speculation_stats = SpeculationStats()
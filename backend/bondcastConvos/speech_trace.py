@@ -0,0 +1,61 @@
+import base64
+import gzip
+import itertools
+import json
+import os
+import time
+from pathlib import Path
+
+# When set, every call writes a trace of its inbound audio, control messages, provider
+# responses and outbound messages here, for replay_speech_trace
+SPEECH_TRACE_DIR = os.getenv('SPEECH_TRACE_DIR')
+
+
+class TraceRecorder:
+    """
+    Timestamped record of one call. Events are kept in memory while the call runs
+    and written out as gzipped JSON lines by save(), which blocks and should be run
+    off the event loop. Times are seconds since the call connected.
+    """
+
+    def __init__(self, directory, name):
+        self.path = Path(directory) / f"{name}.jsonl.gz"
+        self.started = time.monotonic()
+        self.events = []
+        self._ids = itertools.count()
+
+    def record(self, kind, **fields):
+        # list.append is atomic, so provider threads can record directly
+        self.events.append({"t": round(time.monotonic() - self.started, 6), "kind": kind, **fields})
+
+    def new_id(self):
+        return next(self._ids)
+
+    def inbound(self, text_data, bytes_data):
+        if bytes_data:
+            self.record("in_audio", data=base64.b64encode(bytes_data).decode("ascii"))
+        elif text_data:
+            self.record("in_text", data=text_data)
+
+    def outbound(self, text_data, bytes_data):
+        if bytes_data:
+            self.record("out_audio", size=len(bytes_data))
+        elif text_data:
+            self.record("out_text", data=text_data)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for event in self.events:
+                f.write(json.dumps(event) + "\n")
+        return self.path
+
+
+def load_trace(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    for event in events:
+        if event["kind"] == "in_audio":
+            event["data"] = base64.b64decode(event["data"])
+    return events
@@ -0,0 +1,264 @@
+import json
+import re
+from typing import Optional
+from pydantic import BaseModel  # type: ignore
+
+
+class BondiResponse(BaseModel):
+    bondi_response: str
+    end_call: bool
+
+
+_WHITESPACE = " \t\r\n"
+_SIMPLE_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_LENIENT_RESPONSE = re.compile(r'"bondi_response"\s*:\s*"((?:[^"\\]|\\.)*)', re.DOTALL)
+_LENIENT_END_CALL = re.compile(r'"end_call"\s*:\s*"?(true|false)', re.IGNORECASE)
+
+
+class BondiResponseParser:
+    """
+    Incremental parser for the streamed BondiResponse JSON object.
+
+    feed() takes raw completion deltas and returns whatever new bondi_response text
+    they completed, so speech can start before the object is closed. end_call is
+    resolved whenever its literal finishes. Output that isn't a JSON object is read
+    as plain reply text instead, and a stream that breaks mid-object falls back to a
+    lenient regex read in finish() rather than a second LLM request.
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.end_call: Optional[bool] = None
+        self.response_text = ""
+        self.mode = None  # None until the first meaningful character, then "json" or "text"
+        self.malformed = False
+
+        self._state = "start"
+        self._key = ""
+        self._string = ""
+        self._escape = None  # None, "" after a backslash, or collected \u hex digits
+        self._high_surrogate = None
+        self._literal = ""
+        self._depth = 0
+        self._nested_in_string = False
+        self._nested_escape = False
+
+    def feed(self, delta) -> str:
+        if not delta:
+            return ""
+        self.raw += delta
+        if self.malformed:
+            return ""
+
+        emitted = []
+        for char in delta:
+            if self.mode == "text":
+                emitted.append(char)
+                continue
+            out = self._step(char)
+            if out:
+                emitted.append(out)
+            if self.malformed:
+                break
+
+        text = "".join(emitted)
+        self.response_text += text
+        return text
+
+    def finish(self) -> str:
+        """Flushes the parse at end of stream and returns any text recovered by the fallback"""
+        if self.mode == "json" and self._state == "literal":
+            self._finish_literal()
+
+        recovered = ""
+        if self.mode == "json" and self._state != "done" and not self.response_text:
+            # Truncated or malformed object: salvage what we can from the raw text
+            match = _LENIENT_RESPONSE.search(self.raw)
+            if match:
+                try:
+                    recovered = json.loads(f'"{match.group(1)}"')
+                except json.JSONDecodeError:
+                    recovered = match.group(1).replace('\\"', '"').replace('\\n', ' ')
+            else:
+                recovered = self.raw.strip().strip("`").strip()
+                if recovered.startswith("{"):
+                    recovered = ""
+
+        if self.end_call is None:
+            match = _LENIENT_END_CALL.search(self.raw)
+            self.end_call = bool(match and match.group(1).lower() == "true")
+
+        if self.mode == "text":
+            # A stray fence or trailing whitespace shouldn't be spoken
+            self.response_text = self.response_text.rstrip().rstrip("`").rstrip()
+
+        self.response_text += recovered
+        return recovered
+
+    def result(self) -> BondiResponse:
+        return BondiResponse(bondi_response=self.response_text.strip(), end_call=bool(self.end_call))
+
+    def _step(self, char) -> str:
+        state = self._state
+
+        if state == "start":
+            if char in _WHITESPACE:
+                return ""
+            if char == "`":
+                # Tolerate a ```json fence around the object
+                self._state = "fence"
+                return ""
+            if char == "{":
+                self.mode = "json"
+                self._state = "key_or_end"
+                return ""
+            # Not JSON at all; read the whole completion as the reply
+            self.mode = "text"
+            return char
+
+        if state == "fence":
+            if char == "\n":
+                self._state = "start"
+            return ""
+
+        if state in ("key_or_end", "key"):
+            if char in _WHITESPACE or (char == "," and state == "key_or_end"):
+                return ""
+            if char == "}" and state == "key_or_end":
+                self._state = "done"
+                return ""
+            if char == '"':
+                self._key = ""
+                self._string = ""
+                self._state = "key_string"
+                return ""
+            return self._fail()
+
+        if state == "key_string":
+            decoded = self._string_char(char)
+            if decoded is None:
+                self._key = self._string
+                self._state = "colon"
+            return ""
+
+        if state == "colon":
+            if char in _WHITESPACE:
+                return ""
+            if char == ":":
+                self._state = "value"
+                return ""
+            return self._fail()
+
+        if state == "value":
+            if char in _WHITESPACE:
+                return ""
+            if char == '"':
+                self._string = ""
+                self._state = "response_string" if self._key == "bondi_response" else "other_string"
+                return ""
+            if char in "{[":
+                self._depth = 1
+                self._state = "nested"
+                return ""
+            self._literal = char
+            self._state = "literal"
+            return ""
+
+        if state == "response_string":
+            decoded = self._string_char(char)
+            if decoded is None:
+                self._state = "after_value"
+                return ""
+            return decoded
+
+        if state == "other_string":
+            decoded = self._string_char(char)
+            if decoded is None:
+                if self._key == "end_call" and self._string.lower() in ("true", "false"):
+                    self.end_call = self._string.lower() == "true"
+                self._state = "after_value"
+            return ""
+
+        if state == "literal":
+            if char in ",}" or char in _WHITESPACE:
+                self._finish_literal()
+                self._state = "after_value"
+                return self._step(char)
+            self._literal += char
+            return ""
+
+        if state == "nested":
+            if self._nested_in_string:
+                if self._nested_escape:
+                    self._nested_escape = False
+                elif char == "\\":
+                    self._nested_escape = True
+                elif char == '"':
+                    self._nested_in_string = False
+            elif char == '"':
+                self._nested_in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = "after_value"
+            return ""
+
+        if state == "after_value":
+            if char in _WHITESPACE:
+                return ""
+            if char == ",":
+                self._state = "key"
+                return ""
+            if char == "}":
+                self._state = "done"
+                return ""
+            return self._fail()
+
+        # "done": ignore anything after the object, e.g. a closing fence
+        return ""
+
+    def _string_char(self, char):
+        """Consumes one character of a JSON string; returns decoded text, or None at the closing quote"""
+        if self._escape is not None:
+            if self._escape == "" and char != "u":
+                self._escape = None
+                decoded = _SIMPLE_ESCAPES.get(char, char)
+                self._string += decoded
+                return decoded
+            if self._escape == "" and char == "u":
+                self._escape = "u"
+                return ""
+            self._escape += char
+            if len(self._escape) < 5:
+                return ""
+            code = int(self._escape[1:], 16) if all(c in "0123456789abcdefABCDEF" for c in self._escape[1:]) else 0xFFFD
+            self._escape = None
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = code
+                return ""
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            decoded = chr(code)
+            self._string += decoded
+            return decoded
+
+        if char == "\\":
+            self._escape = ""
+            return ""
+        if char == '"':
+            return None
+        self._string += char
+        return char
+
+    def _finish_literal(self):
+        literal = self._literal.strip().lower()
+        if self._key == "end_call" and literal in ("true", "false"):
+            self.end_call = literal == "true"
+        self._literal = ""
+
+    def _fail(self) -> str:
+        self.malformed = True
+        return ""
@@ -0,0 +1,153 @@
+import logging
+import os
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Hedge AssemblyAI with the call's local Vosk recognizer: when Vosk finalizes an
+# utterance and AssemblyAI's transcript for it hasn't arrived within the deadline (or
+# the AssemblyAI session is down), Vosk's text is used for the turn instead.
+STT_FALLBACK = os.getenv('STT_FALLBACK', 'false').lower() == 'true'
+# Seconds after Vosk's final result that AssemblyAI's transcript is still waited for
+STT_FALLBACK_DEADLINE = float(os.getenv('STT_FALLBACK_DEADLINE', '1.0'))
+# AssemblyAI's transcript of an utterance Vosk already answered is dropped if it
+# arrives within this many seconds; after that it's treated as lost
+STT_FALLBACK_LATE_WINDOW = float(os.getenv('STT_FALLBACK_LATE_WINDOW', '5'))
+
+
+class FallbackStats:
+    """Process-wide counts of which engine supplied each turn's transcript"""
+
+    def __init__(self):
+        self.wins = Counter()  # "assemblyai", "vosk_deadline", "vosk_unhealthy"
+        self.late_cloud = 0
+        self.lost_cloud = 0
+        self.incomplete_vosk = 0
+        self.latency_saved = 0.0
+        self._lock = threading.Lock()
+
+    def record_win(self, reason):
+        with self._lock:
+            self.wins[reason] += 1
+
+    def record_late(self, saved):
+        with self._lock:
+            self.late_cloud += 1
+            self.latency_saved += saved
+
+    def record_lost(self):
+        with self._lock:
+            self.lost_cloud += 1
+
+    def record_incomplete(self):
+        with self._lock:
+            self.incomplete_vosk += 1
+
+    def snapshot(self):
+        with self._lock:
+            turns = sum(self.wins.values())
+            fallbacks = turns - self.wins["assemblyai"]
+            return {
+                "turns": turns,
+                "wins": dict(self.wins),
+                "fallback_rate": round(fallbacks / turns, 3) if turns else None,
+                "late_assemblyai": self.late_cloud,
+                "lost_assemblyai": self.lost_cloud,
+                "incomplete_vosk": self.incomplete_vosk,
+                "latency_saved_ms_total": round(1000 * self.latency_saved),
+                "latency_saved_ms_avg": round(1000 * self.latency_saved / self.late_cloud) if self.late_cloud else None,
+            }
+
+
+fallback_stats = FallbackStats()
+
+
+class TranscriptHedge:
+    """
+    Per-call race between AssemblyAI's transcript and Vosk's final result for each
+    utterance. Runs on the event loop.
+
+    Utterances are matched by time: an AssemblyAI transcript that arrives after Vosk
+    heard an utterance start covers it. When Vosk's text is used, the AssemblyAI
+    transcript that turns up late for the same utterance is dropped, as long as
+    Vosk hasn't heard new speech since.
+    """
+
+    def __init__(self, loop, deliver, cloud_healthy, deadline=STT_FALLBACK_DEADLINE,
+                 late_window=STT_FALLBACK_LATE_WINDOW):
+        self.loop = loop
+        self.deliver = deliver  # Called with (transcript, engine)
+        self.cloud_healthy = cloud_healthy
+        self.deadline = deadline
+        self.late_window = late_window
+        self.onset_at = None  # When Vosk heard the current utterance start
+        self.cloud_at = None  # When the last AssemblyAI transcript arrived
+        self.pending = None  # Timer handle for Vosk's text
+        self.pending_text = ""
+        self.adopted_at = None  # When Vosk's text was last used
+        self.wins = Counter()
+
+    def on_vosk_partial(self):
+        if self.onset_at is None:
+            self.onset_at = self.loop.time()
+
+    def on_vosk_final(self, text, complete=True):
+        now = self.loop.time()
+        onset, self.onset_at = self.onset_at or now, None
+        if not text:
+            return
+        if not complete:
+            # Vosk fell behind and skipped some of this utterance's audio
+            fallback_stats.record_incomplete()
+            logger.warning(f"Vosk transcript missing audio, not used: {text}")
+            return
+        if self.cloud_at is not None and self.cloud_at >= onset:
+            return  # AssemblyAI already delivered this utterance
+        if self.pending:
+            # Still waiting on the previous utterance; send both together
+            self.pending.cancel()
+            text = f"{self.pending_text} {text}"
+        if not self.cloud_healthy():
+            self._adopt(text, "vosk_unhealthy")
+            return
+        self.pending_text = text
+        self.pending = self.loop.call_later(self.deadline, self._adopt, text, "vosk_deadline")
+
+    def on_cloud_transcript(self, transcript):
+        """Returns whether AssemblyAI's transcript should be used"""
+        now = self.loop.time()
+        self.cloud_at = now
+        if self.pending:
+            self.pending.cancel()
+            self.pending = None
+        if self.adopted_at is not None:
+            adopted_at, self.adopted_at = self.adopted_at, None
+            if now - adopted_at <= self.late_window and (self.onset_at is None or self.onset_at <= adopted_at):
+                fallback_stats.record_late(now - adopted_at)
+                logger.info(f"AssemblyAI transcript {now - adopted_at:.2f}s behind Vosk, dropped: {transcript}")
+                return False
+        self._record("assemblyai")
+        return True
+
+    def close(self):
+        if self.pending:
+            self.pending.cancel()
+            self.pending = None
+
+    def _adopt(self, text, reason):
+        self.pending = None
+        self.adopted_at = self.loop.time()
+        self.loop.call_later(self.late_window, self._expire, self.adopted_at)
+        logger.info(f"Using Vosk transcript ({reason}): {text}")
+        self._record(reason)
+        self.deliver(text, "vosk")
+
+    def _expire(self, adopted_at):
+        if self.adopted_at == adopted_at:
+            self.adopted_at = None
+            fallback_stats.record_lost()
+
+    def _record(self, reason):
+        self.wins[reason] += 1
+        fallback_stats.record_win(reason)
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import math
+import os
+from collections import deque
+from .assembly_stt import AssemblySTT
+from .voice_metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Keep AssemblyAI sessions connected ahead of calls, so a call's STT is live without
+# waiting for the TLS and WebSocket handshake. AssemblyAI bills streaming by session
+# time whether or not audio is sent, so this is opt-in.
+STT_POOL = os.getenv('STT_POOL', 'false').lower() == 'true'
+STT_POOL_MIN = int(os.getenv('STT_POOL_MIN', '0'))
+STT_POOL_MAX = int(os.getenv('STT_POOL_MAX', '4'))
+
+# Below this many calls a minute (recent average) only STT_POOL_MIN sessions are kept
+STT_POOL_MIN_RATE = float(os.getenv('STT_POOL_MIN_RATE', '0.5'))
+# Time constant of the call arrival rate average, in seconds
+STT_POOL_RATE_WINDOW = float(os.getenv('STT_POOL_RATE_WINDOW', '300'))
+
+# Unleased sessions are closed after this long and replaced if still needed
+STT_POOL_IDLE_TIMEOUT = float(os.getenv('STT_POOL_IDLE_TIMEOUT', '30'))
+
+CONNECT_TIMEOUT = 10.0
+CHECK_INTERVAL = 2.0
+MISS_PROBABILITY = 0.01  # Acceptable chance that a burst of calls empties the pool
+
+
+class STTSessionPool:
+    """
+    Per-process pool of connected, idle AssemblySTT sessions.
+
+    open() hands a call the most recently connected session and a background task
+    connects a replacement. A session serves one call: AssemblyAI has no way to
+    reset one, so the consumer still stops it on disconnect and the pool connects
+    a new one. The pool is sized from the recent call arrival rate, and idle
+    sessions are dropped once they close (websockets' keepalive pings notice dead
+    connections) or outlive STT_POOL_IDLE_TIMEOUT.
+    """
+
+    def __init__(self, enabled=STT_POOL):
+        self.enabled = enabled
+        self.idle = deque()  # (session, pooled at)
+        self.connecting = set()
+        self.loop = None
+        self.rate = 0.0  # calls per second, decayed to rate_at
+        self.rate_at = 0.0
+        self.connect_time = 0.5  # Average start() to Begin, in seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.unhealthy = 0
+        self.failures = 0
+        self.failing = 0  # Consecutive failed connects
+        self.retry_at = 0.0
+        self.connect_wait = LatencyHistogram()  # How long calls waited for their session
+        self._wakeup = None
+        self._task = None
+
+    def open(self, on_transcript, on_end_of_turn=None) -> AssemblySTT:
+        """Returns a started session for a new call; must be called on the event loop"""
+        loop = asyncio.get_running_loop()
+        self._bind(loop)
+        self._arrival(loop.time())
+
+        session = self._take() if self.enabled else None
+        if session:
+            self.hits += 1
+            self.connect_wait.record(0)
+        else:
+            if self.enabled:
+                self.misses += 1
+            session = AssemblySTT(on_transcript, on_end_of_turn)
+            session.start()
+            loop.create_task(self._record_wait(session))
+        session.on_transcript_callback = on_transcript
+        session.on_end_of_turn_callback = on_end_of_turn
+
+        if self.enabled:
+            self._wakeup.set()
+        return session
+
+    def snapshot(self):
+        now = self.loop.time() if self.loop else 0.0
+        return {
+            "enabled": self.enabled,
+            "idle": len(self.idle),
+            "connecting": len(self.connecting),
+            "target": self._target(now) if self.loop else 0,
+            "calls_per_min": round(60 * self._rate(now), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "unhealthy": self.unhealthy,
+            "failures": self.failures,
+            "connect_ms": round(1000 * self.connect_time),
+            "connect_wait_ms": self.connect_wait.snapshot(),
+        }
+
+    def _bind(self, loop):
+        if self.loop is loop:
+            return
+        # Sessions belong to the loop they were opened on
+        self.idle.clear()
+        self.connecting.clear()
+        self.loop = loop
+        self._wakeup = asyncio.Event()
+        if self.enabled:
+            self._task = loop.create_task(self._maintain())
+
+    def _arrival(self, now):
+        self.rate = self._rate(now) + 1 / STT_POOL_RATE_WINDOW
+        self.rate_at = now
+
+    def _rate(self, now):
+        return self.rate * math.exp(-(now - self.rate_at) / STT_POOL_RATE_WINDOW)
+
+    def _target(self, now):
+        rate = self._rate(now)
+        if 60 * rate < STT_POOL_MIN_RATE:
+            return min(STT_POOL_MIN, STT_POOL_MAX)
+        # One session for the next call, plus enough that the calls arriving while
+        # it is replaced (Poisson, over one connect time) rarely find the pool empty
+        expected = rate * self.connect_time
+        extra, term = 0, math.exp(-expected)
+        covered = term
+        while 1 - covered > MISS_PROBABILITY and extra < STT_POOL_MAX:
+            extra += 1
+            term *= expected / extra
+            covered += term
+        return min(max(1 + extra, STT_POOL_MIN), STT_POOL_MAX)
+
+    def _take(self):
+        while self.idle:
+            session, _ = self.idle.pop()
+            if session.ready:
+                return session
+            self.unhealthy += 1
+            session.stop()
+        return None
+
+    async def _maintain(self):
+        while True:
+            try:
+                self._check(self.loop.time())
+            except Exception as e:
+                logger.error(f"STT pool check failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _check(self, now):
+        for session, pooled_at in list(self.idle):
+            if not session.ready:
+                self.unhealthy += 1
+            elif now - pooled_at > STT_POOL_IDLE_TIMEOUT:
+                self.expired += 1
+            else:
+                continue
+            self.idle.remove((session, pooled_at))
+            session.stop()
+
+        target = self._target(now)
+        # Oldest first, so the sessions kept are the freshest
+        while self.idle and len(self.idle) + len(self.connecting) > target:
+            self.idle.popleft()[0].stop()
+        if now < self.retry_at:
+            return
+        while len(self.idle) + len(self.connecting) < target:
+            session = AssemblySTT(None)
+            session.start()
+            self.connecting.add(session)
+            self.loop.create_task(self._connect(session))
+
+    async def _connect(self, session):
+        started = self.loop.time()
+        ready = await _wait_ready(session, CONNECT_TIMEOUT)
+        self.connecting.discard(session)
+        if not ready:
+            # Back off so an outage or a bad key doesn't turn into a reconnect loop
+            self.failures += 1
+            self.failing += 1
+            self.retry_at = self.loop.time() + min(2 ** min(self.failing, 5), 30)
+            session.stop()
+            logger.warning(f"Pooled AssemblyAI session failed to connect ({self.failing} in a row)")
+        else:
+            self.failing = 0
+            self.connect_time = 0.8 * self.connect_time + 0.2 * (self.loop.time() - started)
+            self.idle.append((session, self.loop.time()))
+        self._wakeup.set()
+
+    async def _record_wait(self, session):
+        started = self.loop.time()
+        if await _wait_ready(session, CONNECT_TIMEOUT):
+            waited = self.loop.time() - started
+            self.connect_wait.record(1000 * waited)
+            self.connect_time = 0.8 * self.connect_time + 0.2 * waited
+
+
+async def _wait_ready(session, timeout):
+    """Waits until the session is accepted or has closed; returns whether it is ready"""
+    waiters = [asyncio.ensure_future(session.began.wait()), asyncio.ensure_future(session.closed.wait())]
+    try:
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for waiter in waiters:
+            waiter.cancel()
+    return session.ready
+
+
+stt_pool = STTSessionPool()
@@ -0,0 +1,290 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+from .tts_pipeline import TTS_MODEL_ID, TTS_OUTPUT_FORMAT, render_tts_audio_blocking, stream_tts_audio
+
+logger = logging.getLogger(__name__)
+
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', str(Path(__file__).resolve().parent.parent / 'tts_cache'))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv('TTS_CACHE_MEMORY_MB', '32')) * 1024 * 1024
+TTS_CACHE_DISK_BYTES = int(os.getenv('TTS_CACHE_DISK_MB', '256')) * 1024 * 1024
+TTS_BACKGROUND_RENDER_WORKERS = int(os.getenv('TTS_BACKGROUND_RENDER_WORKERS', '2'))
+# Cached audio goes out in chunks of about this size, like a provider stream would
+CACHE_CHUNK_BYTES = 8192
+
+
+def normalize_tts_text(text):
+    return " ".join(text.split())
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized PCM in front of ElevenLabs.
+
+    Entries are keyed by sha256 of (voice, model, output format, normalized text), so
+    a change to any of them misses instead of playing stale audio. Recently used
+    entries are kept in memory under an LRU byte budget; every entry is also written
+    to TTS_CACHE_DIR as raw PCM, where the least recently used files are evicted once
+    the directory goes over its size budget.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, memory_bytes=TTS_CACHE_MEMORY_BYTES, disk_bytes=TTS_CACHE_DISK_BYTES):
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: OrderedDict = OrderedDict()
+        self._memory_size = 0
+        self._disk: Optional[Dict[str, int]] = None
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        self._rendering: Dict[str, asyncio.Future] = {}
+        self._prewarm_task = None
+        self._background: Dict[str, Future] = {}
+        self._background_executor = None
+
+    def key(self, text, voice_id=None):
+        voice_id = voice_id or os.getenv('ELEVENLABS_VOICE_ID') or ""
+        material = "\0".join([voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, normalize_tts_text(text)])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get_memory(self, key) -> Optional[bytes]:
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+            return pcm
+
+    def get(self, key) -> Optional[bytes]:
+        """Memory tier first, then disk; disk hits are promoted into memory. Blocking."""
+        pcm = self.get_memory(key)
+        if pcm is None:
+            pcm = self._read_disk(key)
+            if pcm is not None:
+                self._put_memory(key, pcm)
+        return pcm
+
+    def put(self, key, pcm):
+        """Stores in both tiers. Blocking, since it writes to disk."""
+        self._put_memory(key, pcm)
+        self._write_disk(key, pcm)
+
+    async def lookup(self, key) -> Optional[bytes]:
+        pcm = self.get_memory(key)
+        if pcm is None:
+            pcm = await asyncio.to_thread(self.get, key)
+        return pcm
+
+    async def synthesize(self, text, previous_text=None, store=True) -> AsyncIterator[bytes]:
+        """
+        Drop-in for stream_tts_audio that plays cached audio when there is some. Text
+        conditioned on previous_text is prosody-dependent and always goes to the provider.
+        """
+        if previous_text:
+            async for chunk in stream_tts_audio(text, previous_text):
+                yield chunk
+            return
+
+        key = self.key(text)
+        pcm = await self.lookup(key)
+        if pcm is not None:
+            self._count(hit=True)
+            for start in range(0, len(pcm), CACHE_CHUNK_BYTES):
+                yield pcm[start:start + CACHE_CHUNK_BYTES]
+            return
+
+        self._count(hit=False)
+        chunks = []
+        async for chunk in stream_tts_audio(text):
+            chunks.append(chunk)
+            yield chunk
+        # Only complete renders are stored; a cancelled stream never gets here
+        if store and chunks:
+            await asyncio.to_thread(self.put, key, b"".join(chunks))
+
+    async def lookup_or_stream(self, text, previous_text=None) -> AsyncIterator[bytes]:
+        """Plays cached audio if present but doesn't store misses, for one-off LLM text"""
+        async for chunk in self.synthesize(text, previous_text, store=False):
+            yield chunk
+
+    async def render(self, text) -> bytes:
+        """Synthesizes text fully into the cache, sharing an in-flight render of the same text"""
+        key = self.key(text)
+        pcm = await self.lookup(key)
+        if pcm is not None:
+            return pcm
+        pending = self._rendering.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._rendering[key] = future
+        self._count(hit=False)
+        try:
+            pcm = b"".join([chunk async for chunk in stream_tts_audio(text)])
+            await asyncio.to_thread(self.put, key, pcm)
+            future.set_result(pcm)
+            return pcm
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Don't warn about it if nobody else was waiting
+            raise
+        finally:
+            del self._rendering[key]
+
+    def render_in_background(self, text) -> Future:
+        """
+        Renders text into the cache on a worker thread, for callers outside the event
+        loop. Returns a Future for the PCM; a render of the same text that's already
+        running is shared.
+        """
+        key = self.key(text)
+        with self._lock:
+            pending = self._background.get(key)
+            if pending is not None:
+                return pending
+            if self._background_executor is None:
+                self._background_executor = ThreadPoolExecutor(
+                    max_workers=TTS_BACKGROUND_RENDER_WORKERS, thread_name_prefix="tts-render")
+            future = self._background_executor.submit(self._render_blocking, key, text)
+            self._background[key] = future
+        future.add_done_callback(lambda _: self._forget_background(key, future))
+        return future
+
+    def background_render(self, key) -> Optional[Future]:
+        """The render_in_background() future for key if one is still running in this process"""
+        with self._lock:
+            return self._background.get(key)
+
+    def _render_blocking(self, key, text):
+        pcm = self.get(key)
+        if pcm is None:
+            self._count(hit=False)
+            pcm = render_tts_audio_blocking(text)
+            self.put(key, pcm)
+        return pcm
+
+    def _forget_background(self, key, future):
+        with self._lock:
+            if self._background.get(key) is future:
+                del self._background[key]
+        if not future.cancelled() and future.exception():
+            logger.warning(f"Background TTS render failed for {key}: {future.exception()}")
+
+    def _count(self, hit):
+        # Lookups finish on whichever loop or render thread asked, so count under the lock
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    async def prewarm(self, phrases):
+        for text in phrases:
+            try:
+                await self.render(text)
+            except Exception as e:
+                logger.warning(f"Couldn't prewarm TTS cache for {text!r}: {e}")
+        logger.info(f"TTS cache prewarmed with {len(phrases)} phrases")
+
+    def ensure_prewarmed(self, phrases):
+        """Starts prewarming on the running loop once per process"""
+        if self._prewarm_task is None:
+            self._prewarm_task = asyncio.create_task(self.prewarm(phrases))
+        return self._prewarm_task
+
+    def _put_memory(self, key, pcm):
+        if len(pcm) > self.memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_size -= len(previous)
+            self._memory[key] = pcm
+            self._memory_size += len(pcm)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    def _path(self, key):
+        return self.directory / f"{key}.pcm"
+
+    def _load_disk_index(self):
+        # Called with the lock held
+        if self._disk is not None:
+            return
+        self._disk = {}
+        self._disk_size = 0
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.name.endswith(".pcm")),
+                key=lambda entry: entry.stat().st_mtime,
+            )
+        except OSError as e:
+            logger.warning(f"TTS disk cache unavailable at {self.directory}: {e}")
+            return
+        # Oldest first, so dict order doubles as LRU order
+        for entry in entries:
+            size = entry.stat().st_size
+            self._disk[entry.name[:-len(".pcm")]] = size
+            self._disk_size += size
+
+    def _read_disk(self, key) -> Optional[bytes]:
+        with self._lock:
+            self._load_disk_index()
+            if key not in self._disk:
+                return None
+            self._disk[key] = self._disk.pop(key)  # Mark as most recently used
+        path = self._path(key)
+        try:
+            pcm = path.read_bytes()
+            os.utime(path)  # Keeps the LRU order across restarts
+            return pcm
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+
+    def _write_disk(self, key, pcm):
+        path = self._path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            with self._lock:
+                self._load_disk_index()
+            tmp.write_bytes(pcm)
+            os.replace(tmp, path)  # Readers never see a partial file
+        except OSError as e:
+            logger.warning(f"Couldn't write TTS cache entry {key}: {e}")
+            return
+
+        evict = []
+        with self._lock:
+            self._disk_size += len(pcm) - self._disk.pop(key, 0)
+            self._disk[key] = len(pcm)
+            while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+                oldest = next(iter(self._disk))
+                self._disk_size -= self._disk.pop(oldest)
+                evict.append(oldest)
+        for oldest in evict:
+            try:
+                self._path(oldest).unlink()
+            except OSError:
+                pass
+
+
+tts_cache = TTSCache()
@@ -0,0 +1,222 @@
+import asyncio
+import os
+import re
+from contextlib import aclosing
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from dotenv import load_dotenv  # type: ignore
+from elevenlabs.client import AsyncElevenLabs, ElevenLabs  # type: ignore
+
+# Load environment variables
+env_path = Path(__file__).resolve().parent.parent.parent / '.env'
+load_dotenv(env_path)
+
+# Initialize ElevenLabs client
+api_key = os.getenv('ELEVENLABS_API_KEY')
+if not api_key:
+    raise ValueError("ELEVENLABS_API_KEY environment variable not set")
+# ELEVENLABS_BASE_URL points synthesis at a local stand-in, e.g. for load tests
+base_url = os.getenv('ELEVENLABS_BASE_URL') or None
+elevenlabs = AsyncElevenLabs(api_key=api_key, base_url=base_url)
+# Blocking client for renders that happen outside the event loop, e.g. from REST views
+elevenlabs_sync = ElevenLabs(api_key=api_key, base_url=base_url)
+
+# zGjIP4SZlMnY9m93k97r (Another Voice Id to try out)
+TTS_MODEL_ID = "eleven_flash_v2"
+TTS_OUTPUT_FORMAT = "pcm_16000"
+
+# Segments shorter than these are held back so ElevenLabs gets enough text for
+# natural prosody; the first segment is allowed to be shorter to get audio out fast
+MIN_SENTENCE_CHARS = 12
+MIN_CLAUSE_CHARS = 60
+MIN_FIRST_CLAUSE_CHARS = 25
+MAX_SEGMENT_CHARS = 220
+MAX_INFLIGHT_SEGMENTS = 2
+
+_SENTENCE_END = re.compile(r'[.!?…]+["\'”’)\]]*\s+')
+_CLAUSE_END = re.compile(r'[,;:—–]\s+')
+
+
+async def stream_tts_audio(text, previous_text=None) -> AsyncIterator[bytes]:
+    """Yields PCM chunks for text as ElevenLabs streams them, aligned to whole int16 samples"""
+    audio_stream = elevenlabs.text_to_speech.stream(
+        text=text,
+        voice_id=os.getenv('ELEVENLABS_VOICE_ID'),
+        model_id=TTS_MODEL_ID,
+        output_format=TTS_OUTPUT_FORMAT,
+        previous_text=previous_text,
+    )
+    carry = b""
+    # aclosing() tears the upstream HTTP stream down as soon as the consumer stops
+    # iterating, e.g. when the owning task is cancelled on barge-in
+    async with aclosing(audio_stream):
+        async for chunk in audio_stream:
+            if not chunk:
+                continue
+            # Frontend drops odd-length frames, so carry the stray byte into the next one
+            chunk = carry + chunk
+            aligned = len(chunk) - (len(chunk) % 2)
+            carry = chunk[aligned:]
+            if aligned:
+                yield chunk[:aligned]
+
+
+def render_tts_audio_blocking(text) -> bytes:
+    """Synthesizes text to a complete PCM buffer. Blocks; for worker threads only."""
+    audio = b"".join(elevenlabs_sync.text_to_speech.convert(
+        text=text,
+        voice_id=os.getenv('ELEVENLABS_VOICE_ID'),
+        model_id=TTS_MODEL_ID,
+        output_format=TTS_OUTPUT_FORMAT,
+    ))
+    return audio[:len(audio) - len(audio) % 2]
+
+
+class SentenceChunker:
+    """Cuts streamed LLM text into speakable segments at sentence or clause boundaries"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.segments_emitted = 0
+
+    def feed(self, text) -> List[str]:
+        self.buffer += text
+        segments = []
+        while True:
+            segment = self._next_segment()
+            if not segment:
+                break
+            segments.append(segment)
+        return segments
+
+    def flush(self) -> Optional[str]:
+        segment = self.buffer.strip()
+        self.buffer = ""
+        if segment:
+            self.segments_emitted += 1
+            return segment
+        return None
+
+    def _next_segment(self):
+        cut = None
+
+        # Prefer the first sentence boundary that leaves a reasonably sized segment
+        for match in _SENTENCE_END.finditer(self.buffer):
+            if len(self.buffer[:match.start()].strip()) >= MIN_SENTENCE_CHARS:
+                cut = match.end()
+                break
+
+        # Otherwise fall back to a clause boundary once enough text has built up
+        if cut is None:
+            min_clause = MIN_FIRST_CLAUSE_CHARS if self.segments_emitted == 0 else MIN_CLAUSE_CHARS
+            for match in _CLAUSE_END.finditer(self.buffer):
+                if match.start() >= min_clause:
+                    cut = match.end()
+                    break
+
+        # Run-on text with no punctuation gets cut at the last word boundary
+        if cut is None and len(self.buffer) > MAX_SEGMENT_CHARS:
+            space = self.buffer.rfind(" ", 0, MAX_SEGMENT_CHARS)
+            cut = space + 1 if space > 0 else MAX_SEGMENT_CHARS
+
+        if cut is None:
+            return None
+
+        segment = self.buffer[:cut].strip()
+        self.buffer = self.buffer[cut:]
+        if not segment:
+            return None
+        self.segments_emitted += 1
+        return segment
+
+
+async def chunk_text_stream(deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Re-chunks an async stream of text deltas into sentence/clause segments"""
+    chunker = SentenceChunker()
+    async for delta in deltas:
+        for segment in chunker.feed(delta):
+            yield segment
+    segment = chunker.flush()
+    if segment:
+        yield segment
+
+
+async def _iter_text(text) -> AsyncIterator[str]:
+    yield text
+
+
+def chunk_text(text) -> AsyncIterator[str]:
+    """Segments an already complete text the same way as a streamed one"""
+    return chunk_text_stream(_iter_text(text))
+
+
+class TTSPipeline:
+    """
+    Synthesizes text segments concurrently and forwards their audio in order.
+
+    Segment n+1 starts synthesizing while segment n is still being sent, but its
+    audio is held in a per-segment queue until every earlier segment has been fully
+    forwarded, so the outgoing socket always sees the utterance in order.
+    """
+
+    _DONE = object()
+
+    def __init__(self, send_audio: Callable[[bytes], Awaitable[None]],
+                 on_segment: Optional[Callable[[str], None]] = None,
+                 synthesize=stream_tts_audio, max_inflight=MAX_INFLIGHT_SEGMENTS):
+        self.send_audio = send_audio
+        self.on_segment = on_segment
+        self.synthesize = synthesize
+        self.inflight = asyncio.Semaphore(max_inflight)
+        self.bytes_sent = 0
+
+    async def run(self, segments: AsyncIterator[str]) -> None:
+        ordered: asyncio.Queue = asyncio.Queue()
+        tasks = []
+
+        async def synthesize_segment(text, previous_text, audio_queue):
+            try:
+                async with self.inflight:
+                    async for chunk in self.synthesize(text, previous_text):
+                        audio_queue.put_nowait(chunk)
+                audio_queue.put_nowait(self._DONE)
+            except Exception as e:
+                audio_queue.put_nowait(e)
+
+        async def produce():
+            try:
+                previous_text = None
+                async with aclosing(segments):
+                    async for text in segments:
+                        audio_queue: asyncio.Queue = asyncio.Queue()
+                        tasks.append(asyncio.create_task(synthesize_segment(text, previous_text, audio_queue)))
+                        ordered.put_nowait((text, audio_queue))
+                        previous_text = text if previous_text is None else f"{previous_text} {text}"
+                ordered.put_nowait(self._DONE)
+            except Exception as e:
+                ordered.put_nowait(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                item = await ordered.get()
+                if item is self._DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                text, audio_queue = item
+                if self.on_segment:
+                    self.on_segment(text)
+                while True:
+                    chunk = await audio_queue.get()
+                    if chunk is self._DONE:
+                        break
+                    if isinstance(chunk, Exception):
+                        raise chunk
+                    await self.send_audio(chunk)
+                    self.bytes_sent += len(chunk)
+        finally:
+            producer.cancel()
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,68 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TurnTimers:
+    """
+    Event-driven scheduler for a call's silence, timeout and max-duration checks.
+
+    Instead of waking every 100 ms to re-check flags, the owner's evaluate() runs
+    only when state changes (poke) or when the deadline it last returned comes due.
+    evaluate() fires whatever actions are due and returns the wall-clock time at
+    which it should run again, or None to sleep until the next poke. An idle call
+    therefore holds a single loop.call_at handle and costs no wakeups at all.
+    """
+
+    def __init__(self, evaluate: Callable[[], Optional[float]], loop=None):
+        self._evaluate = evaluate
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._handle = None
+        self._poke_pending = False
+        self._closed = False
+        self.wakeups = 0
+
+    def poke(self):
+        """Re-evaluate on the next loop iteration. Safe to call from any thread."""
+        if self._closed or self._poke_pending:
+            return
+        self._poke_pending = True
+        if threading.get_ident() == self._loop_thread:
+            self._loop.call_soon(self._run)
+        else:
+            self._loop.call_soon_threadsafe(self._run)
+
+    def close(self):
+        self._closed = True
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _run(self):
+        self._poke_pending = False
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+        if self._closed:
+            return
+
+        self.wakeups += 1
+        try:
+            deadline = self._evaluate()
+        except Exception as e:
+            logger.error(f"Error evaluating turn timers: {e}")
+            return
+
+        if deadline is not None and not self._closed:
+            # Convert the wall-clock deadline onto the loop's monotonic clock
+            delay = max(0.0, deadline - time.time())
+            self._handle = self._loop.call_at(self._loop.time() + delay, self._run)
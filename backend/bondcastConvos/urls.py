@@ -1,7 +1,9 @@
 from django.urls import path  # type: ignore
-from .views import SetIntroView
+from .views import SetIntroView, SpeechReadinessView, VoiceMetricsView
 
 urlpatterns = [
     # ... existing urls ...
     path('generate-greeting/', SetIntroView.as_view(), name='set_greeting'),
+    path('speech-readiness/', SpeechReadinessView.as_view(), name='speech_readiness'),
+    path('voice-metrics/', VoiceMetricsView.as_view(), name='voice_metrics'),
 ] 
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+from collections import deque
+from dataclasses import dataclass
+import numpy as np  # type: ignore
+
+VAD_SUBFRAME_MS = 20
+VAD_ONSET_MS = int(os.getenv('VAD_ONSET_MS', '60'))
+VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', '300'))
+# How far above the tracked noise floor a subframe must be to count as speech. While
+# Bondi is talking a larger margin is used so residual echo doesn't trigger barge-in.
+VAD_MARGIN_DB = float(os.getenv('VAD_MARGIN_DB', '10'))
+VAD_BARGE_IN_MARGIN_DB = float(os.getenv('VAD_BARGE_IN_MARGIN_DB', '16'))
+VAD_MIN_LEVEL_DB = float(os.getenv('VAD_MIN_LEVEL_DB', '-50'))
+# The noise floor is never below the quietest subframe of this window, so steady noise
+# (a hum, a fan) that started out louder than the floor stops counting as speech
+# within this long. Speech always has quieter gaps between words.
+VAD_FLOOR_WINDOW_MS = int(os.getenv('VAD_FLOOR_WINDOW_MS', '3000'))
+# Broadband hiss crosses zero on nearly every other sample; voiced speech doesn't
+VAD_MAX_ZCR = 0.45
+
+
+@dataclass
+class VADResult:
+    speech: bool  # user was speaking at some point in this frame (including hangover)
+    voiced: bool  # frame contained voiced audio while in speech, i.e. excluding hangover
+    onset: bool  # speech started in this frame
+    offset: bool  # speech ended in this frame
+    level_db: float
+
+
+class EnergyVAD:
+    """
+    Vectorized RMS / zero-crossing voice activity detector for int16 PCM frames.
+
+    Each frame is split into 20 ms subframes whose level and zero-crossing rate are
+    computed in one NumPy pass. A subframe is voiced when it clears an adaptive noise
+    floor by a margin; speech starts after VAD_ONSET_MS of consecutive voiced audio
+    and is held for VAD_HANGOVER_MS after the last voiced subframe. The floor also
+    rises to the minimum level over the last VAD_FLOOR_WINDOW_MS, speech or not.
+    """
+
+    def __init__(self, sample_rate=16000):
+        self.subframe_samples = sample_rate * VAD_SUBFRAME_MS // 1000
+        self.onset_subframes = max(1, VAD_ONSET_MS // VAD_SUBFRAME_MS)
+        self.hangover_subframes = max(1, VAD_HANGOVER_MS // VAD_SUBFRAME_MS)
+        self.noise_floor_db = None
+        self.floor_window_subframes = max(1, VAD_FLOOR_WINDOW_MS // VAD_SUBFRAME_MS)
+        self._subframe_index = 0
+        self._window_min = deque()  # (subframe index, level), levels increasing
+        self.speaking = False
+        self._voiced_run = 0
+        self._unvoiced_run = 0
+
+    def process(self, frame, barge_in=False) -> VADResult:
+        samples = np.frombuffer(frame, dtype="<i2")
+        usable = len(samples) - len(samples) % self.subframe_samples
+        if usable == 0:
+            return VADResult(self.speaking, False, False, False, -120.0)
+        subframes = samples[:usable].reshape(-1, self.subframe_samples)
+
+        as_float = subframes.astype(np.float32)
+        rms = np.sqrt(np.mean(as_float * as_float, axis=1))
+        level_db = 20.0 * np.log10(rms / 32768.0 + 1e-9)
+        zcr = np.count_nonzero(np.diff(np.signbit(subframes), axis=1), axis=1) / self.subframe_samples
+
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(np.min(level_db))
+
+        margin = VAD_BARGE_IN_MARGIN_DB if barge_in else VAD_MARGIN_DB
+        onset = offset = False
+        any_speech = self.speaking
+        any_voiced = False
+
+        for db, rate in zip(level_db.tolist(), zcr.tolist()):
+            window_min = self._track_window_min(db)
+            if window_min is not None and window_min > self.noise_floor_db:
+                self.noise_floor_db = window_min
+
+            voiced = db > self.noise_floor_db + margin and db > VAD_MIN_LEVEL_DB and rate < VAD_MAX_ZCR
+
+            if voiced:
+                self._voiced_run += 1
+                self._unvoiced_run = 0
+                if not self.speaking and self._voiced_run >= self.onset_subframes:
+                    self.speaking = True
+                    onset = True
+            else:
+                self._voiced_run = 0
+                self._unvoiced_run += 1
+                if self.speaking and self._unvoiced_run >= self.hangover_subframes:
+                    self.speaking = False
+                    offset = True
+
+            if not self.speaking and not voiced:
+                # Track the floor quickly downward and slowly upward so speech doesn't raise it
+                rate_adapt = 0.5 if db < self.noise_floor_db else 0.05
+                self.noise_floor_db += rate_adapt * (db - self.noise_floor_db)
+
+            any_speech = any_speech or self.speaking
+            any_voiced = any_voiced or (voiced and self.speaking)
+
+        return VADResult(any_speech, any_voiced, onset, offset, float(np.max(level_db)))
+
+    def _track_window_min(self, db):
+        """Sliding minimum of subframe levels, once a full window has been seen"""
+        index = self._subframe_index
+        self._subframe_index += 1
+        while self._window_min and self._window_min[-1][1] >= db:
+            self._window_min.pop()
+        self._window_min.append((index, db))
+        if self._window_min[0][0] <= index - self.floor_window_subframes:
+            self._window_min.popleft()
+        return self._window_min[0][1] if index + 1 >= self.floor_window_subframes else None
+
+    def reset(self):
+        self.speaking = False
+        self._voiced_run = 0
+        self._unvoiced_run = 0
@@ -1,5 +1,5 @@
 from rest_framework.views import APIView   # type: ignore
-from rest_framework.permissions import IsAuthenticated  # type: ignore
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated  # type: ignore
 from rest_framework.response import Response  # type: ignore
 from django.core.cache import cache  # type: ignore
 import os  # type: ignore
@@ -7,6 +7,13 @@ from groq import Groq  # type: ignore
 from datetime import datetime  # type: ignore
 import logging  # type: ignore
 import pytz  # type: ignore
+from .assembly_stt import stt_stats
+from .speculative import speculation_stats
+from .stt_fallback import fallback_stats
+from .stt_pool import stt_pool
+from .tts_cache import tts_cache
+from .voice_metrics import loop_lag, voice_metrics
+from .vosk_pool import vosk_barge_in_model, vosk_model
 
 logger = logging.getLogger(__name__)
 
@@ -52,4 +59,44 @@ class SetIntroView(APIView):
         context_key = f'user_{user.id}_context'
         cache.set(context_key, podcast_description, timeout=3600)  # Cache for 1 hour
 
-        return Response({'success': True, 'greeting': intro}) 
\ No newline at end of file
+        # Start synthesizing the greeting now so the call can play it as soon as it connects.
+        # The audio lives in the TTS cache; only its key is stored next to the text.
+        tts_cache.render_in_background(intro)
+        cache.set(f'user_{user.id}_intro_audio', tts_cache.key(intro), timeout=3600)
+
+        return Response({'success': True, 'greeting': intro}) 
+
+class SpeechReadinessView(APIView):
+    """Reports whether this process's speech models are loaded, for health checks"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        models = {'vosk_model': vosk_model.status()}
+        if vosk_barge_in_model is not vosk_model:
+            models['vosk_barge_in_model'] = vosk_barge_in_model.status()
+        # "idle" means this deployment doesn't use the model. Calls are served without it
+        # while it loads, so only a failed load makes the process unhealthy.
+        states = [status['state'] for status in models.values()]
+        ready = all(state in ('idle', 'ready') for state in states)
+        return Response({'ready': ready, **models}, status=503 if 'failed' in states else 200)
+
+class VoiceMetricsView(APIView):
+    """Per-stage voice latency percentiles for this process"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        # ?loop_lag_window=<seconds> picks the window for the recent loop lag percentiles
+        try:
+            window = float(request.query_params.get('loop_lag_window', 0)) or None
+        except ValueError:
+            window = None
+        return Response({
+            **voice_metrics.snapshot(),
+            "loop_lag_ms": loop_lag.snapshot(window),
+            "speculation": speculation_stats.snapshot(),
+            "tts_cache": tts_cache.snapshot(),
+            "stt": stt_stats.snapshot(),
+            "stt_pool": stt_pool.snapshot(),
+            "stt_fallback": fallback_stats.snapshot(),
+        })
@@ -0,0 +1,231 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from statistics import median
+
+# How often the event loop lag probe wakes up, and how far back its recent
+# percentiles can look
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL_MS', '50')) / 1000
+LOOP_LAG_WINDOW = float(os.getenv('LOOP_LAG_WINDOW', '300'))
+
+# Points stamped on each turn. User-side marks may be re-stamped while the user is
+# still talking; every other mark keeps its first value for the turn.
+TURN_MARKS = [
+    "last_user_audio",  # last voiced frame from the user
+    "first_partial",  # AssemblyAI started transcribing
+    "transcript",  # formatted transcript arrived
+    "llm_request",  # reply requested (or a speculative one taken over)
+    "llm_first_token",
+    "llm_done",
+    "tts_first_byte",  # first PCM from ElevenLabs or the TTS cache
+    "first_audio_sent",  # first PCM frame written to the socket
+    "client_audio_started",  # client reported playback started
+]
+USER_MARKS = {"last_user_audio", "first_partial", "transcript"}
+RESPONSE_MARKS = {"llm_request", "llm_first_token", "llm_done", "tts_first_byte", "first_audio_sent"}
+
+# Stage name -> (start mark, end mark)
+STAGES = {
+    "stt_final": ("last_user_audio", "transcript"),
+    "partial_to_final": ("first_partial", "transcript"),
+    "turn_wait": ("transcript", "llm_request"),
+    "llm_first_token": ("llm_request", "llm_first_token"),
+    "llm_total": ("llm_request", "llm_done"),
+    "tts_first_byte": ("llm_first_token", "tts_first_byte"),
+    "send": ("tts_first_byte", "first_audio_sent"),
+    "client_start": ("first_audio_sent", "client_audio_started"),
+    "response": ("last_user_audio", "first_audio_sent"),
+    "mouth_to_ear": ("last_user_audio", "client_audio_started"),
+}
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram in milliseconds. Buckets grow by 5%, so
+    percentiles are within about 2.5% of the true value at a fixed memory cost.
+    """
+
+    GROWTH = 1.05
+    MIN_MS = 0.1
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms):
+        index = 0 if ms <= self.MIN_MS else int(math.log(ms / self.MIN_MS, self.GROWTH)) + 1
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += ms
+            self.max = max(self.max, ms)
+
+    def percentile(self, p):
+        with self._lock:
+            if not self.count:
+                return None
+            rank = p / 100 * self.count
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= rank:
+                    return self._bucket_value(index)
+            return self.max
+
+    def _bucket_value(self, index):
+        if index == 0:
+            return self.MIN_MS
+        # Geometric middle of the bucket, capped at the largest value seen
+        return min(self.MIN_MS * self.GROWTH ** (index - 0.5), self.max)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "p50": _round(self.percentile(50)),
+            "p95": _round(self.percentile(95)),
+            "p99": _round(self.percentile(99)),
+            "mean": _round(self.total / self.count) if self.count else None,
+            "max": _round(self.max) if self.count else None,
+        }
+
+
+def _round(ms):
+    return None if ms is None else round(ms, 1)
+
+
+class VoiceMetrics:
+    """Process-wide per-stage latency histograms"""
+
+    def __init__(self):
+        self.stages = {name: LatencyHistogram() for name in STAGES}
+        self.turns = 0
+        self.calls = 0
+
+    def record(self, durations):
+        self.turns += 1
+        for name, ms in durations.items():
+            self.stages[name].record(ms)
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "turns": self.turns,
+            "stages_ms": {name: histogram.snapshot() for name, histogram in self.stages.items()},
+        }
+
+
+class LoopLagProbe:
+    """
+    How late the event loop runs a callback scheduled with call_at, sampled every
+    LOOP_LAG_INTERVAL. That's how long any ready socket read or timer waited behind
+    other work, without the network and framing time a ping round trip adds.
+    """
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL, window=LOOP_LAG_WINDOW):
+        self.interval = interval
+        self.window = window
+        self.histogram = LatencyHistogram()
+        self.loop = None
+        self._recent = deque()  # (loop time, lag ms) within the window
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        """Starts probing the running loop, once per loop"""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            loop.call_at(loop.time() + self.interval, self._tick, loop, loop.time() + self.interval)
+
+    def _tick(self, loop, due):
+        if self.loop is not loop:
+            return
+        now = loop.time()
+        lag_ms = 1000 * max(0.0, now - due)
+        self.histogram.record(lag_ms)
+        with self._lock:
+            self._recent.append((now, lag_ms))
+            while self._recent[0][0] < now - self.window:
+                self._recent.popleft()
+        loop.call_at(now + self.interval, self._tick, loop, now + self.interval)
+
+    def snapshot(self, window=None):
+        """Lifetime percentiles, plus ones over the last window seconds (capped at LOOP_LAG_WINDOW)"""
+        window = min(window or self.window, self.window)
+        with self._lock:
+            since = self._recent[-1][0] - window if self._recent else 0.0
+            lags = sorted(lag for at, lag in self._recent if at >= since)
+        recent = {"window_s": window, "count": len(lags)}
+        if lags:
+            recent.update({
+                "p50": _round(lags[len(lags) // 2]),
+                "p99": _round(lags[min(len(lags) - 1, int(0.99 * len(lags)))]),
+                "max": _round(lags[-1]),
+            })
+        return {"interval_ms": round(1000 * self.interval), **self.histogram.snapshot(), "recent": recent}
+
+
+class CallMetrics:
+    """
+    Turn timelines for one call. Marks can come from the event loop or from the STT
+    thread. A user mark that arrives after the response to the current turn has
+    started begins a new turn.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.turns = []
+        self._marks = {}
+        self._lock = threading.Lock()
+        metrics.calls += 1
+
+    def mark(self, name, at=None):
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            if name in USER_MARKS:
+                if RESPONSE_MARKS & self._marks.keys():
+                    self._finish_turn()
+                if name == "first_partial":
+                    self._marks.setdefault(name, at)
+                else:
+                    self._marks[name] = at
+            elif name == "client_audio_started":
+                # Only meaningful for a response that actually went out; the client
+                # also reports restarts after playback gaps
+                if "first_audio_sent" in self._marks:
+                    self._marks.setdefault(name, at)
+                    self._finish_turn()
+            else:
+                self._marks.setdefault(name, at)
+
+    def finish(self):
+        with self._lock:
+            self._finish_turn()
+
+    def _finish_turn(self):
+        marks, self._marks = self._marks, {}
+        durations = {}
+        for stage, (start, end) in STAGES.items():
+            if start in marks and end in marks and marks[end] >= marks[start]:
+                durations[stage] = 1000 * (marks[end] - marks[start])
+        if durations:
+            self.turns.append(durations)
+            self.metrics.record(durations)
+
+    def summary(self):
+        """Per-stage median and max over this call's turns, in ms"""
+        stages = {}
+        for stage in STAGES:
+            values = [turn[stage] for turn in self.turns if stage in turn]
+            if values:
+                stages[stage] = {"median": round(median(values)), "max": round(max(values)), "n": len(values)}
+        return {"turns": len(self.turns), "stages_ms": stages}
+
+
+voice_metrics = VoiceMetrics()
+loop_lag = LoopLagProbe()
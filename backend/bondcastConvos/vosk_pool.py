@@ -0,0 +1,258 @@
+import gc
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from vosk import KaldiRecognizer, Model  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Number of recognizer threads per process. Kaldi decoding runs in C through cffi,
+# which releases the GIL, so these decode in parallel with the event loop and with
+# each other. Defaults to one per CPU.
+VOSK_RECOGNIZER_WORKERS = int(os.getenv('VOSK_RECOGNIZER_WORKERS', str(os.cpu_count() or 1)))
+
+# Frames a session may have queued before new ones are dropped. Partials are only used
+# to detect that the user is talking, so shedding audio under overload is preferable
+# to letting detection latency grow without bound.
+MAX_PENDING_FRAMES = int(os.getenv('VOSK_MAX_PENDING_FRAMES', '10'))
+# Sessions whose finals stand in for AssemblyAI's transcript queue much more, since a
+# dropped frame cuts words out of what the LLM is sent. If even this backs up, the
+# utterance's final is reported as incomplete so it isn't used.
+MAX_PENDING_TRANSCRIBE_FRAMES = int(os.getenv('VOSK_MAX_PENDING_TRANSCRIBE_FRAMES', '300'))
+
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', "bondcastConvos/vosk-model-en-us-0.15")  # Path relative to backend directory
+
+# Load the model synchronously at startup instead of in the background. Use this under a
+# pre-forking server (e.g. gunicorn --preload with uvicorn workers) so the model is
+# loaded once in the parent and its pages are shared copy-on-write by every worker.
+VOSK_PRELOAD = os.getenv('VOSK_PRELOAD', 'false').lower() == 'true'
+
+# Optional lighter recognizer for barge-in confirmation. A small model (e.g.
+# vosk-model-small-en-us-0.15) cuts per-call CPU and memory. With VOSK_BARGE_IN_GRAMMAR
+# the recognizer only decodes the control phrases, plus [unk] for any other speech.
+# Grammars need a model with a runtime graph, which the small models have and the
+# large ones don't (Vosk ignores the grammar there). Both are off by default, so
+# barge-in uses VOSK_MODEL_PATH; compare on recorded calls with bench_vosk_barge_in
+# before switching.
+VOSK_BARGE_IN_MODEL_PATH = os.getenv('VOSK_BARGE_IN_MODEL_PATH')
+VOSK_BARGE_IN_GRAMMAR = os.getenv('VOSK_BARGE_IN_GRAMMAR', 'false').lower() == 'true'
+# Phrases that interrupt Bondi without waiting for a second partial
+BARGE_IN_PHRASES = [p.strip().lower() for p in os.getenv('VOSK_BARGE_IN_PHRASES', 'stop,wait,hold on').split(",") if p.strip()]
+
+
+def barge_in_grammar(phrases=BARGE_IN_PHRASES):
+    return json.dumps(phrases + ["[unk]"])
+
+
+def said_barge_in_phrase(text, phrases=BARGE_IN_PHRASES):
+    padded = f" {text.lower()} "
+    return any(f" {phrase} " in padded for phrase in phrases)
+
+
+class VoskModelLoader:
+    """
+    Loads a Vosk model at most once per process, off the request path.
+
+    warm() starts loading on a background thread and returns immediately, so the
+    process can serve REST traffic while the model loads; status() reports progress
+    for readiness checks. Calls that arrive before the model is ready simply run
+    without it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = "idle"
+        self.error = None
+        self.load_seconds = None
+        self._model = None
+        self._future: Future = Future()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._model
+
+    @property
+    def ready(self):
+        return self._model is not None
+
+    def warm(self) -> Future:
+        with self._lock:
+            if self.state == "idle":
+                self.state = "loading"
+                threading.Thread(target=self._load, name="vosk-model-loader", daemon=True).start()
+        return self._future
+
+    def load_now(self):
+        """Loads synchronously, then freezes the GC so forked workers don't dirty the shared pages"""
+        with self._lock:
+            if self.state == "idle":
+                self.state = "loading"
+            else:
+                return self._future.result()
+        self._load()
+        gc.freeze()
+        return self._future.result()
+
+    def status(self):
+        return {
+            "path": self.path,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+    def _load(self):
+        started = time.time()
+        logger.info(f"Loading Vosk model from {self.path}")
+        try:
+            # Kaldi does the loading in C through cffi, which releases the GIL
+            model = Model(self.path)
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Failed to load Vosk model {self.path}: {e}")
+            self._future.set_exception(e)
+            return
+        self._model = model
+        self.load_seconds = round(time.time() - started, 2)
+        self.state = "ready"
+        logger.info(f"Vosk model ready in {self.load_seconds}s")
+        self._future.set_result(model)
+
+
+class VoskSession:
+    """
+    A recognizer pinned to one pool worker; results are delivered on the event loop.
+
+    Without on_final the recognizer is reset after every partial, since partials
+    are only used to tell that the user is talking. With it the utterance is kept
+    whole, partials are delivered as they change and Vosk's final result for each
+    utterance goes to on_final, with whether all of its audio was decoded.
+    """
+
+    def __init__(self, pool, worker_index, model, sample_rate, on_partial, loop, on_final=None, grammar=None):
+        self.pool = pool
+        self.worker_index = worker_index
+        self.executor = pool.workers[worker_index]
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.last_partial = ""
+        self.loop = loop
+        self.recognizer = None
+        self.pending = 0
+        self.max_pending = MAX_PENDING_TRANSCRIBE_FRAMES if on_final else MAX_PENDING_FRAMES
+        self.dropped_frames = 0
+        self.utterance_dropped = False  # Frames were dropped since the last final
+        self.closed = False
+        self._lock = threading.Lock()
+        self.executor.submit(self._create_recognizer, model, sample_rate, grammar)
+
+    def _create_recognizer(self, model, sample_rate, grammar):
+        if grammar:
+            self.recognizer = KaldiRecognizer(model, sample_rate, grammar)
+        else:
+            self.recognizer = KaldiRecognizer(model, sample_rate)
+
+    def accept(self, frame):
+        """Queues a frame for decoding. It's decoded after the caller returns, so views are copied (bytes pass as is)."""
+        if self.closed:
+            return
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped_frames += 1
+                self.utterance_dropped = True
+                if self.dropped_frames % 50 == 1:
+                    logger.warning(f"Vosk worker {self.worker_index} behind, dropped {self.dropped_frames} frames")
+                return
+            self.pending += 1
+        self.executor.submit(self._decode, bytes(frame))
+
+    def reset(self):
+        if not self.closed:
+            self.executor.submit(self._reset)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.pool.release(self.worker_index)
+        # Drop the recognizer on its own worker, after any frames still queued for it
+        self.executor.submit(self._release)
+
+    def _decode(self, data):
+        try:
+            if self.closed or self.recognizer is None:
+                return
+            final = self.recognizer.AcceptWaveform(data)
+            if self.on_final:
+                self._transcribe(final)
+                return
+            partial_result = json.loads(self.recognizer.PartialResult())
+            if partial_result.get("partial"):
+                # Clear the recognizer's internal state so the next partial needs new speech
+                self.recognizer.Reset()
+                self.loop.call_soon_threadsafe(self._deliver, partial_result)
+        except Exception as e:
+            logger.error(f"Vosk decode error: {e}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _transcribe(self, final):
+        if final:
+            # Vosk detected the end of the utterance and started a new one
+            self.last_partial = ""
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            with self._lock:
+                complete, self.utterance_dropped = not self.utterance_dropped, False
+            self.loop.call_soon_threadsafe(self._deliver_final, text, complete)
+            return
+        partial_result = json.loads(self.recognizer.PartialResult())
+        partial = partial_result.get("partial", "")
+        if partial and partial != self.last_partial:
+            self.last_partial = partial
+            self.loop.call_soon_threadsafe(self._deliver, partial_result)
+
+    def _reset(self):
+        if self.recognizer is not None:
+            self.recognizer.Reset()
+
+    def _release(self):
+        self.recognizer = None
+
+    def _deliver(self, partial_result):
+        if not self.closed:
+            self.on_partial(partial_result)
+
+    def _deliver_final(self, text, complete):
+        if not self.closed:
+            self.on_final(text, complete)
+
+
+class VoskWorkerPool:
+    """Bounded set of single-thread workers; each session stays on the worker it was opened on"""
+
+    def __init__(self, workers=VOSK_RECOGNIZER_WORKERS):
+        workers = max(1, workers)
+        self.workers = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"vosk-{i}") for i in range(workers)]
+        self.sessions = [0] * workers
+        self._lock = threading.Lock()
+
+    def open_session(self, model, sample_rate, on_partial, loop, on_final=None, grammar=None) -> VoskSession:
+        with self._lock:
+            worker_index = min(range(len(self.workers)), key=lambda i: self.sessions[i])
+            self.sessions[worker_index] += 1
+        return VoskSession(self, worker_index, model, sample_rate, on_partial, loop, on_final, grammar)
+
+    def release(self, worker_index):
+        with self._lock:
+            self.sessions[worker_index] -= 1
+
+
+vosk_pool = VoskWorkerPool()
+vosk_model = VoskModelLoader(VOSK_MODEL_PATH)
+vosk_barge_in_model = VoskModelLoader(VOSK_BARGE_IN_MODEL_PATH) if VOSK_BARGE_IN_MODEL_PATH else vosk_model
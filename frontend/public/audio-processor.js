@@ -6,6 +6,11 @@ class PCMProcessor extends AudioWorkletProcessor {
         super();
         this.buffer = new Float32Array(0);
         this.playing = false;
+        // Sequence-numbered frames still queued, and the last one fully played
+        this.frames = [];
+        this.queuedSamples = 0;
+        this.playedSamples = 0;
+        this.lastPlayedSeq = -1;
         this.port.onmessage = (event) => {
             if (event.data.type === 'pcm') {
                 // Convert Int16Array to Float32Array
@@ -20,6 +25,10 @@ class PCMProcessor extends AudioWorkletProcessor {
                 newBuffer.set(this.buffer);
                 newBuffer.set(floatData, this.buffer.length);
                 this.buffer = newBuffer;
+                this.queuedSamples += floatData.length;
+                if (typeof event.data.seq === 'number') {
+                    this.frames.push({ seq: event.data.seq, end: this.queuedSamples });
+                }
 
                 // If we just received data and weren't playing, signal start
                 if (!this.playing && this.buffer.length > 0) {
@@ -29,14 +38,24 @@ class PCMProcessor extends AudioWorkletProcessor {
             } else if (event.data.type === 'stop_audio') {
                 // Clear the buffer and stop playing
                 this.buffer = new Float32Array(0);
+                this.frames = [];
+                this.queuedSamples = this.playedSamples;
                 if (this.playing) {
                     this.playing = false;
-                    this.port.postMessage({ type: "audio_done" });
+                    this.postDone();
                 }
             }
         };
     }
 
+    postDone() {
+        const message = { type: "audio_done" };
+        if (this.lastPlayedSeq >= 0) {
+            message.seq = this.lastPlayedSeq;
+        }
+        this.port.postMessage(message);
+    }
+
     process(inputs, outputs) {
         const output = outputs[0];
         const channel = output[0];
@@ -44,7 +63,7 @@ class PCMProcessor extends AudioWorkletProcessor {
         if (this.buffer.length === 0) {
             if (this.playing) {
                 this.playing = false;
-                this.port.postMessage({ type: "audio_done" });
+                this.postDone();
             }
             return true;
         }
@@ -52,6 +71,10 @@ class PCMProcessor extends AudioWorkletProcessor {
         // Copy data from our buffer to the output
         const samplesToCopy = Math.min(channel.length, this.buffer.length);
         channel.set(this.buffer.subarray(0, samplesToCopy));
+        this.playedSamples += samplesToCopy;
+        while (this.frames.length > 0 && this.frames[0].end <= this.playedSamples) {
+            this.lastPlayedSeq = this.frames.shift().seq;
+        }
 
         // Remove the samples we just played
         if (samplesToCopy < this.buffer.length) {
@@ -60,7 +83,7 @@ class PCMProcessor extends AudioWorkletProcessor {
             this.buffer = new Float32Array(0);
             if (this.playing) {
                 this.playing = false;
-                this.port.postMessage({ type: "audio_done" });
+                this.postDone();
             }
         }
 
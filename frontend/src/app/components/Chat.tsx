@@ -2,6 +2,7 @@
 
 import { useState, useRef } from "react";
 import { setupAudioProcessor } from "./audio";
+import { createOpusDecoder, createOpusEncoder, opusSupported } from "./opus";
 import { useAuth } from "./AuthContext";
 
 interface ChatProps {
@@ -20,6 +21,9 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
   const workletNodeTTSRef = useRef<AudioWorkletNode | null>(null);
   const recordingChunksRef = useRef<Blob[]>([]);
   const recordingTTSNodeRef = useRef<AudioWorkletNode | null>(null);
+  const audioFramedRef = useRef(false);
+  const opusDecoderRef = useRef<ReturnType<typeof createOpusDecoder> | null>(null);
+  const opusEncoderRef = useRef<ReturnType<typeof createOpusEncoder> | null>(null);
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const ringtoneRef = useRef<HTMLAudioElement | null>(null);
   const ringtoneIntervalRef = useRef<NodeJS.Timeout | null>(null);
@@ -124,8 +128,12 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
         stopRingtone();
         const beep = new Audio('/beep.mp3');
 
-        // Send ready signal to start ElevenLabs streaming
-        socket.send(JSON.stringify({ type: "ready_for_streaming" }));
+        // Send ready signal to start ElevenLabs streaming. We can take
+        // sequence-numbered audio frames, which lets the backend know exactly
+        // how much of Bondi's reply was heard when it gets interrupted, and
+        // Opus in both directions where the browser has WebCodecs
+        const codecs = (await opusSupported()) ? ["opus", "pcm"] : ["pcm"];
+        socket.send(JSON.stringify({ type: "ready_for_streaming", capabilities: { audio_frames: true, codecs } }));
         
         // Change to talking state after beep
         setIsRinging(false);
@@ -152,7 +160,42 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
       // Handle audio data from processor and send to backend for transcription
       transcriptionProcessor.port.onmessage = (e) => {
         if (socket.readyState === WebSocket.OPEN) {
-          socket.send(e.data);
+          if (opusEncoderRef.current) {
+            opusEncoderRef.current.encode(e.data);
+          } else {
+            socket.send(e.data);
+          }
+        }
+      };
+
+      // Hands Bondi's PCM to the playback and recording worklets
+      const playPcm = (pcm: ArrayBuffer, seq?: number) => {
+        // Skip partial chunks
+        if (pcm.byteLength % 2 !== 0) {
+          // console.log("Skipping partial audio chunk");
+          return;
+        }
+
+        // Log chunk details
+        // console.log(`Received audio chunk: size=${pcm.byteLength} bytes`);
+        
+        // Create copies of the buffer before any transfers
+        const bufferCopy = pcm.slice(0);
+        
+        // Send the PCM data to the worklet
+        if (workletNodeTTSRef.current) {
+          workletNodeTTSRef.current.port.postMessage({
+            type: 'pcm',
+            buffer: pcm,
+            seq
+          }, [pcm]);
+        }
+        // Also send to recording worklet
+        if (recordingTTSNodeRef.current) {
+          recordingTTSNodeRef.current.port.postMessage({
+            type: 'pcm',
+            buffer: bufferCopy
+          }, [bufferCopy]);
         }
       };
 
@@ -161,31 +204,18 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
         try {
           // Handles ElevenLabs streaming
           if (e.data instanceof ArrayBuffer) {
-            // Skip partial chunks
-            if (e.data.byteLength % 2 !== 0) {
-              // console.log("Skipping partial audio chunk");
-              return;
+            // Framed audio starts with a little-endian uint32 sequence number
+            let seq: number | undefined;
+            let payload: ArrayBuffer = e.data;
+            if (audioFramedRef.current) {
+              seq = new DataView(e.data).getUint32(0, true);
+              payload = e.data.slice(4);
             }
 
-            // Log chunk details
-            // console.log(`Received audio chunk: size=${e.data.byteLength} bytes`);
-            
-            // Create copies of the buffer before any transfers
-            const bufferCopy = e.data.slice(0);
-            
-            // Send the PCM data to the worklet
-            if (workletNodeTTSRef.current) {
-              workletNodeTTSRef.current.port.postMessage({
-                type: 'pcm',
-                buffer: e.data
-              }, [e.data]);
-            }
-            // Also send to recording worklet
-            if (recordingTTSNodeRef.current) {
-              recordingTTSNodeRef.current.port.postMessage({
-                type: 'pcm',
-                buffer: bufferCopy
-              }, [bufferCopy]);
+            if (opusDecoderRef.current) {
+              opusDecoderRef.current.decode(payload, seq);
+            } else {
+              playPcm(payload, seq);
             }
           } else {
             // Handle JSON messages
@@ -193,8 +223,21 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
             // console.log(`Received from backend: ${JSON.stringify(data)}`);
             if (data.type === 'error') {
               console.error('Error from backend:', data.content);
+            } else if (data.type === 'audio_format') {
+              audioFramedRef.current = data.framing === 'seq';
+              opusDecoderRef.current?.close();
+              opusEncoderRef.current?.close();
+              opusDecoderRef.current = null;
+              opusEncoderRef.current = null;
+              if (data.codec === 'opus') {
+                opusDecoderRef.current = createOpusDecoder(data.frame_ms, playPcm);
+                opusEncoderRef.current = createOpusEncoder((packet) => {
+                  if (socket.readyState === WebSocket.OPEN) socket.send(packet);
+                });
+              }
             } else if (data.type === 'stop_audio') {
               console.log("Received stop_audio from backend");
+              opusDecoderRef.current?.reset();
               // Forward stop_audio message to both worklets
               if (workletNodeTTSRef.current) {
                 workletNodeTTSRef.current.port.postMessage({ type: 'stop_audio' });
@@ -229,8 +272,8 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
       if (type === "audio_started" || type === "audio_done") {
         // console.log(`Audio state: ${type}`);
         if (socket.readyState === WebSocket.OPEN) {
-          // Ensure the message is sent as a string
-          const message = JSON.stringify({ type });
+          // Ensure the message is sent as a string; audio_done carries the last played frame
+          const message = JSON.stringify(event.data);
           // console.log(`Sending to backend: ${message}`);
           socket.send(message);
         }
@@ -273,6 +316,11 @@ export default function Chat({ onRecordingComplete, variant = 'default', disable
           if (recordingTTSNodeRef.current) recordingTTSNodeRef.current.disconnect();
         } catch {}
 
+        opusEncoderRef.current?.close();
+        opusDecoderRef.current?.close();
+        opusEncoderRef.current = null;
+        opusDecoderRef.current = null;
+
         microphoneStream.getTracks().forEach(track => track.stop());
         if (transcriptionContext.state !== "closed") transcriptionContext.close();
         if (playbackContext.state !== "closed") playbackContext.close();
@@ -0,0 +1,94 @@
+// Optional Opus transport for the speech WebSocket via WebCodecs. The backend
+// only switches to Opus when we offer it, so browsers without WebCodecs keep
+// sending and receiving raw 16kHz PCM.
+
+const SAMPLE_RATE = 16000;
+const OPUS_CONFIG = { codec: "opus", sampleRate: SAMPLE_RATE, numberOfChannels: 1 };
+
+export async function opusSupported(): Promise<boolean> {
+  if (typeof AudioEncoder === "undefined" || typeof AudioDecoder === "undefined") return false;
+  try {
+    const [encoder, decoder] = await Promise.all([
+      AudioEncoder.isConfigSupported({ ...OPUS_CONFIG, bitrate: 24000 }),
+      AudioDecoder.isConfigSupported(OPUS_CONFIG),
+    ]);
+    return !!encoder.supported && !!decoder.supported;
+  } catch {
+    return false;
+  }
+}
+
+// Decodes Bondi's Opus frames to Int16 PCM for the playback worklets. The frame's
+// sequence number rides along in the chunk timestamp so it survives decoding.
+export function createOpusDecoder(frameMs: number, onPcm: (pcm: ArrayBuffer, seq?: number) => void) {
+  const frameUs = frameMs * 1000;
+  let framed = false;
+  let nextTimestamp = 0;
+  const decoder = new AudioDecoder({
+    output: (data) => {
+      const floats = new Float32Array(data.numberOfFrames);
+      data.copyTo(floats, { planeIndex: 0, format: "f32-planar" });
+      const pcm = new Int16Array(floats.length);
+      for (let i = 0; i < floats.length; i++) {
+        const s = Math.max(-1, Math.min(1, floats[i]));
+        pcm[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+      }
+      onPcm(pcm.buffer, framed ? Math.round(data.timestamp / frameUs) : undefined);
+      data.close();
+    },
+    error: (e) => console.error("Opus decode error:", e),
+  });
+  decoder.configure(OPUS_CONFIG);
+
+  return {
+    decode(packet: ArrayBuffer, seq?: number) {
+      framed = seq !== undefined;
+      const timestamp = framed ? seq! * frameUs : nextTimestamp;
+      nextTimestamp = timestamp + frameUs;
+      decoder.decode(new EncodedAudioChunk({ type: "key", timestamp, data: packet }));
+    },
+    // Drops frames still being decoded, e.g. on stop_audio
+    reset() {
+      if (decoder.state === "closed") return;
+      decoder.reset();
+      decoder.configure(OPUS_CONFIG);
+    },
+    close() {
+      if (decoder.state !== "closed") decoder.close();
+    },
+  };
+}
+
+// Encodes the mic's Int16 PCM into Opus packets for the backend
+export function createOpusEncoder(onPacket: (packet: ArrayBuffer) => void) {
+  let samplesEncoded = 0;
+  const encoder = new AudioEncoder({
+    output: (chunk) => {
+      const packet = new ArrayBuffer(chunk.byteLength);
+      chunk.copyTo(packet);
+      onPacket(packet);
+    },
+    error: (e) => console.error("Opus encode error:", e),
+  });
+  encoder.configure({ ...OPUS_CONFIG, bitrate: 24000, opus: { frameDuration: 20000 } } as AudioEncoderConfig);
+
+  return {
+    encode(pcm: ArrayBuffer) {
+      const samples = new Int16Array(pcm);
+      const data = new AudioData({
+        format: "s16",
+        sampleRate: SAMPLE_RATE,
+        numberOfFrames: samples.length,
+        numberOfChannels: 1,
+        timestamp: Math.round((samplesEncoded * 1e6) / SAMPLE_RATE),
+        data: samples,
+      });
+      samplesEncoded += samples.length;
+      encoder.encode(data);
+      data.close();
+    },
+    close() {
+      if (encoder.state !== "closed") encoder.close();
+    },
+  };
+}